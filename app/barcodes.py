@@ -0,0 +1,494 @@
+"""
+Code 128 and QR code symbols.
+
+Each value is encoded once into a module image: one pixel per module, quiet zone
+included, black bars on white. The encoded images are kept in a shared LRU cache, so a
+batch that repeats values (lot numbers, SKUs) encodes each distinct value once. Drawing
+a symbol is then a single NEAREST resize by a whole number of printer dots per module,
+which keeps every bar and cell exactly the same width on the printed label.
+"""
+import threading
+import logging
+from collections import OrderedDict
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+CODE128 = "code128"
+QR = "qr"
+
+# Quiet zones in modules, as required by the symbology specifications
+QUIET_ZONES = {CODE128: 10, QR: 4}
+
+EC_LEVELS = ("L", "M", "Q", "H")
+
+DEFAULT_MAXSIZE = 4096
+
+
+def module_dots(module_mm, dpi):
+    """Module size in whole printer dots (at least one) for a nominal size in mm."""
+    return max(1, int(round(module_mm * dpi / 25.4)))
+
+
+# -- Code 128 --
+
+# Bar/space widths of symbol values 0-106 (103-105 are START A/B/C, 106 is STOP)
+_CODE128_PATTERNS = (
+    "212222", "222122", "222221", "121223", "121322", "131222", "122213", "122312", "132212", "221213",
+    "221312", "231212", "112232", "122132", "122231", "113222", "123122", "123221", "223211", "221132",
+    "221231", "213212", "223112", "312131", "311222", "321122", "321221", "312212", "322112", "322211",
+    "212123", "212321", "232121", "111323", "131123", "131321", "112313", "132113", "132311", "211313",
+    "231113", "231311", "112133", "112331", "132131", "113123", "113321", "133121", "313121", "211331",
+    "231131", "213113", "213311", "213131", "311123", "311321", "331121", "312113", "312311", "332111",
+    "314111", "221411", "431111", "111224", "111422", "121124", "121421", "141122", "141221", "112214",
+    "112412", "122114", "122411", "142112", "142211", "241211", "221114", "413111", "241112", "134111",
+    "111242", "121142", "121241", "114212", "124112", "124211", "411212", "421112", "421211", "212141",
+    "214121", "412121", "111143", "111341", "131141", "114113", "114311", "411113", "411311", "113141",
+    "114131", "311141", "411131", "211412", "211214", "211232", "2331112",
+)
+
+_CODE_B, _CODE_C = 100, 99
+_START_B, _START_C = 104, 105
+_STOP = 106
+
+
+def _digit_run(value, start):
+    end = start
+    while end < len(value) and value[end].isdigit():
+        end += 1
+    return end - start
+
+
+def code128_values(value):
+    """
+    Returns the symbol values for value, start code and check symbol included.
+    Runs of digits use code set C (two digits per symbol), everything else code set B.
+    """
+    if not value:
+        raise ValueError("Code 128 needs at least one character")
+    bad = [ch for ch in value if not 32 <= ord(ch) <= 126]
+    if bad:
+        raise ValueError(f"Code 128 cannot encode {bad[0]!r}")
+
+    symbols = []
+    code = None
+    i = 0
+    while i < len(value):
+        run = _digit_run(value, i)
+        # Code set C pays off for four digits, or for a value that is an even digit string
+        if run >= 4 or (run == len(value) and run % 2 == 0):
+            if code != _CODE_C:
+                symbols.append(_START_C if code is None else _CODE_C)
+                code = _CODE_C
+            end = i + run - run % 2
+            symbols.extend(int(value[j:j + 2]) for j in range(i, end, 2))
+            i = end
+            continue
+        if code != _CODE_B:
+            symbols.append(_START_B if code is None else _CODE_B)
+            code = _CODE_B
+        symbols.append(ord(value[i]) - 32)
+        i += 1
+
+    check = (symbols[0] + sum(pos * v for pos, v in enumerate(symbols[1:], 1))) % 103
+    return symbols + [check, _STOP]
+
+
+def code128_modules(value):
+    """Returns the modules of a Code 128 symbol as a bytes row (1 = bar), without quiet zone."""
+    row = bytearray()
+    for symbol in code128_values(value):
+        for i, width in enumerate(_CODE128_PATTERNS[symbol]):
+            # Patterns alternate bar, space, bar, ...
+            row.extend((1 - i % 2,) * int(width))
+    return bytes(row)
+
+
+# -- QR code --
+
+# Error correction codewords per block and number of blocks, indexed [level][version]
+_QR_ECC_PER_BLOCK = {
+    "L": (-1, 7, 10, 15, 20, 26, 18, 20, 24, 30, 18, 20, 24, 26, 30, 22, 24, 28, 30, 28, 28,
+          28, 28, 30, 30, 26, 28, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+    "M": (-1, 10, 16, 26, 18, 24, 16, 18, 22, 22, 26, 30, 22, 22, 24, 24, 28, 28, 26, 26, 26,
+          26, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28),
+    "Q": (-1, 13, 22, 18, 26, 18, 24, 18, 22, 20, 24, 28, 26, 24, 20, 30, 24, 28, 28, 26, 30,
+          28, 30, 30, 30, 30, 28, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+    "H": (-1, 17, 28, 22, 16, 22, 28, 26, 26, 24, 28, 24, 28, 22, 24, 24, 30, 28, 28, 26, 28,
+          30, 24, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+}
+_QR_BLOCKS = {
+    "L": (-1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 4, 4, 4, 4, 4, 6, 6, 6, 6, 7, 8,
+          8, 9, 9, 10, 12, 12, 12, 13, 14, 15, 16, 17, 18, 19, 19, 20, 21, 22, 24, 25),
+    "M": (-1, 1, 1, 1, 2, 2, 4, 4, 4, 5, 5, 5, 8, 9, 9, 10, 10, 11, 13, 14, 16,
+          17, 17, 18, 20, 21, 23, 25, 26, 28, 29, 31, 33, 35, 37, 38, 40, 43, 45, 47, 49),
+    "Q": (-1, 1, 1, 2, 2, 4, 4, 6, 6, 8, 8, 8, 10, 12, 16, 12, 17, 16, 18, 21, 20,
+          23, 23, 25, 27, 29, 34, 34, 35, 38, 40, 43, 45, 48, 51, 53, 56, 59, 62, 65, 68),
+    "H": (-1, 1, 1, 2, 4, 4, 4, 5, 6, 8, 8, 11, 11, 16, 16, 18, 16, 19, 21, 25, 25,
+          25, 34, 30, 32, 35, 37, 40, 42, 45, 48, 51, 54, 57, 60, 63, 66, 70, 74, 77, 81),
+}
+# Level indicator written into the format information
+_QR_FORMAT_BITS = {"L": 1, "M": 0, "Q": 3, "H": 2}
+
+# GF(256) with the QR polynomial x^8 + x^4 + x^3 + x^2 + 1
+_GF_EXP = [0] * 512
+_GF_LOG = [0] * 256
+_x = 1
+for _i in range(255):
+    _GF_EXP[_i] = _x
+    _GF_LOG[_x] = _i
+    _x <<= 1
+    if _x & 0x100:
+        _x ^= 0x11D
+for _i in range(255, 512):
+    _GF_EXP[_i] = _GF_EXP[_i - 255]
+del _x, _i
+
+
+def _gf_mul(a, b):
+    if a == 0 or b == 0:
+        return 0
+    return _GF_EXP[_GF_LOG[a] + _GF_LOG[b]]
+
+
+def _rs_generator(degree):
+    """Coefficients of prod(x - 2^i) for i < degree, highest power first, leading 1 dropped."""
+    poly = [1]
+    for i in range(degree):
+        root = _GF_EXP[i]
+        poly = [c ^ _gf_mul(p, root) for c, p in zip(poly + [0], [0] + poly)]
+    return poly[1:]
+
+
+def rs_remainder(data, degree):
+    """Reed-Solomon error correction codewords for data."""
+    generator = _rs_generator(degree)
+    remainder = [0] * degree
+    for byte in data:
+        factor = byte ^ remainder.pop(0)
+        remainder.append(0)
+        if factor:
+            for i, coef in enumerate(generator):
+                remainder[i] ^= _gf_mul(coef, factor)
+    return remainder
+
+
+def _raw_data_modules(version):
+    """Modules available for data and error correction in a version."""
+    result = (16 * version + 128) * version + 64
+    if version >= 2:
+        aligns = version // 7 + 2
+        result -= (25 * aligns - 10) * aligns - 55
+        if version >= 7:
+            result -= 36
+    return result
+
+
+def _data_codewords(version, level):
+    return (_raw_data_modules(version) // 8
+            - _QR_ECC_PER_BLOCK[level][version] * _QR_BLOCKS[level][version])
+
+
+def _alignment_positions(version):
+    if version == 1:
+        return []
+    aligns = version // 7 + 2
+    size = version * 4 + 17
+    step = 26 if version == 32 else (version * 4 + aligns * 2 + 1) // (aligns * 2 - 2) * 2
+    return [6] + sorted(size - 7 - i * step for i in range(aligns - 1))
+
+
+def qr_version(length, level):
+    """Smallest version that holds length bytes in byte mode at level."""
+    for version in range(1, 41):
+        count_bits = 8 if version < 10 else 16
+        if 4 + count_bits + 8 * length <= _data_codewords(version, level) * 8:
+            return version
+    raise ValueError(f"{length} bytes do not fit in a QR code at level {level}")
+
+
+def qr_codewords(data, level):
+    """Returns (version, codewords): byte-mode data with error correction, interleaved."""
+    version = qr_version(len(data), level)
+    capacity = _data_codewords(version, level)
+
+    bits = [0, 1, 0, 0]
+    count_bits = 8 if version < 10 else 16
+    bits += [(len(data) >> i) & 1 for i in range(count_bits - 1, -1, -1)]
+    for byte in data:
+        bits += [(byte >> i) & 1 for i in range(7, -1, -1)]
+    bits += [0] * min(4, capacity * 8 - len(bits))
+    bits += [0] * (-len(bits) % 8)
+    codewords = [int("".join(map(str, bits[i:i + 8])), 2) for i in range(0, len(bits), 8)]
+    pad = (0xEC, 0x11)
+    codewords += [pad[i % 2] for i in range(capacity - len(codewords))]
+
+    blocks_count = _QR_BLOCKS[level][version]
+    ecc_len = _QR_ECC_PER_BLOCK[level][version]
+    raw = _raw_data_modules(version) // 8
+    short_blocks = blocks_count - raw % blocks_count
+    short_len = raw // blocks_count - ecc_len
+    blocks = []
+    k = 0
+    for i in range(blocks_count):
+        length = short_len + (0 if i < short_blocks else 1)
+        block = codewords[k:k + length]
+        k += length
+        blocks.append((block, rs_remainder(block, ecc_len)))
+
+    result = []
+    for i in range(short_len + 1):
+        result += [block[i] for block, _ in blocks if i < len(block)]
+    for i in range(ecc_len):
+        result += [ecc[i] for _, ecc in blocks]
+    return version, result
+
+
+def format_bits(level, mask):
+    """The 15-bit BCH-coded format information for a level and mask."""
+    data = _QR_FORMAT_BITS[level] << 3 | mask
+    rem = data
+    for _ in range(10):
+        rem = (rem << 1) ^ ((rem >> 9) * 0x537)
+    return (data << 10 | rem) ^ 0x5412
+
+
+def _version_bits(version):
+    rem = version
+    for _ in range(12):
+        rem = (rem << 1) ^ ((rem >> 11) * 0x1F25)
+    return version << 12 | rem
+
+
+_MASKS = (
+    lambda x, y: (x + y) % 2 == 0,
+    lambda x, y: y % 2 == 0,
+    lambda x, y: x % 3 == 0,
+    lambda x, y: (x + y) % 3 == 0,
+    lambda x, y: (x // 3 + y // 2) % 2 == 0,
+    lambda x, y: x * y % 2 + x * y % 3 == 0,
+    lambda x, y: (x * y % 2 + x * y % 3) % 2 == 0,
+    lambda x, y: ((x + y) % 2 + x * y % 3) % 2 == 0,
+)
+
+
+def _format_cells(size):
+    """(x, y, bit index) of both copies of the format information."""
+    cells = [(8, i, i) for i in range(6)]
+    cells += [(8, 7, 6), (8, 8, 7), (7, 8, 8)]
+    cells += [(14 - i, 8, i) for i in range(9, 15)]
+    cells += [(size - 1 - i, 8, i) for i in range(8)]
+    cells += [(8, size - 15 + i, i) for i in range(8, 15)]
+    return cells
+
+
+def _function_patterns(version):
+    """Returns (modules, reserved) grids with finder, timing, alignment and version patterns."""
+    size = version * 4 + 17
+    modules = [[0] * size for _ in range(size)]
+    reserved = [[False] * size for _ in range(size)]
+
+    def put(x, y, dark):
+        modules[y][x] = 1 if dark else 0
+        reserved[y][x] = True
+
+    for i in range(size):
+        put(6, i, i % 2 == 0)
+        put(i, 6, i % 2 == 0)
+    for cx, cy in ((3, 3), (size - 4, 3), (3, size - 4)):
+        for dy in range(-4, 5):
+            for dx in range(-4, 5):
+                x, y = cx + dx, cy + dy
+                if 0 <= x < size and 0 <= y < size:
+                    put(x, y, max(abs(dx), abs(dy)) not in (2, 4))
+    positions = _alignment_positions(version)
+    last = len(positions) - 1
+    for i, ax in enumerate(positions):
+        for j, ay in enumerate(positions):
+            # The three corners are taken by finder patterns
+            if (i, j) in ((0, 0), (0, last), (last, 0)):
+                continue
+            for dy in range(-2, 3):
+                for dx in range(-2, 3):
+                    put(ax + dx, ay + dy, max(abs(dx), abs(dy)) != 1)
+    # Format bits are written once the mask is chosen; the dark module is fixed
+    for x, y, _ in _format_cells(size):
+        put(x, y, False)
+    put(8, size - 8, True)
+    if version >= 7:
+        bits = _version_bits(version)
+        for i in range(18):
+            a, b = size - 11 + i % 3, i // 3
+            put(a, b, (bits >> i) & 1)
+            put(b, a, (bits >> i) & 1)
+    return modules, reserved
+
+
+def _place_codewords(modules, reserved, codewords):
+    """Fills the non-function modules in the two-column zigzag, from the bottom-right."""
+    size = len(modules)
+    total = len(codewords) * 8
+    i = 0
+    for right in range(size - 1, 0, -2):
+        if right <= 6:
+            # Columns left of the vertical timing pattern shift by one
+            right -= 1
+        upward = (right + 1) & 2 == 0
+        for vert in range(size):
+            y = size - 1 - vert if upward else vert
+            for x in (right, right - 1):
+                if not reserved[y][x] and i < total:
+                    modules[y][x] = (codewords[i >> 3] >> (7 - (i & 7))) & 1
+                    i += 1
+
+
+def _penalty(grid):
+    """Mask penalty score (rules 1-4 of the specification); lower is better."""
+    size = len(grid)
+    score = 0
+    lines = ["".join(map(str, row)) for row in grid]
+    lines += ["".join(str(grid[y][x]) for y in range(size)) for x in range(size)]
+    for line in lines:
+        run = 1
+        for a, b in zip(line, line[1:]):
+            if a == b:
+                run += 1
+                continue
+            if run >= 5:
+                score += run - 2
+            run = 1
+        if run >= 5:
+            score += run - 2
+        score += 40 * (line.count("10111010000") + line.count("00001011101"))
+    for y in range(size - 1):
+        row, below = grid[y], grid[y + 1]
+        for x in range(size - 1):
+            if row[x] == row[x + 1] == below[x] == below[x + 1]:
+                score += 3
+    dark = sum(map(sum, grid))
+    score += abs(dark * 20 - size * size * 10) // (size * size) * 10
+    return score
+
+
+def qr_modules(value, level="M"):
+    """Returns the module grid of a QR symbol as rows of 0/1 (1 = dark), without quiet zone."""
+    if level not in EC_LEVELS:
+        raise ValueError(f"Unknown QR error correction level: {level!r}")
+    version, codewords = qr_codewords(value.encode("utf-8"), level)
+    modules, reserved = _function_patterns(version)
+    _place_codewords(modules, reserved, codewords)
+    size = len(modules)
+
+    best = None
+    for mask, test in enumerate(_MASKS):
+        grid = [[m ^ (not r and test(x, y)) for x, (m, r) in enumerate(zip(row, res))]
+                for y, (row, res) in enumerate(zip(modules, reserved))]
+        bits = format_bits(level, mask)
+        for x, y, i in _format_cells(size):
+            grid[y][x] = (bits >> i) & 1
+        score = _penalty(grid)
+        if best is None or score < best[0]:
+            best = (score, grid)
+    return best[1]
+
+
+# -- module images --
+
+def encode(symbology, value, level="M"):
+    """
+    Returns the "L" module image of a symbol: one pixel per module, quiet zone included,
+    0 for bars/dark cells and 255 for spaces. Code 128 images are one pixel tall.
+    """
+    quiet = QUIET_ZONES[symbology]
+    if symbology == CODE128:
+        row = code128_modules(value)
+        img = Image.frombytes("L", (len(row), 1), bytes(255 - 255 * m for m in row))
+        return _pad(img, quiet, 0)
+    if symbology == QR:
+        grid = qr_modules(value, level)
+        size = len(grid)
+        data = bytes(255 - 255 * m for row in grid for m in row)
+        return _pad(Image.frombytes("L", (size, size), data), quiet, quiet)
+    raise ValueError(f"Unknown symbology: {symbology!r}")
+
+
+def _pad(img, quiet_x, quiet_y):
+    padded = Image.new("L", (img.width + 2 * quiet_x, img.height + 2 * quiet_y), 255)
+    padded.paste(img, (quiet_x, quiet_y))
+    return padded
+
+
+class ModuleCache:
+    """Bounded LRU cache of module images keyed by (symbology, value, level)."""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, symbology, value, level="M"):
+        """Returns the module image of a value, encoding it only on a miss."""
+        key = (symbology, value, level if symbology == QR else None)
+        with self._lock:
+            img = self._images.get(key)
+            if img is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return img
+            self.misses += 1
+
+        img = encode(symbology, value, level)
+
+        with self._lock:
+            self._images[key] = img
+            self._images.move_to_end(key)
+            while len(self._images) > self.maxsize:
+                self._images.popitem(last=False)
+        return img
+
+    def info(self):
+        """Returns hit/miss counters and current occupancy."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._images),
+                'maxsize': self.maxsize,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared by every LabelDesigner in the process
+_module_cache = ModuleCache()
+
+
+def module_image(symbology, value, level="M"):
+    """Returns a cached module image from the shared cache."""
+    return _module_cache.get(symbology, value, level)
+
+
+def render(symbology, value, dots, height=None, level="M"):
+    """
+    Returns the symbol as an "L" image with each module dots x dots printer dots.
+    Code 128 bars are height dots tall. Sizes are whole multiples of the module image, so
+    no bar is ever resampled to a fractional width.
+    """
+    img = module_image(symbology, value, level)
+    if symbology == CODE128:
+        return img.resize((img.width * dots, max(1, int(height))), Image.Resampling.NEAREST)
+    return img.resize((img.width * dots, img.height * dots), Image.Resampling.NEAREST)
+
+
+def cache_info():
+    return _module_cache.info()
+
+
+def clear_cache():
+    _module_cache.clear()
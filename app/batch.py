@@ -0,0 +1,132 @@
+import csv
+import json
+import os
+import re
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# {{field}} placeholders inside text element content
+PLACEHOLDER_RE = re.compile(r"\{\{\s*([^{}\s]+)\s*\}\}")
+
+
+class MissingFieldError(KeyError):
+    """A data record lacks a field its template uses."""
+
+    def __init__(self, field):
+        super().__init__(field)
+        self.field = field
+
+    def __str__(self):
+        return f"Data record has no field '{self.field}'"
+
+
+class RecordError(ValueError):
+    """A data record that cannot be rendered; number is its 1-based position in the data."""
+
+    def __init__(self, number, reason):
+        super().__init__(number, reason)
+        self.number = number
+        self.reason = reason
+
+    def __str__(self):
+        return f"record {self.number}: {self.reason}"
+
+
+def has_placeholders(text):
+    return bool(PLACEHOLDER_RE.search(text))
+
+
+def placeholder_fields(text):
+    """Returns the field names referenced by a template string."""
+    return PLACEHOLDER_RE.findall(text)
+
+
+def fill_placeholders(template, record):
+    """Substitutes {{field}} placeholders with values from a record."""
+    def substitute(match):
+        field = match.group(1)
+        if field not in record:
+            raise MissingFieldError(field)
+        value = record[field]
+        return "" if value is None else str(value)
+    return PLACEHOLDER_RE.sub(substitute, template)
+
+
+def output_filename(pattern, index, record):
+    """
+    Formats a batch output file name. The pattern may use {index} (the label's position
+    in the run) and any record field; a record field named 'index' is shadowed by it.
+    """
+    fields = dict(record)
+    fields['index'] = index
+    try:
+        return pattern.format_map(fields)
+    except KeyError as e:
+        raise MissingFieldError(e.args[0]) from None
+
+
+def read_records(path):
+    """
+    Streams records from a CSV (header row) or JSONL (one object per line) file.
+    A .json file holding a single array of objects is also accepted, but is read whole.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                yield row
+    elif ext in (".jsonl", ".ndjson"):
+        with open(path, encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError(f"{path}:{line_no}: expected a JSON object")
+                yield record
+    elif ext == ".json":
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            raise ValueError(f"{path}: expected a JSON array of objects")
+        for record in data:
+            yield record
+    else:
+        raise ValueError(f"Unsupported data source type: {path}")
+
+
+class BatchStats:
+    """Throughput counters for a batch run."""
+
+    def __init__(self):
+        self.count = 0
+        self.started = None
+        self.finished = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def add(self, n=1):
+        self.count += n
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return end - self.started
+
+    @property
+    def labels_per_second(self):
+        elapsed = self.elapsed
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self):
+        return f"{self.count} labels in {self.elapsed:.2f}s ({self.labels_per_second:.1f} labels/s)"
@@ -0,0 +1,174 @@
+"""
+Headless command-line interface: python -m app <command> ...
+
+Only label_designer and its Pillow dependencies are imported at startup; the GUI stack
+(customtkinter/Tk) is never loaded, and pywin32 only when a Windows printer is used.
+"""
+import argparse
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from . import batch
+from .label_designer import LabelDesigner
+
+logger = logging.getLogger(__name__)
+
+
+def _load_designer(project_path, dpi):
+    designer = LabelDesigner(dpi=dpi)
+    if not designer.load_project(project_path):
+        raise SystemExit(f"Could not load project: {project_path}")
+    return designer
+
+
+def cmd_render(args):
+    designer = _load_designer(args.project, args.dpi)
+    designer.save_image(args.output)
+    print(f"Rendered {args.project} -> {args.output}")
+    return 0
+
+
+def cmd_batch(args):
+    stats = batch.BatchStats()
+    os.makedirs(args.out_dir, exist_ok=True)
+    try:
+        if args.workers > 1:
+            from . import parallel
+            for _ in parallel.render_parallel(args.project, args.data, workers=args.workers,
+                                              chunk_size=args.chunk_size, out_dir=args.out_dir,
+                                              filename_pattern=args.pattern, dpi=args.dpi, stats=stats):
+                pass
+        else:
+            designer = _load_designer(args.project, args.dpi)
+            for index, (record, image) in enumerate(designer.render_batch(args.data, stats=stats)):
+                image.save(os.path.join(args.out_dir, batch.output_filename(args.pattern, index, record)))
+    except (ValueError, batch.MissingFieldError) as e:
+        # A record that cannot be rendered stops the run; the labels before it are kept
+        raise SystemExit(f"Batch failed after {stats.count} labels: {e}")
+    print(f"Rendered {stats}")
+    return 0
+
+
+def cmd_print(args):
+    from . import printer_utils, printer_backends
+    designer = _load_designer(args.project, args.dpi)
+    if args.language:
+        printer_backends.set_printer_language(args.printer, args.language, dpi=args.dpi)
+    if args.data:
+        # The whole batch goes out as one multi-page spooler job
+        images = (image for _, image in designer.render_batch(args.data))
+        ok = printer_utils.print_images(images, args.printer, copies=args.copies,
+                                        progress=lambda done, total: logger.info(f"Printed page {done}"))
+    else:
+        ok = printer_utils.print_image(designer.image, args.printer, copies=args.copies, debug_path=args.debug_image)
+    print("Sent to printer." if ok else "Failed to print.")
+    return 0 if ok else 1
+
+
+def cmd_zpl(args):
+    from .zpl_export import ZplExporter
+    designer = _load_designer(args.project, args.dpi)
+    size = ZplExporter(designer).export(args.output, records=args.data, copies=args.copies)
+    print(f"Exported ZPL to {args.output} ({size} bytes)")
+    return 0
+
+
+def _measure_startup(runs):
+    """Times `python -m app --help` in fresh interpreters and returns the samples in seconds."""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "app", "--help"], check=True,
+                       stdout=subprocess.DEVNULL, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def cmd_bench(args):
+    if args.startup:
+        samples = _measure_startup(args.startup)
+        print(f"Cold start: median {statistics.median(samples) * 1000:.0f} ms, "
+              f"min {min(samples) * 1000:.0f} ms over {len(samples)} runs")
+    if args.project and args.data:
+        from . import parallel
+        records = list(batch.read_records(args.data))
+        if args.limit:
+            records = records[:args.limit]
+        worker_counts = [int(n) for n in args.workers.split(",")]
+        results = parallel.benchmark(args.project, records, worker_counts=worker_counts,
+                                     chunk_size=args.chunk_size, output=args.output, dpi=args.dpi)
+        for workers, rate in results.items():
+            print(f"{workers:>3} workers: {rate:10.1f} labels/s")
+    elif not args.startup:
+        print("Nothing to benchmark: pass PROJECT DATA and/or --startup N")
+        return 2
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m app", description="Headless label rendering and printing.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log progress to stderr")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(p):
+        p.add_argument("--dpi", type=int, default=203, help="printer resolution (default: 203)")
+
+    p = sub.add_parser("render", help="render a project to an image file")
+    p.add_argument("project")
+    p.add_argument("-o", "--output", required=True)
+    add_common(p)
+    p.set_defaults(func=cmd_render)
+
+    p = sub.add_parser("batch", help="render one label per CSV/JSONL record")
+    p.add_argument("project")
+    p.add_argument("data")
+    p.add_argument("-o", "--out-dir", required=True)
+    p.add_argument("--pattern", default="label_{index:06d}.png", help="file name pattern, may use {index} and record fields")
+    p.add_argument("-j", "--workers", type=int, default=1)
+    p.add_argument("--chunk-size", type=int, default=256)
+    add_common(p)
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser("print", help="render a project (or a whole batch) and send it to a printer")
+    p.add_argument("project")
+    p.add_argument("data", nargs="?", help="optional CSV/JSONL records; prints one label per record in one job")
+    p.add_argument("-p", "--printer", required=True)
+    p.add_argument("-n", "--copies", type=int, default=1)
+    p.add_argument("--language", choices=("zpl", "tspl", "epl"), help="send a raw printer command job instead of an image")
+    p.add_argument("--debug-image", help="also save the submitted image to this path")
+    add_common(p)
+    p.set_defaults(func=cmd_print)
+
+    p = sub.add_parser("zpl", help="export ZPL with resident fonts and stored graphics")
+    p.add_argument("project")
+    p.add_argument("data", nargs="?", help="optional CSV/JSONL records for {{field}} placeholders")
+    p.add_argument("-o", "--output", required=True)
+    p.add_argument("-n", "--copies", type=int, default=1)
+    add_common(p)
+    p.set_defaults(func=cmd_zpl)
+
+    p = sub.add_parser("bench", help="measure batch throughput and/or CLI cold start")
+    p.add_argument("project", nargs="?")
+    p.add_argument("data", nargs="?")
+    p.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    p.add_argument("--limit", type=int, default=0, help="only use the first N records")
+    p.add_argument("--chunk-size", type=int, default=256)
+    p.add_argument("--output", choices=("png", "1bit"), default="png")
+    p.add_argument("--startup", type=int, default=0, metavar="N", help="time N cold starts of the CLI")
+    add_common(p)
+    p.set_defaults(func=cmd_bench)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        stream=sys.stderr,
+    )
+    return args.func(args)
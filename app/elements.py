@@ -0,0 +1,154 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Element:
+    """
+    Base class for label elements.
+    Fields live in __slots__, but the class also behaves like the dicts it replaces
+    (el['x'], el.get('scale', 1.0), 'img_object' in el) so existing callers keep working.
+    A field set to None counts as absent.
+    """
+    __slots__ = ('id', 'x', 'y', 'rotation', 'name', 'extra')
+
+    type = None
+    # Serialized fields, in the order they are written to project files
+    FIELDS = ('id', 'x', 'y', 'rotation', 'name')
+    # Runtime-only fields, never serialized
+    RUNTIME_FIELDS = ()
+    DEFAULTS = {'x': 0, 'y': 0, 'rotation': 0}
+    # Field that may hold {{field}} placeholders in batch runs (None = never variable)
+    TEMPLATE_FIELD = None
+
+    def __init__(self, **fields):
+        for key in self.FIELDS + self.RUNTIME_FIELDS:
+            setattr(self, key, self.DEFAULTS.get(key))
+        # Unknown keys from project files are carried along untouched
+        self.extra = {}
+        for key, value in fields.items():
+            self[key] = value
+
+    def _is_field(self, key):
+        return key in self.FIELDS or key in self.RUNTIME_FIELDS
+
+    def __getitem__(self, key):
+        if key == 'type':
+            return self.type
+        if self._is_field(key):
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return value
+        return self.extra[key]
+
+    def __setitem__(self, key, value):
+        if key == 'type':
+            if value != self.type:
+                raise ValueError(f"Cannot change element type from '{self.type}' to '{value}'")
+            return
+        if self._is_field(key):
+            setattr(self, key, value)
+        else:
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if self._is_field(key):
+            setattr(self, key, None)
+        else:
+            del self.extra[key]
+
+    def __contains__(self, key):
+        if key == 'type':
+            return True
+        if self._is_field(key):
+            return getattr(self, key) is not None
+        return key in self.extra
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def copy(self):
+        """Returns a shallow copy (runtime objects such as images are shared)."""
+        new = self.__class__.__new__(self.__class__)
+        for key in self.FIELDS + self.RUNTIME_FIELDS:
+            setattr(new, key, getattr(self, key))
+        new.extra = dict(self.extra)
+        return new
+
+    def to_dict(self):
+        """Returns the JSON-serializable form used by project files."""
+        data = {'id': self.id, 'type': self.type}
+        for key in self.FIELDS:
+            value = getattr(self, key)
+            if key != 'id' and value is not None:
+                data[key] = value
+        data.update(self.extra)
+        return data
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} id={self.id} x={self.x} y={self.y}>"
+
+
+class TextElement(Element):
+    __slots__ = ('content', 'font', 'font_size', 'box_width', 'box_height', 'align', 'fit')
+
+    type = 'text'
+    # box_width/box_height: optional wrap box; align: left/center/right; fit: shrink to the box
+    FIELDS = ('id', 'content', 'x', 'y', 'font_size', 'font', 'rotation', 'name',
+              'box_width', 'box_height', 'align', 'fit')
+    DEFAULTS = dict(Element.DEFAULTS, content='', font='arial.ttf', font_size=30)
+    TEMPLATE_FIELD = 'content'
+
+
+class ImageElement(Element):
+    __slots__ = ('path', 'base_width', 'base_height', 'scale', 'dither', 'img_object')
+
+    type = 'image'
+    # dither: per-element dithering for monochrome rendering (None = designer default)
+    FIELDS = ('id', 'path', 'x', 'y', 'base_width', 'base_height', 'scale', 'rotation', 'name', 'dither')
+    RUNTIME_FIELDS = ('img_object',)
+    DEFAULTS = dict(Element.DEFAULTS, scale=1.0)
+
+
+class BarcodeElement(Element):
+    __slots__ = ('value', 'module_mm', 'height_mm', 'show_text', 'font', 'font_size')
+
+    type = 'barcode'
+    # Code 128; module_mm is snapped to whole printer dots, show_text prints the value below
+    FIELDS = ('id', 'value', 'x', 'y', 'module_mm', 'height_mm', 'show_text', 'font', 'font_size',
+              'rotation', 'name')
+    DEFAULTS = dict(Element.DEFAULTS, value='', module_mm=0.25, height_mm=10.0, show_text=True,
+                    font='arial.ttf', font_size=20)
+    TEMPLATE_FIELD = 'value'
+
+
+class QRCodeElement(Element):
+    __slots__ = ('value', 'module_mm', 'ec_level')
+
+    type = 'qr'
+    # ec_level: error correction level L/M/Q/H
+    FIELDS = ('id', 'value', 'x', 'y', 'module_mm', 'ec_level', 'rotation', 'name')
+    DEFAULTS = dict(Element.DEFAULTS, value='', module_mm=0.5, ec_level='M')
+    TEMPLATE_FIELD = 'value'
+
+
+# type name -> element class
+ELEMENT_TYPES = {
+    'text': TextElement,
+    'image': ImageElement,
+    'barcode': BarcodeElement,
+    'qr': QRCodeElement,
+}
+
+
+def element_from_dict(data):
+    """Builds a typed element from its project-file dict."""
+    cls = ELEMENT_TYPES.get(data.get('type'))
+    if cls is None:
+        raise ValueError(f"Unknown element type: {data.get('type')!r}")
+    fields = {k: v for k, v in data.items() if k != 'type'}
+    return cls(**fields)
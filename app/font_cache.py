@@ -0,0 +1,101 @@
+import threading
+import logging
+from collections import OrderedDict
+from PIL import ImageFont
+
+from . import font_manager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAXSIZE = 128
+
+
+class FontCache:
+    """Bounded LRU cache of loaded FreeType fonts keyed by (path, size, variation)."""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self._fonts = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, font_name, size, variation=None):
+        """Returns a font for the given key, loading it from disk only on a miss."""
+        key = (font_name, int(size), variation)
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self._fonts.move_to_end(key)
+                self.hits += 1
+                return font
+            self.misses += 1
+
+        font = self._load(font_name, int(size), variation)
+
+        with self._lock:
+            self._fonts[key] = font
+            self._fonts.move_to_end(key)
+            while len(self._fonts) > self.maxsize:
+                self._fonts.popitem(last=False)
+        return font
+
+    def _load(self, font_name, size, variation):
+        try:
+            font = ImageFont.truetype(font_name, size)
+        except IOError:
+            # Pillow only searches a few system folders; the index knows per-user and
+            # fontconfig directories too. Never scan here: this runs on the UI and render
+            # threads, and a missing index is built by the background refresh().
+            record = font_manager.get_index(scan=False).find(font_name)
+            try:
+                if record is None:
+                    raise IOError(font_name)
+                font = ImageFont.truetype(record.path, size, index=record.index)
+            except IOError:
+                logger.debug(f"Font '{font_name}' not found, using default font")
+                return ImageFont.load_default()
+
+        if variation is not None:
+            try:
+                # Named instance ("Bold") or explicit axis values (700, 100)
+                if isinstance(variation, str):
+                    font.set_variation_by_name(variation)
+                else:
+                    font.set_variation_by_axes(list(variation))
+            except Exception as e:
+                logger.warning(f"Could not apply variation {variation!r} to '{font_name}': {e}")
+        return font
+
+    def info(self):
+        """Returns hit/miss counters and current occupancy."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._fonts),
+                'maxsize': self.maxsize,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._fonts.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared by every LabelDesigner in the process
+_font_cache = FontCache()
+
+
+def get_font(font_name, size, variation=None):
+    """Returns a cached font from the shared cache."""
+    return _font_cache.get(font_name, size, variation)
+
+
+def cache_info():
+    return _font_cache.info()
+
+
+def clear_cache():
+    _font_cache.clear()
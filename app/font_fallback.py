@@ -0,0 +1,163 @@
+"""
+Per-codepoint font fallback.
+
+Text is split into runs by which font covers each character: the element's own font
+wherever its cmap maps the codepoint, otherwise the first fallback font (preferred list,
+then every other indexed font) that does. Coverage comes from the font index's cmap
+ranges, and each (font, codepoint) decision is memoized, so picking a font is a dict
+lookup per character instead of trial rendering.
+"""
+import os
+import threading
+import unicodedata
+import logging
+from PIL import ImageFont
+
+from . import font_manager
+
+logger = logging.getLogger(__name__)
+
+# Tried first, in order, when the element's font lacks a glyph
+FALLBACK_FONTS = [
+    "seguiemj.ttf", "seguisym.ttf", "NotoColorEmoji.ttf", "NotoEmoji-Regular.ttf",
+    "NotoSans-Regular.ttf", "NotoSansSymbols2-Regular.ttf", "DejaVuSans.ttf",
+    "arialuni.ttf", "msyh.ttc", "NotoSansCJK-Regular.ttc",
+]
+
+# Marks, joiners, variation selectors and spaces stay with the run they follow
+_ATTACHING_CATEGORIES = ("Mn", "Me", "Cf", "Zs", "Cc")
+
+
+class FontFallback:
+    """Chooses a covering font per codepoint from a FontIndex."""
+
+    def __init__(self, index=None, preferred=None):
+        self._index = index
+        self.preferred = FALLBACK_FONTS if preferred is None else preferred
+        self._lock = threading.Lock()
+        # font path -> FontRecord (None if its cmap cannot be read)
+        self._coverage = {}
+        # font name -> resolved path (None for fonts without a file, e.g. the default font)
+        self._paths = {}
+        # (primary path, codepoint) -> font name to draw it with
+        self._choices = {}
+        self._candidates = None
+        self._generation = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = font_manager.get_index()
+        return self._index
+
+    @property
+    def generation(self):
+        """Changes whenever the index does, and with it the fonts chosen for codepoints."""
+        return self.index.generation
+
+    def _sync(self):
+        # Choices made against an older index may have better answers now
+        if self._generation != self.index.generation:
+            with self._lock:
+                self._choices.clear()
+                self._paths.clear()
+                self._coverage.clear()
+                self._candidates = None
+                self._generation = self.index.generation
+
+    def _path(self, font_name):
+        path = self._paths.get(font_name, False)
+        if path is False:
+            path = self._resolve(font_name)
+            self._paths[font_name] = path
+        return path
+
+    def _resolve(self, font_name):
+        """Font file of font_name, found without loading it through the shared font cache."""
+        if os.path.isfile(font_name):
+            return font_name
+        record = self.index.find(font_name)
+        if record is not None:
+            return record.path
+        # Names Pillow resolves by itself but the index has not seen (yet)
+        try:
+            path = ImageFont.truetype(font_name, 12).path
+        except OSError:
+            return None
+        return path if isinstance(path, str) else None
+
+    def coverage(self, path):
+        """Returns the FontRecord with the cmap coverage of a font file."""
+        if path in self._coverage:
+            return self._coverage[path]
+        record = next((r for r in self.index.records() if r.path == path and r.index == 0), None)
+        if record is None:
+            try:
+                record = font_manager.scan_file(path)[0]
+            except Exception as e:
+                logger.debug(f"No cmap coverage for {path}: {e}")
+                record = None
+        self._coverage[path] = record
+        return record
+
+    def candidates(self):
+        """Fallback fonts in the order they are tried."""
+        self._sync()
+        return self._ranked()
+
+    def _ranked(self):
+        # Does not sync: font_for() calls this while holding the lock
+        if self._candidates is None:
+            records = [r for r in self.index.records() if r.index == 0]
+            rank = {name.lower(): i for i, name in enumerate(self.preferred)}
+            records.sort(key=lambda r: (rank.get(r.name.lower(), len(rank)), r.family, r.style, r.path))
+            self._candidates = records
+        return self._candidates
+
+    def font_for(self, font_name, codepoint):
+        """Returns the font name to draw codepoint with when the element uses font_name."""
+        self._sync()
+        path = self._path(font_name)
+        if path is None:
+            return font_name
+        key = (path, codepoint)
+        choice = self._choices.get(key)
+        if choice is None:
+            with self._lock:
+                choice = font_name
+                primary = self.coverage(path)
+                if primary is not None and not primary.covers(codepoint):
+                    for record in self._ranked():
+                        if record.covers(codepoint):
+                            choice = record.path
+                            break
+                self._choices[key] = choice
+        return choice
+
+    def split_runs(self, text, font_name):
+        """Splits text into [(font name, text)] runs of characters drawn with the same font."""
+        runs = []
+        current = None
+        start = 0
+        for i, ch in enumerate(text):
+            if current is not None and unicodedata.category(ch) in _ATTACHING_CATEGORIES:
+                continue
+            font = self.font_for(font_name, ord(ch))
+            if font != current:
+                if current is not None:
+                    runs.append((current, text[start:i]))
+                current, start = font, i
+        if current is not None:
+            runs.append((current, text[start:]))
+        return runs
+
+
+_fallback = None
+
+
+def get_fallback():
+    """Returns the process-wide FontFallback over the shared font index."""
+    global _fallback
+    if _fallback is None:
+        _fallback = FontFallback()
+    return _fallback
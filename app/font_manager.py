@@ -1,34 +1,410 @@
+"""
+System font index.
+
+Scans the platform font directories (the Windows font folders, macOS library folders,
+fontconfig <dir> entries and XDG data dirs on Linux) and records each face's family,
+style, path, mtime and supported codepoints (from its cmap table). The index is saved
+as JSON; startup reads that file and a background refresh() re-parses only files that
+were added or changed since.
+"""
+import bisect
+import json
 import os
-import glob
+import struct
+import sys
+import tempfile
+import threading
+import time
+import logging
+import xml.etree.ElementTree as ET
+from concurrent.futures import Future
 from PIL import ImageFont
 
-def get_system_fonts():
+logger = logging.getLogger(__name__)
+
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc", ".otc")
+CACHE_VERSION = 1
+
+# Common useful fonts, listed first in the UI when installed
+PRIORITY_FONTS = ["arial.ttf", "calibri.ttf", "seguisym.ttf", "seguiemj.ttf", "times.ttf", "verdana.ttf", "tahoma.ttf"]
+
+
+def _fontconfig_dirs(conf="/etc/fonts/fonts.conf", seen=None):
+    """Returns the <dir> entries of a fontconfig file, following <include>s."""
+    seen = seen if seen is not None else set()
+    if conf in seen or not os.path.exists(conf):
+        return []
+    seen.add(conf)
+    dirs = []
+    try:
+        root = ET.parse(conf).getroot()
+    except (ET.ParseError, OSError) as e:
+        logger.debug(f"Could not read fontconfig file {conf}: {e}")
+        return []
+    base = os.path.dirname(conf)
+    for node in root:
+        text = (node.text or "").strip()
+        if not text:
+            continue
+        if node.get("prefix") == "xdg":
+            text = os.path.join(os.environ.get("XDG_DATA_HOME", os.path.expanduser("~/.local/share")), text)
+        text = os.path.expanduser(text)
+        if node.tag == "dir":
+            dirs.append(text)
+        elif node.tag == "include":
+            path = text if os.path.isabs(text) else os.path.join(base, text)
+            if os.path.isdir(path):
+                for name in sorted(os.listdir(path)):
+                    if name.endswith(".conf"):
+                        dirs.extend(_fontconfig_dirs(os.path.join(path, name), seen))
+            else:
+                dirs.extend(_fontconfig_dirs(path, seen))
+    return dirs
+
+
+def font_dirs():
+    """Returns the existing font directories of this platform, system and per-user."""
+    if sys.platform == "win32":
+        windir = os.environ.get("WINDIR", r"C:\Windows")
+        dirs = [os.path.join(windir, "Fonts")]
+        local = os.environ.get("LOCALAPPDATA")
+        if local:
+            dirs.append(os.path.join(local, "Microsoft", "Windows", "Fonts"))
+    elif sys.platform == "darwin":
+        dirs = ["/System/Library/Fonts", "/Library/Fonts", os.path.expanduser("~/Library/Fonts")]
+    else:
+        dirs = _fontconfig_dirs()
+        data_home = os.environ.get("XDG_DATA_HOME", os.path.expanduser("~/.local/share"))
+        data_dirs = os.environ.get("XDG_DATA_DIRS", "/usr/local/share:/usr/share").split(":")
+        dirs += [os.path.join(d, "fonts") for d in [data_home] + data_dirs]
+        dirs.append(os.path.expanduser("~/.fonts"))
+
+    result = []
+    for d in dirs:
+        d = os.path.normpath(d)
+        if os.path.isdir(d) and d not in result:
+            result.append(d)
+    return result
+
+
+def default_cache_path():
+    """Index file location; LABEL_FONT_CACHE overrides it."""
+    if os.environ.get("LABEL_FONT_CACHE"):
+        return os.environ["LABEL_FONT_CACHE"]
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "stiker-label", "font_index.json")
+
+
+# -- cmap parsing --
+
+def _face_offsets(f):
+    """Returns the table directory offset of each face in a font file or collection."""
+    header = f.read(12)
+    if header[:4] == b"ttcf":
+        count = struct.unpack(">I", header[8:12])[0]
+        return list(struct.unpack(f">{count}I", f.read(4 * count)))
+    return [0]
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _cmap_format4(data):
+    seg_count = struct.unpack(">H", data[6:8])[0] // 2
+    ends = struct.unpack(f">{seg_count}H", data[14:14 + 2 * seg_count])
+    pos = 16 + 2 * seg_count
+    starts = struct.unpack(f">{seg_count}H", data[pos:pos + 2 * seg_count])
+    pos += 2 * seg_count
+    deltas = struct.unpack(f">{seg_count}h", data[pos:pos + 2 * seg_count])
+    range_pos = pos + 2 * seg_count
+    range_offsets = struct.unpack(f">{seg_count}H", data[range_pos:range_pos + 2 * seg_count])
+
+    ranges = []
+    for i in range(seg_count):
+        start, end = starts[i], ends[i]
+        if start == 0xFFFF:
+            continue
+        if range_offsets[i] == 0:
+            ranges.append((start, end))
+            continue
+        # Glyph ids come from glyphIdArray; 0 means the codepoint is not covered
+        base = range_pos + 2 * i + range_offsets[i]
+        for code in range(start, end + 1):
+            at = base + 2 * (code - start)
+            if at + 2 <= len(data) and struct.unpack(">H", data[at:at + 2])[0]:
+                ranges.append((code, code))
+    return ranges
+
+
+def _cmap_format12(data):
+    groups = struct.unpack(">I", data[12:16])[0]
+    ranges = []
+    for i in range(groups):
+        start, end, _ = struct.unpack(">III", data[16 + 12 * i:28 + 12 * i])
+        ranges.append((start, end))
+    return ranges
+
+
+# (platform, encoding) subtables in order of preference
+_CMAP_PREFERENCE = [(3, 10), (0, 6), (0, 4), (3, 1), (0, 3), (0, 2), (0, 1), (0, 0), (3, 0)]
+
+
+def read_codepoints(f, face_offset):
+    """Returns the codepoints a face maps, as merged [start, end] ranges."""
+    f.seek(face_offset + 4)
+    num_tables = struct.unpack(">H", f.read(2))[0]
+    f.seek(face_offset + 12)
+    directory = f.read(16 * num_tables)
+    cmap_offset = None
+    for i in range(num_tables):
+        tag, _, offset, _ = struct.unpack(">4sIII", directory[16 * i:16 * i + 16])
+        if tag == b"cmap":
+            cmap_offset = offset
+    if cmap_offset is None:
+        return []
+
+    f.seek(cmap_offset)
+    _, count = struct.unpack(">HH", f.read(4))
+    subtables = {}
+    for _ in range(count):
+        platform, encoding, offset = struct.unpack(">HHI", f.read(8))
+        subtables.setdefault((platform, encoding), offset)
+
+    for key in _CMAP_PREFERENCE:
+        if key not in subtables:
+            continue
+        f.seek(cmap_offset + subtables[key])
+        fmt = struct.unpack(">H", f.read(2))[0]
+        if fmt == 4:
+            length = struct.unpack(">H", f.read(2))[0]
+            f.seek(-4, os.SEEK_CUR)
+            return _merge_ranges(_cmap_format4(f.read(length)))
+        if fmt == 12:
+            f.read(2)
+            length = struct.unpack(">I", f.read(4))[0]
+            f.seek(-8, os.SEEK_CUR)
+            return _merge_ranges(_cmap_format12(f.read(length)))
+    return []
+
+
+class FontRecord:
+    """One font face: where it lives, its names and the codepoints it covers."""
+    __slots__ = ('path', 'index', 'family', 'style', 'mtime', 'size', 'codepoints', '_starts')
+
+    def __init__(self, path, index, family, style, mtime, size, codepoints):
+        self.path = path
+        self.index = index
+        self.family = family
+        self.style = style
+        self.mtime = mtime
+        self.size = size
+        # Sorted, merged [start, end] ranges
+        self.codepoints = codepoints
+        self._starts = [r[0] for r in codepoints]
+
+    @property
+    def name(self):
+        """File name, the form font settings use (e.g. "arial.ttf")."""
+        return os.path.basename(self.path)
+
+    def covers(self, codepoint):
+        i = bisect.bisect_right(self._starts, codepoint) - 1
+        return i >= 0 and codepoint <= self.codepoints[i][1]
+
+    def to_dict(self):
+        return {'path': self.path, 'index': self.index, 'family': self.family, 'style': self.style,
+                'mtime': self.mtime, 'size': self.size, 'codepoints': self.codepoints}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['path'], data.get('index', 0), data['family'], data['style'],
+                   data['mtime'], data['size'], [list(r) for r in data['codepoints']])
+
+    def __repr__(self):
+        return f"<FontRecord {self.family} {self.style} {self.name}>"
+
+
+def scan_file(path):
+    """Parses every face of a font file into FontRecords."""
+    st = os.stat(path)
+    records = []
+    with open(path, "rb") as f:
+        for index, offset in enumerate(_face_offsets(f)):
+            try:
+                family, style = ImageFont.truetype(path, 12, index=index).getname()
+            except OSError as e:
+                logger.debug(f"Skipping face {index} of {path}: {e}")
+                continue
+            records.append(FontRecord(path, index, family or os.path.basename(path), style or "",
+                                      st.st_mtime_ns, st.st_size, read_codepoints(f, offset)))
+    return records
+
+
+class FontIndex:
     """
-    Returns a list of available system fonts (TTF/OTF).
-    Focuses on standard Windows font directory.
-    Differs by returns a list of dictionaries: {'name': 'Arial', 'path': '...'} or just names if standard.
-    For simplicity, we return a list of paths or names that PIL can load.
+    Persistent index of installed fonts.
+    load() reads the cached index; refresh() rescans in the background and re-parses only
+    new or modified files, then saves the index if anything changed.
     """
-    font_dir = r"C:\Windows\Fonts"
-    fonts = []
-    
-    # Common useful fonts to prioritize
-    priority_fonts = ["arial.ttf", "calibri.ttf", "seguisym.ttf", "seguiemj.ttf", "times.ttf", "verdana.ttf", "tahoma.ttf"]
-    
-    # Check priority fonts first
-    for f in priority_fonts:
-        path = os.path.join(font_dir, f)
-        if os.path.exists(path):
-            fonts.append(f) # Just filename is often enough for PIL on Windows if installed
-    
-    # Scan for others (limit to avoid overwhelmed UI)
-    try:
-        all_ttfs = glob.glob(os.path.join(font_dir, "*.ttf"))
-        for path in all_ttfs[:50]: # Limit to 50 for performance
-            filename = os.path.basename(path)
-            if filename not in fonts:
-                fonts.append(filename)
-    except Exception as e:
-        print(f"Error scanning fonts: {e}")
-        
-    return sorted(fonts)
+
+    def __init__(self, cache_path=None, dirs=None):
+        self.cache_path = cache_path or default_cache_path()
+        self.dirs = dirs
+        # path -> [FontRecord] (one per face)
+        self._files = {}
+        self._lock = threading.Lock()
+        self._pending = None
+        self.generation = 0
+
+    def load(self):
+        """Reads the on-disk index; returns the number of faces loaded."""
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get('version') != CACHE_VERSION:
+                return 0
+            files = {}
+            for entry in data.get('fonts', []):
+                record = FontRecord.from_dict(entry)
+                files.setdefault(record.path, []).append(record)
+        except (OSError, ValueError, KeyError) as e:
+            logger.debug(f"No usable font index at {self.cache_path}: {e}")
+            return 0
+        with self._lock:
+            self._files = files
+            self.generation += 1
+        return sum(len(r) for r in files.values())
+
+    def save(self):
+        with self._lock:
+            fonts = [r.to_dict() for records in self._files.values() for r in records]
+        directory = os.path.dirname(self.cache_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # A private temporary file, so processes saving at the same time (parallel batch
+        # workers) each replace the index with a complete file
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, suffix=".tmp",
+                                         delete=False) as f:
+            tmp_path = f.name
+            try:
+                json.dump({'version': CACHE_VERSION, 'fonts': fonts}, f)
+            except BaseException:
+                f.close()
+                os.remove(tmp_path)
+                raise
+        os.replace(tmp_path, self.cache_path)
+
+    def _font_files(self):
+        for directory in (self.dirs if self.dirs is not None else font_dirs()):
+            for root, _, names in os.walk(directory):
+                for name in names:
+                    if name.lower().endswith(FONT_EXTENSIONS):
+                        yield os.path.join(root, name)
+
+    def scan(self):
+        """Synchronously brings the index up to date; returns True if anything changed."""
+        started = time.perf_counter()
+        with self._lock:
+            known = dict(self._files)
+        files = {}
+        parsed = 0
+        for path in self._font_files():
+            try:
+                st = os.stat(path)
+                records = known.get(path)
+                if records and (records[0].mtime, records[0].size) == (st.st_mtime_ns, st.st_size):
+                    files[path] = records
+                    continue
+                files[path] = scan_file(path)
+                parsed += 1
+            except (OSError, struct.error) as e:
+                logger.debug(f"Skipping font {path}: {e}")
+        changed = parsed > 0 or files.keys() != known.keys()
+        with self._lock:
+            self._files = files
+            if changed:
+                self.generation += 1
+        if changed:
+            try:
+                self.save()
+            except OSError as e:
+                logger.warning(f"Could not save font index to {self.cache_path}: {e}")
+        logger.info(f"Font index: {len(files)} files, {parsed} parsed in {time.perf_counter() - started:.2f}s")
+        return changed
+
+    def refresh(self):
+        """Rescans on a background thread; returns a Future that resolves to scan()'s result."""
+        with self._lock:
+            if self._pending is not None and not self._pending.done():
+                return self._pending
+            future = self._pending = Future()
+
+        def run():
+            try:
+                future.set_result(self.scan())
+            except Exception as e:
+                logger.error(f"Font scan failed: {e}", exc_info=True)
+                future.set_exception(e)
+
+        threading.Thread(target=run, name="font-scan", daemon=True).start()
+        return future
+
+    def records(self):
+        with self._lock:
+            return [r for records in self._files.values() for r in records]
+
+    def names(self):
+        """
+        Every installed font, priority fonts first, for font pickers. Fonts are listed by
+        file name; when several directories hold the same file name, by full path.
+        """
+        paths = {r.path for r in self.records()}
+        counts = {}
+        for path in paths:
+            key = os.path.basename(path).lower()
+            counts[key] = counts.get(key, 0) + 1
+        names = sorted((os.path.basename(p) if counts[os.path.basename(p).lower()] == 1 else p for p in paths),
+                       key=str.lower)
+        first = [n for n in PRIORITY_FONTS if n in names]
+        return first + [n for n in names if n not in first]
+
+    def find(self, name):
+        """Returns the first face whose file name or path matches name, or None."""
+        for record in self.records():
+            if name in (record.path, record.name) or name.lower() == record.name.lower():
+                return record
+        return None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index(scan=True):
+    """
+    Returns the process-wide FontIndex, loaded from its cache on first use. When there is
+    no cache yet (first run, headless use) it is built by a synchronous scan, so glyph
+    fallback works from the first label; pass scan=False to refresh() in the background
+    instead, as the UI does.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = FontIndex()
+            if not _index.load() and scan:
+                _index.scan()
+        return _index
+
+
+def get_system_fonts():
+    """Returns the names of every installed font, from the index."""
+    return get_index().names()
@@ -0,0 +1,231 @@
+"""
+Content-addressed store of decoded images.
+
+Image elements reference their pixels through this store: each unique file content is
+decoded once and the same Image object is shared by every element (and duplicate) that
+uses it. Shared images are treated as immutable - rasterizing always works on resized
+copies - so nothing may draw on them in place.
+
+Callers can bound the decoded size (max_size): JPEGs are then decoded at a reduced DCT
+scale and other formats reduced right after decoding, so a 24-megapixel photo placed on
+a small label never exists in memory at full size. resize() resamples from a cached
+half-size pyramid of the source, so shrinking a large image stays cheap.
+"""
+import hashlib
+import io
+import os
+import threading
+import weakref
+import logging
+from collections import OrderedDict, deque
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Decoded pixels kept alive by the store itself; elements holding a reference keep theirs
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Remembered file stats, so unchanged files are not re-hashed; least recently used go first
+DEFAULT_MAX_PATHS = 4096
+
+
+def content_key(data):
+    """Returns the content address of an encoded image file."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def image_bytes(image):
+    """Approximate memory held by a decoded image."""
+    return image.width * image.height * len(image.getbands())
+
+
+class AssetStore:
+    """Bounded LRU store of decoded RGBA images keyed by file content."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_paths=DEFAULT_MAX_PATHS):
+        self.max_bytes = max_bytes
+        self.max_paths = max_paths
+        # content key -> decoded image
+        self._images = OrderedDict()
+        # path -> (mtime_ns, size, content key), so unchanged files are not re-hashed
+        self._paths = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _key_for_path(self, path):
+        st = os.stat(path)
+        with self._lock:
+            known = self._paths.get(path)
+            if known is not None:
+                self._paths.move_to_end(path)
+        if known is not None and known[:2] == (st.st_mtime_ns, st.st_size):
+            return known[2], None
+        with open(path, "rb") as f:
+            data = f.read()
+        key = content_key(data)
+        with self._lock:
+            self._paths[path] = (st.st_mtime_ns, st.st_size, key)
+            self._paths.move_to_end(path)
+            while len(self._paths) > self.max_paths:
+                self._paths.popitem(last=False)
+        return key, data
+
+    def load(self, path, max_size=None):
+        """
+        Returns the shared decoded image for a file, decoding it only once per content.
+        max_size (width, height) bounds the decoded size, keeping the aspect ratio.
+        """
+        key, data = self._key_for_path(path)
+        if max_size is not None:
+            max_size = (int(max_size[0]), int(max_size[1]))
+            key = (key, max_size)
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return image
+            self.misses += 1
+
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+        image = self._decode(data, max_size)
+        return self._add(key, image)
+
+    def _decode(self, data, max_size=None):
+        image = Image.open(io.BytesIO(data))
+        if max_size is not None and (image.width > max_size[0] or image.height > max_size[1]):
+            full_size = image.size
+            # JPEG: decode at the smallest DCT scale still covering max_size (no-op otherwise)
+            image.draft(None, max_size)
+            image.load()
+            image.thumbnail(max_size, Image.Resampling.LANCZOS)
+            logger.debug(f"Decoded {full_size[0]}x{full_size[1]} image at {image.width}x{image.height}")
+        return image.convert("RGBA")
+
+    def _add(self, key, image):
+        with self._lock:
+            existing = self._images.get(key)
+            if existing is not None:
+                # Another thread decoded the same content first
+                return existing
+            self._images[key] = image
+            self.bytes += image_bytes(image)
+            self._evict()
+        return image
+
+    def _evict(self):
+        # Always keep the newest entry, even if it alone is over budget
+        while self.bytes > self.max_bytes and len(self._images) > 1:
+            _, image = self._images.popitem(last=False)
+            self.bytes -= image_bytes(image)
+            self.evictions += 1
+
+    def info(self):
+        """Returns hit/miss counters and current occupancy."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._images),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self._paths.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+class ImagePyramid:
+    """
+    Successive half-size reductions of a source image, built on demand.
+    The source itself is not referenced, so the pyramid dies with it.
+    """
+
+    def __init__(self):
+        # levels[i] is the source reduced 2 ** (i + 1) times
+        self.levels = []
+        self._lock = threading.Lock()
+
+    def level_for(self, image, size):
+        """Returns the smallest level (or image) at least `size` in both dimensions."""
+        with self._lock:
+            best = image
+            for level in self.levels:
+                if level.width < size[0] or level.height < size[1]:
+                    return best
+                best = level
+            # Keep halving while the next level would still cover the target
+            while best.width >= 2 * size[0] and best.height >= 2 * size[1] and min(best.size) >= 2:
+                best = best.reduce(2)
+                self.levels.append(best)
+            return best
+
+
+# id(image) -> (weak reference to image, ImagePyramid); PIL images are not hashable
+_pyramids = {}
+_pyramids_lock = threading.Lock()
+# (id, weak reference) of collected images. Weakref callbacks run wherever GC happens,
+# possibly on a thread holding _pyramids_lock, so they only queue the entry for removal.
+_collected = deque()
+
+
+def _forget_collected():
+    """Drops the entries of collected images; call with _pyramids_lock held."""
+    while _collected:
+        key, ref = _collected.popleft()
+        entry = _pyramids.get(key)
+        if entry is not None and entry[0] is ref:
+            del _pyramids[key]
+
+
+def pyramid(image):
+    """Returns the shared ImagePyramid of an image."""
+    key = id(image)
+    with _pyramids_lock:
+        _forget_collected()
+        entry = _pyramids.get(key)
+        if entry is not None and entry[0]() is image:
+            return entry[1]
+        levels = ImagePyramid()
+
+        def collected(ref, key=key, levels=levels):
+            # Lock-free: release the reductions now, the entry on the next pyramid() call
+            levels.levels = []
+            _collected.append((key, ref))
+
+        _pyramids[key] = (weakref.ref(image, collected), levels)
+        return levels
+
+
+def resize(image, size, resample=Image.Resampling.LANCZOS):
+    """Resizes an image, starting from the nearest pyramid level that is still large enough."""
+    source = pyramid(image).level_for(image, size)
+    return source.resize(size, resample)
+
+
+# Shared by every LabelDesigner in the process
+_store = AssetStore()
+
+
+def load_image(path, max_size=None):
+    """Returns the shared decoded image for a file from the process-wide store."""
+    return _store.load(path, max_size)
+
+
+def store_info():
+    return _store.info()
+
+
+def clear_store():
+    _store.clear()
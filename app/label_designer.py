@@ -1,135 +1,624 @@
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageChops
 import os
 import logging
 import json
+from . import font_cache
+from . import font_fallback
+from . import text_layout
+from . import batch
+from . import image_assets
+from . import barcodes
+from .elements import TextElement, ImageElement, BarcodeElement, QRCodeElement, element_from_dict
 
 logger = logging.getLogger(__name__)
 
+# Element type -> symbology of barcode elements
+SYMBOLOGIES = {'barcode': barcodes.CODE128, 'qr': barcodes.QR}
+
+# Counter-clockwise rotations that are exact pixel transposes
+_QUARTER_TURNS = {
+    90: Image.Transpose.ROTATE_90,
+    180: Image.Transpose.ROTATE_180,
+    270: Image.Transpose.ROTATE_270,
+}
+
+# Scratch surface used only for text measurement
+_MEASURE_DRAW = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+
+def _coalesce_rects(rects):
+    """Merges overlapping rectangles so shared areas are repainted once."""
+    merged = []
+    for rect in rects:
+        rect = tuple(rect)
+        overlapping = True
+        while overlapping:
+            overlapping = False
+            for other in merged:
+                if rect[0] < other[2] and other[0] < rect[2] and rect[1] < other[3] and other[1] < rect[3]:
+                    merged.remove(other)
+                    rect = (min(rect[0], other[0]), min(rect[1], other[1]),
+                            max(rect[2], other[2]), max(rect[3], other[3]))
+                    overlapping = True
+                    break
+        merged.append(rect)
+    return merged
+
+COLOR_MODES = ("RGB", "L", "1")
+DITHER_METHODS = ("threshold", "ordered", "floyd-steinberg")
+
+# 8x8 Bayer matrix for ordered dithering
+_BAYER_8 = [
+    [0, 32, 8, 40, 2, 34, 10, 42],
+    [48, 16, 56, 24, 50, 18, 58, 26],
+    [12, 44, 4, 36, 14, 46, 6, 38],
+    [60, 28, 52, 20, 62, 30, 54, 22],
+    [3, 35, 11, 43, 1, 33, 9, 41],
+    [51, 19, 59, 27, 49, 17, 57, 25],
+    [15, 47, 7, 39, 13, 45, 5, 37],
+    [63, 31, 55, 23, 61, 29, 53, 21],
+]
+_BAYER_TILE = Image.new("L", (8, 8))
+_BAYER_TILE.putdata([int((v + 0.5) * 4) for row in _BAYER_8 for v in row])
+
+
+def dither(gray, method="threshold", threshold=128):
+    """Returns a mode "L" image of only black and white pixels."""
+    if method == "floyd-steinberg":
+        return gray.convert("1", dither=Image.Dither.FLOYDSTEINBERG).convert("L")
+    if method == "ordered":
+        strip = Image.new("L", (gray.width, 8))
+        for x in range(0, gray.width, 8):
+            strip.paste(_BAYER_TILE, (x, 0))
+        tiles = Image.new("L", gray.size)
+        for y in range(0, gray.height, 8):
+            tiles.paste(strip, (0, y))
+        # subtract() clips at 0, so anything left is brighter than its threshold cell
+        return ImageChops.subtract(gray, tiles).point(lambda v: 255 if v > 0 else 0)
+    return gray.point(lambda v: 255 if v >= threshold else 0)
+
+
+# Largest image scale the designer offers; images are decoded no larger than this needs
+MAX_SCALE = 3.0
+
+
+class StaticLayer:
+    """Background raster of the bottom `count` elements, shared by every label of a run."""
+    __slots__ = ('image', 'count', 'boxes')
+
+    def __init__(self, image, count, boxes):
+        self.image = image
+        self.count = count
+        self.boxes = boxes
+
+class DesignSnapshot:
+    """
+    A frozen copy of a design (elements plus render settings) that can be rendered on any
+    thread while the original keeps being edited. Source images are shared, not copied.
+    """
+    __slots__ = ('width_mm', 'height_mm', 'dpi', 'color_mode', 'threshold', 'dither', 'draft',
+                 'elements', 'version')
+
+    def __init__(self, designer, version=0):
+        for name in ('width_mm', 'height_mm', 'dpi', 'color_mode', 'threshold', 'dither', 'draft'):
+            object.__setattr__(self, name, getattr(designer, name))
+        object.__setattr__(self, 'elements', tuple(el.copy() for el in designer.elements))
+        object.__setattr__(self, 'version', version)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("DesignSnapshot is immutable")
+
+    def to_image(self):
+        """Renders the snapshot (1-bit in color_mode "1"); lets it be queued for printing."""
+        return LabelDesigner.from_snapshot(self).get_image()
+
+
+def _element_changed(old, new):
+    """True if new differs from old in any field; runtime objects are compared by identity."""
+    if type(old) is not type(new) or old.extra != new.extra:
+        return True
+    if any(getattr(old, key) != getattr(new, key) for key in new.FIELDS):
+        return True
+    return any(getattr(old, key) is not getattr(new, key) for key in new.RUNTIME_FIELDS)
+
+
 class LabelDesigner:
-    def __init__(self, width_mm=50.8, height_mm=31, dpi=203):
+    def __init__(self, width_mm=50.8, height_mm=31, dpi=203, color_mode="RGB"):
         self.width_mm = width_mm
         self.height_mm = height_mm
         self.dpi = dpi
         self.width_px = int(self.width_mm * (self.dpi / 25.4))
         self.height_px = int(self.height_mm * (self.dpi / 25.4))
         
+        # Elements in z-order (bottom first), plus an id -> element index
         self.elements = []
+        self._index = {}
         self.next_id = 1
+        # element id -> (raster key, source image, RGBA raster)
+        self._raster_cache = {}
+        self.raster_hits = 0
+        self.raster_misses = 0
+        # element id -> (x0, y0, x1, y1) of its last painted raster
+        self._boxes = {}
+        # Repaint only damaged rectangles after single-element edits
+        self.incremental_render = True
+        # "RGB" composites in color; "L" and "1" composite in grayscale, and "1" also
+        # thresholds the result to a 1-bit bitmap (see get_monochrome)
+        if color_mode not in COLOR_MODES:
+            raise ValueError(f"Unknown color mode: {color_mode}")
+        self.color_mode = color_mode
+        self.threshold = 128
+        # Default dithering for image elements in monochrome modes (element 'dither' overrides)
+        self.dither = "floyd-steinberg"
+        # Draft quality: fast image resampling for live previews (see set_draft)
+        self.draft = False
+        # Wrapping and auto-fit for text elements with a box, with memoized glyph metrics
+        self.text_layout = text_layout.TextLayout()
+        # Glyph fallback for characters the element's font lacks (None = single font)
+        self.font_fallback = font_fallback.get_fallback()
+        # Edits repaint the canvas immediately; turn off when a RenderWorker renders snapshots
+        self.live_render = True
+        self._snapshot_version = 0
         self.render()
         logger.info(f"LabelDesigner initialized. Dimensions: {self.width_px}x{self.height_px} px")
 
-    def render(self):
-        """Re-draws all elements onto the canvas."""
-        self.image = Image.new("RGB", (self.width_px, self.height_px), "white")
+    def render(self, static_layer=None):
+        """
+        Re-draws all elements onto the canvas.
+        With a StaticLayer from prepare_static_layer(), starts from its pre-composited
+        background and only draws the elements above it.
+        """
+        if static_layer is not None:
+            self.image = static_layer.image.copy()
+            self._boxes = dict(static_layer.boxes)
+            elements = self.elements[static_layer.count:]
+        else:
+            self.image = Image.new(self._canvas_mode(), (self.width_px, self.height_px), "white")
+            self._boxes = {}
+            elements = self.elements
         self.draw = ImageDraw.Draw(self.image)
-        
+        self._composite(self.image, elements, self._boxes)
+
+    def _composite(self, canvas, elements, boxes):
+        """Pastes element rasters onto canvas in order, recording their boxes."""
+        for el in elements:
+            try:
+                raster = self.get_raster(el)
+                if raster is not None:
+                    # Paste using alpha channel as mask
+                    canvas.paste(raster, (el.x, el.y), raster)
+                    boxes[el.id] = (el.x, el.y, el.x + raster.width, el.y + raster.height)
+            except Exception as e:
+                logger.error(f"Error rendering element {el.id}: {e}", exc_info=True)
+
+    def prepare_static_layer(self, variable_ids):
+        """
+        Pre-composites the elements below the first variable element into a background.
+        Elements stacked above a variable one stay per-label so z-order is preserved.
+        The layer is only valid until the design is edited.
+        """
+        variable_ids = set(variable_ids)
+        count = len(self.elements)
+        for i, el in enumerate(self.elements):
+            if el.id in variable_ids:
+                count = i
+                break
+
+        background = Image.new(self._canvas_mode(), (self.width_px, self.height_px), "white")
+        boxes = {}
+        self._composite(background, self.elements[:count], boxes)
+        logger.debug(f"Static layer: {count} pre-composited, {len(self.elements) - count} per label")
+        return StaticLayer(background, count, boxes)
+
+    def render_dirty(self, element_ids):
+        """Repaints only the old and new areas of the given elements, in z-order."""
+        damaged = []
+        for element_id in element_ids:
+            old_box = self._boxes.pop(element_id, None)
+            if old_box is not None:
+                damaged.append(old_box)
+            el = self.get_element(element_id)
+            if el is None:
+                continue
+            try:
+                raster = self.get_raster(el)
+            except Exception as e:
+                logger.error(f"Error rendering element {element_id}: {e}", exc_info=True)
+                continue
+            if raster is not None:
+                new_box = (el.x, el.y, el.x + raster.width, el.y + raster.height)
+                self._boxes[element_id] = new_box
+                damaged.append(new_box)
+
+        for rect in _coalesce_rects(damaged):
+            self._repaint_rect(rect)
+
+    def _repaint_rect(self, rect):
+        x0, y0 = max(rect[0], 0), max(rect[1], 0)
+        x1, y1 = min(rect[2], self.width_px), min(rect[3], self.height_px)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        # Rebuild the region from the background up, then drop it into the canvas
+        region = Image.new(self._canvas_mode(), (x1 - x0, y1 - y0), "white")
         for el in self.elements:
+            box = self._boxes.get(el.id)
+            if box is None or box[2] <= x0 or box[0] >= x1 or box[3] <= y0 or box[1] >= y1:
+                continue
             try:
-                # Common rotation
-                rotation = el.get('rotation', 0)
+                raster = self.get_raster(el)
+                region.paste(raster, (el.x - x0, el.y - y0), raster)
+            except Exception as e:
+                logger.error(f"Error rendering element {el.id}: {e}", exc_info=True)
+        self.image.paste(region, (x0, y0))
 
-                if el['type'] == 'text':
-                    try:
-                        font_name = el.get('font', 'arial.ttf')
-                        font = ImageFont.truetype(font_name, el['font_size'])
-                    except IOError:
-                        font = ImageFont.load_default()
-                    
-                    # Create mask image for text
-                    dummy_draw = ImageDraw.Draw(Image.new("RGB", (1,1)))
-                    bbox = dummy_draw.textbbox((0, 0), el['content'], font=font)
-                    text_w = bbox[2] - bbox[0]
-                    text_h = bbox[3] - bbox[1]
-                    
-                    # Create RGBA image to hold text
-                    # Use exact bounding box dimensions (bbox[1] can be negative, so we must shift by -bbox[1])
-                    txt_img = Image.new("RGBA", (text_w, text_h), (255, 255, 255, 0))
-                    d = ImageDraw.Draw(txt_img)
-                    # Draw text in black, shifted so top-left of ink is at (0,0)
-                    d.text((-bbox[0], -bbox[1]), el['content'], fill="black", font=font)
-                    
-                    # Rotate
-                    if rotation != 0:
-                        txt_img = txt_img.rotate(rotation, expand=True, resample=Image.Resampling.BICUBIC)
-                    
-                    # Paste using alpha channel as mask
-                    self.image.paste(txt_img, (el['x'], el['y']), txt_img)
+    def _refresh(self, *element_ids):
+        """Brings the canvas up to date after the given elements changed."""
+        if not self.live_render:
+            return
+        if self.incremental_render:
+            self.render_dirty(element_ids)
+        else:
+            self.render()
+
+    def snapshot(self):
+        """Returns an immutable DesignSnapshot of the current design; versions increase."""
+        self._snapshot_version += 1
+        return DesignSnapshot(self, self._snapshot_version)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Builds a designer rendering the given snapshot."""
+        designer = cls(snapshot.width_mm, snapshot.height_mm, snapshot.dpi, snapshot.color_mode)
+        designer.load_snapshot(snapshot)
+        return designer
+
+    def load_snapshot(self, snapshot):
+        """
+        Replaces the design with a snapshot's. Only the elements that differ from the
+        current design are repainted, on a copy of the canvas so an image handed out
+        earlier never changes; new render settings or a new z-order re-render everything.
+        Cached rasters of unchanged elements are reused.
+        """
+        if (snapshot.width_mm, snapshot.height_mm, snapshot.dpi) != (self.width_mm, self.height_mm, self.dpi):
+            raise ValueError("Snapshot label size does not match this designer")
+        settings = (snapshot.color_mode, snapshot.threshold, snapshot.dither, snapshot.draft)
+        same_settings = settings == (self.color_mode, self.threshold, self.dither, self.draft)
+        self.color_mode, self.threshold, self.dither, self.draft = settings
+
+        previous = self._index
+        previous_order = [el.id for el in self.elements]
+        # Copy again: rasterizing may fill in fields the snapshot must not see change
+        self.elements = [el.copy() for el in snapshot.elements]
+        self._index = {el.id: el for el in self.elements}
+        for element_id in set(self._raster_cache) - set(self._index):
+            del self._raster_cache[element_id]
+
+        kept_before = [element_id for element_id in previous_order if element_id in self._index]
+        kept_now = [el.id for el in self.elements if el.id in previous]
+        if not (self.incremental_render and same_settings and kept_before == kept_now):
+            self.render()
+            return
+        changed = [el.id for el in self.elements
+                   if el.id not in previous or _element_changed(previous[el.id], el)]
+        changed += [element_id for element_id in previous_order if element_id not in self._index]
+        if changed:
+            self.image = self.image.copy()
+            self.draw = ImageDraw.Draw(self.image)
+            self.render_dirty(changed)
+
+    @property
+    def font_fallback(self):
+        return self.text_layout.fallback
+
+    @font_fallback.setter
+    def font_fallback(self, fallback):
+        # Boxed text is wrapped and fitted with the same fallback fonts it is drawn with
+        self.text_layout.fallback = fallback
+
+    def _canvas_mode(self):
+        return "RGB" if self.color_mode == "RGB" else "L"
+
+    def set_color_mode(self, color_mode, threshold=None, dither=None):
+        """Switches between color and monochrome compositing and re-renders."""
+        if color_mode not in COLOR_MODES:
+            raise ValueError(f"Unknown color mode: {color_mode}")
+        if dither is not None and dither not in DITHER_METHODS:
+            raise ValueError(f"Unknown dither method: {dither}")
+        self.color_mode = color_mode
+        if threshold is not None:
+            self.threshold = int(threshold)
+        if dither is not None:
+            self.dither = dither
+        self.render()
+
+    def set_draft(self, draft):
+        """
+        Draft mode resamples images with BILINEAR instead of LANCZOS, for previews while a
+        slider is dragged. Leaving it re-renders the elements drawn at draft quality.
+        """
+        draft = bool(draft)
+        if draft == self.draft:
+            return
+        self.draft = draft
+        if not draft:
+            stale = [el.id for el in self.elements
+                     if el.id in self._raster_cache and self._raster_cache[el.id][0] != self._raster_key(el)]
+            if stale:
+                self._refresh(*stale)
+
+    def _element_dither(self, el):
+        return el.get('dither') or self.dither
+
+    def _raster_key(self, el):
+        """Returns the visual properties that determine an element's raster (position excluded)."""
+        rotation = el.get('rotation', 0)
+        if el['type'] == 'text':
+            box = (el.get('box_width'), el.get('box_height'), el.get('align'), el.get('fit'))
+            # Fallback choices change when the font index does
+            fonts = self.font_fallback.generation if self.font_fallback is not None else None
+            return ('text', el['content'], el.get('font', 'arial.ttf'), el['font_size'], rotation,
+                    box, self.color_mode, fonts)
+        elif el['type'] == 'image':
+            mono = (self.threshold, self._element_dither(el)) if self.color_mode != "RGB" else None
+            return ('image', el.get('path'), el.get('base_width'), el.get('base_height'),
+                    el.get('scale', 1.0), rotation, self.color_mode, mono, self.draft)
+        elif el['type'] == 'barcode':
+            text = (el.get('font', 'arial.ttf'), el.get('font_size')) if el.get('show_text') else None
+            return ('barcode', el['value'], self.module_dots(el), self._mm_to_dots(el['height_mm']),
+                    text, rotation, self.color_mode)
+        elif el['type'] == 'qr':
+            return ('qr', el['value'], el.get('ec_level', 'M'), self.module_dots(el), rotation,
+                    self.color_mode)
+        return (el['type'], self.color_mode)
+
+    def get_raster(self, el):
+        """Returns the ready-to-paste RGBA raster of an element, re-rasterizing only when it changed."""
+        key = self._raster_key(el)
+        source = el.get('img_object')
+        cached = self._raster_cache.get(el.id)
+        # The source asset is compared by identity: Image.__eq__ compares pixels
+        if cached is not None and cached[0] == key and cached[1] is source:
+            self.raster_hits += 1
+            return cached[2]
+
+        self.raster_misses += 1
+        raster = self._rasterize(el)
+        if raster is not None and self.color_mode != "RGB":
+            raster = self._to_gray_raster(el, raster)
+        # Re-read key/source: rasterizing may fill in base size or load the image
+        self._raster_cache[el.id] = (self._raster_key(el), el.get('img_object'), raster)
+        return raster
+
+    def _rasterize(self, el):
+        # Common rotation
+        rotation = el.get('rotation', 0)
+
+        if el['type'] == 'text':
+            if el.get('box_width'):
+                txt_img = self._rasterize_text_box(el)
+            else:
+                bbox, runs = self.layout_text(el['content'], el.get('font', 'arial.ttf'), el['font_size'])
+                text_w = bbox[2] - bbox[0]
+                text_h = bbox[3] - bbox[1]
+
+                # Create RGBA image to hold text
+                # Use exact bounding box dimensions (bbox[1] can be negative, so we must shift by -bbox[1])
+                txt_img = Image.new("RGBA", (text_w, text_h), (255, 255, 255, 0))
+                d = ImageDraw.Draw(txt_img)
+                # Draw text in black, shifted so top-left of ink is at (0,0)
+                self._draw_runs(d, runs, (-bbox[0], -bbox[1]))
+            
+            # Rotate
+            if rotation != 0:
+                txt_img = txt_img.rotate(rotation, expand=True, resample=Image.Resampling.BICUBIC)
+            return txt_img
+        
+        elif el['type'] == 'image':
+            # Use cached image object if available, otherwise load (shouldn't happen if added correctly)
+            if 'img_object' in el:
+                img = el['img_object']
+            else:
+                img = self._load_asset(el['path'])
+                el['img_object'] = img # Cache it
+            
+            # Apply scaling
+            scale = el.get('scale', 1.0)
+            
+            # Base resize (fit to label height logic from before)
+            if 'base_width' not in el or 'base_height' not in el:
+                # Calculate base dimensions if not stored
+                img_ratio = img.width / img.height
+                target_h = self.height_px
+                target_w = int(target_h * img_ratio)
+                if target_w > self.width_px:
+                    target_w = self.width_px
+                    target_h = int(target_w / img_ratio)
+                el['base_width'] = target_w
+                el['base_height'] = target_h
+
+            final_w = int(el['base_width'] * scale)
+            final_h = int(el['base_height'] * scale)
+            
+            if final_w > 0 and final_h > 0:
+                resample = Image.Resampling.BILINEAR if self.draft else Image.Resampling.LANCZOS
+                img = image_assets.resize(img, (final_w, final_h), resample)
                 
-                elif el['type'] == 'image':
-                    # Use cached image object if available, otherwise load (shouldn't happen if added correctly)
-                    if 'img_object' in el:
-                        img = el['img_object'].copy()
-                    else:
-                        img = Image.open(el['path']).convert("RGBA")
-                        el['img_object'] = img.copy() # Cache it
-                    
-                    # Apply scaling
-                    scale = el.get('scale', 1.0)
-                    
-                    # Base resize (fit to label height logic from before)
-                    if 'base_width' not in el or 'base_height' not in el:
-                        # Calculate base dimensions if not stored
-                        img_ratio = img.width / img.height
-                        target_h = self.height_px
-                        target_w = int(target_h * img_ratio)
-                        if target_w > self.width_px:
-                            target_w = self.width_px
-                            target_h = int(target_w / img_ratio)
-                        el['base_width'] = target_w
-                        el['base_height'] = target_h
-
-                    final_w = int(el['base_width'] * scale)
-                    final_h = int(el['base_height'] * scale)
-                    
-                    if final_w > 0 and final_h > 0:
-                        img = img.resize((final_w, final_h), Image.Resampling.LANCZOS)
-                        
-                        # Rotate
-                        if rotation != 0:
-                            img = img.rotate(rotation, expand=True, resample=Image.Resampling.BICUBIC)
-
-                        # Paste with mask for transparency
-                        self.image.paste(img, (el['x'], el['y']), img)
-            except Exception as e:
-                logger.error(f"Error rendering element {el.get('id', '?')}: {e}", exc_info=True)
+                # Rotate
+                if rotation != 0:
+                    img = img.rotate(rotation, expand=True, resample=Image.Resampling.BICUBIC)
+                return img
+
+        elif el['type'] in SYMBOLOGIES:
+            img = self._rasterize_symbol(el)
+            # Quarter turns keep every module on whole dots; other angles stay unsmoothed
+            transpose = _QUARTER_TURNS.get(rotation % 360)
+            if transpose is not None:
+                img = img.transpose(transpose)
+            elif rotation % 360:
+                img = img.rotate(rotation, expand=True, resample=Image.Resampling.NEAREST)
+            return img
+        return None
+
+    def _mm_to_dots(self, mm):
+        return max(1, int(round(mm * self.dpi / 25.4)))
+
+    def module_dots(self, el):
+        """Module size of a barcode element in whole printer dots at this designer's dpi."""
+        return barcodes.module_dots(el['module_mm'], self.dpi)
+
+    def _rasterize_symbol(self, el):
+        """Scales the cached module image of a barcode element to whole dots per module."""
+        dots = self.module_dots(el)
+        if el['type'] == 'qr':
+            img = barcodes.render(barcodes.QR, el['value'], dots, level=el.get('ec_level', 'M'))
+            return img.convert("RGBA")
+
+        height = self._mm_to_dots(el['height_mm'])
+        img = barcodes.render(barcodes.CODE128, el['value'], dots, height)
+        if not el.get('show_text'):
+            return img.convert("RGBA")
+        # Human-readable value centered below the bars, on the symbol's white background
+        bbox, runs = self.layout_text(el['value'], el.get('font', 'arial.ttf'), el['font_size'])
+        gap = 2 * dots
+        canvas = Image.new("RGBA", (img.width, height + gap + bbox[3] - bbox[1]), "white")
+        canvas.paste(img, (0, 0))
+        x = (img.width - (bbox[2] - bbox[0])) // 2 - bbox[0]
+        self._draw_runs(ImageDraw.Draw(canvas), runs, (x, height + gap - bbox[1]))
+        return canvas
+
+    def layout_text_box(self, el):
+        """Returns the TextBlock (size and wrapped lines) of a boxed text element."""
+        return self.text_layout.layout(el['content'], el.get('font', 'arial.ttf'), el['font_size'],
+                                       el['box_width'], el.get('box_height'), bool(el.get('fit')))
+
+    def _rasterize_text_box(self, el):
+        """Renders wrapped, aligned (and auto-fitted) text into the element's box."""
+        block = self.layout_text_box(el)
+        font_name = el.get('font', 'arial.ttf')
+        width = int(el['box_width'])
+        height = int(el.get('box_height') or max(1, round(block.height)))
+        align = el.get('align', 'left')
+
+        img = Image.new("RGBA", (width, height), (255, 255, 255, 0))
+        d = ImageDraw.Draw(img)
+        for i, line in enumerate(block.lines):
+            if not line:
+                continue
+            bbox, runs = self.layout_text(line, font_name, block.size)
+            if align == 'center':
+                x = (width - (bbox[2] - bbox[0])) // 2 - bbox[0]
+            elif align == 'right':
+                x = width - bbox[2]
+            else:
+                x = 0
+            self._draw_runs(d, runs, (x, round(i * block.line_height)))
+        return img
+
+    def _to_gray_raster(self, el, raster):
+        """Converts an RGBA raster to "LA" for grayscale compositing; images are dithered here, once."""
+        gray, alpha = raster.convert("L"), raster.getchannel("A")
+        if el.type == 'image':
+            gray = dither(gray, self._element_dither(el), self.threshold)
+            alpha = alpha.point(lambda v: 255 if v >= 128 else 0)
+        # Text keeps its anti-aliased edges; get_monochrome() thresholds the composite
+        return Image.merge("LA", (gray, alpha))
+
+    def invalidate_raster(self, element_id=None):
+        """Drops cached rasters for one element, or all of them."""
+        if element_id is None:
+            self._raster_cache.clear()
+        else:
+            self._raster_cache.pop(element_id, None)
+
+    def raster_cache_info(self):
+        """Returns hit/miss counters of the per-element raster cache."""
+        return {
+            'hits': self.raster_hits,
+            'misses': self.raster_misses,
+            'size': len(self._raster_cache),
+        }
+
+    def measure_text(self, text, font):
+        """Returns the ink bounding box of text drawn at (0, 0)."""
+        return _MEASURE_DRAW.textbbox((0, 0), text, font=font)
+
+    def layout_text(self, text, font_name, font_size):
+        """
+        Returns (bbox, runs) for one line of text, with glyph fallback for characters the
+        font lacks. bbox is relative to the line's top-left origin, as for textbbox().
+        runs are (font, text, pen) for _draw_runs(); pen is None for single-font text,
+        else the run's baseline position.
+        """
+        runs = [(font_name, text)]
+        if self.font_fallback is not None:
+            runs = self.font_fallback.split_runs(text, font_name) or runs
+        if len(runs) == 1:
+            font = font_cache.get_font(runs[0][0], font_size)
+            return self.measure_text(text, font), [(font, text, None)]
+
+        # Runs share the primary font's baseline, so bboxes match the single-font case
+        baseline = font_cache.get_font(font_name, font_size).getmetrics()[0]
+        placed = []
+        bbox = None
+        x = 0
+        for name, run in runs:
+            font = font_cache.get_font(name, font_size)
+            box = _MEASURE_DRAW.textbbox((x, baseline), run, font=font, anchor="ls")
+            bbox = box if bbox is None else (min(bbox[0], box[0]), min(bbox[1], box[1]),
+                                             max(bbox[2], box[2]), max(bbox[3], box[3]))
+            placed.append((font, run, (x, baseline)))
+            x += int(round(font.getlength(run)))
+        return bbox, placed
+
+    def _draw_runs(self, draw, runs, origin):
+        """Draws layout_text() runs with the line's top-left origin at origin."""
+        ox, oy = origin
+        for font, run, pen in runs:
+            if pen is None:
+                draw.text((ox, oy), run, fill="black", font=font)
+            else:
+                # Color emoji fonts keep their colors
+                draw.text((ox + pen[0], oy + pen[1]), run, fill="black", font=font, anchor="ls",
+                          embedded_color=True)
+
+    def font_cache_info(self):
+        """Returns hit/miss counters of the shared font cache."""
+        return font_cache.cache_info()
+
+    def barcode_cache_info(self):
+        """Returns hit/miss counters of the shared barcode module cache."""
+        return barcodes.cache_info()
 
     def add_text(self, text, font_size=30, font_name="arial.ttf"):
         """Adds a new text element."""
-        try:
-             font = ImageFont.truetype(font_name, font_size)
-        except:
-             font = ImageFont.load_default()
-             
-        dummy_draw = ImageDraw.Draw(Image.new("RGB", (1,1)))
-        bbox = dummy_draw.textbbox((0, 0), text, font=font)
+        bbox, _ = self.layout_text(text, font_name, font_size)
         w = bbox[2] - bbox[0]
         h = bbox[3] - bbox[1]
         
         x = (self.width_px - w) // 2
         y = (self.height_px - h) // 2
         
-        element = {
-            'id': self.next_id,
-            'type': 'text',
-            'content': text,
-            'x': x,
-            'y': y,
-            'font_size': font_size,
-            'font': font_name,
-            'rotation': 0,
-            'name': f"Text {self.next_id}: {text[:10]}..."
-        }
-        self.elements.append(element)
+        element = TextElement(
+            id=self.next_id,
+            content=text,
+            x=x,
+            y=y,
+            font_size=font_size,
+            font=font_name,
+            rotation=0,
+            name=f"Text {self.next_id}: {text[:10]}..."
+        )
+        self._append_element(element)
         self.next_id += 1
-        self.render()
+        self._refresh(element['id'])
         logger.info(f"Added text element: {text}")
         return element
         
     def add_image(self, image_path):
         """Adds a new image element."""
         try:
-            # Load and cache immediately
-            img_head = Image.open(image_path).convert("RGBA")
+            # Decoded once per unique file and shared with other elements using it
+            img_head = self._load_asset(image_path)
             
             img_ratio = img_head.width / img_head.height
             target_h = self.height_px
@@ -142,86 +631,175 @@ class LabelDesigner:
             x = (self.width_px - target_w) // 2
             y = (self.height_px - target_h) // 2
             
-            element = {
-                'id': self.next_id,
-                'type': 'image',
-                'path': image_path,
-                'img_object': img_head, # CACHED HERE
-                'x': x,
-                'y': y,
-                'base_width': target_w,
-                'base_height': target_h,
-                'scale': 1.0,
-                'rotation': 0,
-                'name': f"Image {self.next_id}"
-            }
-            self.elements.append(element)
+            element = ImageElement(
+                id=self.next_id,
+                path=image_path,
+                img_object=img_head, # CACHED HERE
+                x=x,
+                y=y,
+                base_width=target_w,
+                base_height=target_h,
+                scale=1.0,
+                rotation=0,
+                name=f"Image {self.next_id}"
+            )
+            self._append_element(element)
             self.next_id += 1
-            self.render()
+            self._refresh(element['id'])
             logger.info(f"Added image element from: {image_path}")
             return element
         except Exception as e:
             logger.error(f"Error loading image: {e}", exc_info=True)
             return None
 
+    def add_barcode(self, value, module_mm=0.25, height_mm=10.0, show_text=True):
+        """Adds a Code 128 barcode; raises ValueError if value cannot be encoded."""
+        return self._add_symbol(BarcodeElement(id=self.next_id, value=value, module_mm=module_mm,
+                                               height_mm=height_mm, show_text=show_text, rotation=0))
+
+    def add_qr(self, value, module_mm=0.5, ec_level="M"):
+        """Adds a QR code; raises ValueError if value cannot be encoded."""
+        return self._add_symbol(QRCodeElement(id=self.next_id, value=value, module_mm=module_mm,
+                                              ec_level=ec_level, rotation=0))
+
+    def _check_symbol(self, el, value):
+        # Encoding fills the module cache, so the first render of a valid value is a hit
+        barcodes.module_image(SYMBOLOGIES[el.type], value, el.get('ec_level', 'M'))
+
+    def _symbol_name(self, el):
+        kind = "Barcode" if el.type == 'barcode' else "QR"
+        return f"{kind} {el.id}: {el.value[:10]}..."
+
+    def _add_symbol(self, element):
+        self._check_symbol(element, element.value)
+        element.name = self._symbol_name(element)
+        raster = self.get_raster(element)
+        element.x = (self.width_px - raster.width) // 2
+        element.y = (self.height_px - raster.height) // 2
+        self._append_element(element)
+        self.next_id += 1
+        self._refresh(element.id)
+        logger.info(f"Added {element.type} element: {element.value}")
+        return element
+
+    def _load_asset(self, path):
+        # Images are fitted to the label, so MAX_SCALE x the label size is all we can show
+        max_size = (int(self.width_px * MAX_SCALE), int(self.height_px * MAX_SCALE))
+        return image_assets.load_image(path, max_size)
+
     def update_element_position(self, element_id, x, y):
-        for el in self.elements:
-            if el['id'] == element_id:
-                el['x'] = int(x)
-                el['y'] = int(y)
-                break
-        self.render()
+        el = self._index.get(element_id)
+        if el is not None:
+            el.x = int(x)
+            el.y = int(y)
+        self._refresh(element_id)
         
     def update_element_scale(self, element_id, scale):
-        for el in self.elements:
-            if el['id'] == element_id and el['type'] == 'image':
-                el['scale'] = float(scale)
-                break
-        self.render()
+        el = self._index.get(element_id)
+        if el is not None and el.type == 'image':
+            el.scale = float(scale)
+        self._refresh(element_id)
 
     def update_element_rotation(self, element_id, rotation):
-        for el in self.elements:
-            if el['id'] == element_id:
-                el['rotation'] = int(rotation)
-                break
-        self.render()
+        el = self._index.get(element_id)
+        if el is not None:
+            el.rotation = int(rotation)
+        self._refresh(element_id)
 
     def update_element_content(self, element_id, new_content):
-        for el in self.elements:
-            if el['id'] == element_id and el['type'] == 'text':
-                el['content'] = new_content
-                # Update name for layer list
-                el['name'] = f"Text {el['id']}: {new_content[:10]}..."
-                break
-        self.render()
+        el = self._index.get(element_id)
+        if el is not None and el.type == 'text':
+            el.content = new_content
+            # Update name for layer list
+            el.name = f"Text {el.id}: {new_content[:10]}..."
+        elif el is not None and el.type in SYMBOLOGIES:
+            self._check_symbol(el, new_content)
+            el.value = new_content
+            el.name = self._symbol_name(el)
+        self._refresh(element_id)
 
     def update_element_font(self, element_id, font_name):
-        for el in self.elements:
-            if el['id'] == element_id and el['type'] == 'text':
-                el['font'] = font_name
-                break
-        self.render()
+        el = self._index.get(element_id)
+        if el is not None and el.type == 'text':
+            el.font = font_name
+        self._refresh(element_id)
         
+    def update_element_box(self, element_id, width, height=None, align="left", fit=False):
+        """
+        Gives a text element a box: text wraps to width and is aligned within it; with fit,
+        font_size becomes the largest size tried and the text shrinks to fit width x height.
+        width=None turns the element back into single-line text.
+        """
+        if align not in text_layout.ALIGNMENTS:
+            raise ValueError(f"Unknown alignment: {align}")
+        el = self._index.get(element_id)
+        if el is not None and el.type == 'text':
+            el.box_width = int(width) if width else None
+            el.box_height = int(height) if width and height else None
+            el.align = align if width else None
+            el.fit = bool(fit) if width else None
+            self._refresh(element_id)
+
     def update_element_font_size(self, element_id, font_size):
-        for el in self.elements:
-            if el['id'] == element_id and el['type'] == 'text':
-                el['font_size'] = int(font_size)
-                break
-        self.render()
+        el = self._index.get(element_id)
+        if el is not None and el.type == 'text':
+            el.font_size = int(font_size)
+        self._refresh(element_id)
+
+    def update_element_module_size(self, element_id, module_mm):
+        """Sets the nominal module size of a barcode element; it prints as whole dots."""
+        el = self._index.get(element_id)
+        if el is not None and el.type in SYMBOLOGIES:
+            el.module_mm = float(module_mm)
+        self._refresh(element_id)
+
+    def update_element_bar_height(self, element_id, height_mm):
+        el = self._index.get(element_id)
+        if el is not None and el.type == 'barcode':
+            el.height_mm = float(height_mm)
+        self._refresh(element_id)
+
+    def update_element_dither(self, element_id, method):
+        el = self._index.get(element_id)
+        if el is not None and el.type == 'image':
+            if method is not None and method not in DITHER_METHODS:
+                raise ValueError(f"Unknown dither method: {method}")
+            el.dither = method
+        self._refresh(element_id)
 
     def get_element(self, element_id):
-        for el in self.elements:
-            if el['id'] == element_id:
-                return el
-        return None
+        return self._index.get(element_id)
+
+    def _append_element(self, el):
+        """Adds an element on top of the z-order and indexes it."""
+        self.elements.append(el)
+        self._index[el.id] = el
+
+    def z_index(self, element_id):
+        """Returns the stacking position of an element (0 is the bottom)."""
+        return self.elements.index(self._index[element_id])
+
+    def move_element(self, element_id, z_index):
+        """Moves an element to the given stacking position."""
+        el = self._index.get(element_id)
+        if el is None:
+            return
+        self.elements.remove(el)
+        self.elements.insert(max(0, min(int(z_index), len(self.elements))), el)
+        self._refresh(element_id)
 
     def remove_element(self, element_id):
-        self.elements = [el for el in self.elements if el['id'] != element_id]
-        self.render()
+        el = self._index.pop(element_id, None)
+        if el is not None:
+            self.elements.remove(el)
+        self._refresh(element_id)
+        self.invalidate_raster(element_id)
         logger.info(f"Removed element {element_id}")
 
     def clear(self):
         self.elements = []
+        self._index = {}
+        self.invalidate_raster()
         self.render()
         logger.info("Cleared all elements")
 
@@ -230,8 +808,90 @@ class LabelDesigner:
         logger.info(f"Saved image to {path}")
 
     def get_image(self):
+        """Returns the rendered label; a 1-bit image when color_mode is "1"."""
+        if self.color_mode == "1":
+            return self.get_monochrome()
         return self.image
+
+    def get_monochrome(self):
+        """Returns the canvas as a mode "1" image, thresholded at self.threshold."""
+        gray = self.image if self.image.mode == "L" else self.image.convert("L")
+        return gray.point(lambda v: 255 if v >= self.threshold else 0, "1")
+
+    def get_monochrome_raster(self, el):
+        """
+        Returns an element's raster as a mode "1" image, as get_monochrome() would print it:
+        images dithered with their dither method, everything else thresholded at
+        self.threshold. Returns None for elements that draw nothing.
+        """
+        raster = self.get_raster(el)
+        if raster is None:
+            return None
+        # Transparent areas print as paper
+        background = Image.new("RGBA", raster.size, "white")
+        gray = Image.alpha_composite(background, raster.convert("RGBA")).convert("L")
+        if el.type == 'image' and self.color_mode == "RGB":
+            # Monochrome modes dithered the raster already
+            gray = dither(gray, self._element_dither(el), self.threshold)
+        return gray.point(lambda v: 255 if v >= self.threshold else 0, "1")
+
+    def render_batch(self, records, stats=None, start=0):
+        """
+        Renders one label per data record, filling {{field}} placeholders in text and barcode elements.
+        records is a CSV/JSONL path or an iterable of dicts; pass a BatchStats to read throughput.
+        Yields (record, image) pairs, images as get_image() returns them (1-bit in color
+        mode "1"). Each image is a fresh canvas, so memory stays flat as long as the caller
+        does not hold on to them.
+        Raises batch.RecordError (a ValueError) naming the record when it lacks a field or
+        its value cannot be encoded by a barcode or QR code, rather than yielding a label
+        without it; start is the number of records before these (for error messages).
+        """
+        if isinstance(records, str):
+            records = batch.read_records(records)
+        if stats is None:
+            stats = batch.BatchStats()
+
+        templates = self.batch_templates()
+        # Everything below the first templated element is identical on every label
+        static_layer = self.prepare_static_layer(templates)
+        stats.start()
+        try:
+            for number, record in enumerate(records, start + 1):
+                for element_id, template in templates.items():
+                    el = self._index[element_id]
+                    try:
+                        value = batch.fill_placeholders(template, record)
+                    except batch.MissingFieldError as e:
+                        raise batch.RecordError(number, f"no field '{e.field}'") from e
+                    if el.type in SYMBOLOGIES:
+                        # render() would only log the failure and leave the symbol out
+                        try:
+                            self._check_symbol(el, value)
+                        except ValueError as e:
+                            raise batch.RecordError(number, f"element {el.id} cannot encode {value!r}: {e}") from e
+                    setattr(el, el.TEMPLATE_FIELD, value)
+                self.render(static_layer)
+                stats.add()
+                # Same final conversion as the preview: 1-bit in color mode "1"
+                yield record, self.get_image()
+        finally:
+            stats.stop()
+            # Put the templates back so the design can still be edited and saved
+            for element_id, template in templates.items():
+                el = self._index[element_id]
+                setattr(el, el.TEMPLATE_FIELD, template)
+            self.render()
+            logger.info(f"Batch render finished: {stats}")
     
+    def batch_templates(self):
+        """Returns {element id: template} for elements whose text or value has {{field}} placeholders."""
+        templates = {}
+        for el in self.elements:
+            template = getattr(el, el.TEMPLATE_FIELD) if el.TEMPLATE_FIELD else None
+            if template and batch.has_placeholders(template):
+                templates[el.id] = template
+        return templates
+
     # Deprecated methods for compatibility
     def duplicate_element(self, element_id):
         """Duplicates an existing element."""
@@ -241,38 +901,32 @@ class LabelDesigner:
         
         # Create deep copy manually to avoid issues with non-serializable objects if any
         new_el = original.copy()
-        new_el['id'] = self.next_id
+        new_el.id = self.next_id
         self.next_id += 1
         
         # Offset position
-        new_el['x'] += 20
-        new_el['y'] += 20
+        new_el.x += 20
+        new_el.y += 20
         
         # Update name
-        if new_el['type'] == 'text':
-             new_el['name'] = f"Text {new_el['id']}: {new_el['content'][:10]}..."
-        elif new_el['type'] == 'image':
-             new_el['name'] = f"Image {new_el['id']}"
-             # Ensure image object is copied if it exists
-             if 'img_object' in new_el:
-                 new_el['img_object'] = original['img_object'].copy()
-
-        self.elements.append(new_el)
-        self.render()
+        if new_el.type == 'text':
+             new_el.name = f"Text {new_el.id}: {new_el.content[:10]}..."
+        elif new_el.type == 'image':
+             new_el.name = f"Image {new_el.id}"
+             # The source image is shared: asset images are never modified in place
+        elif new_el.type in SYMBOLOGIES:
+             new_el.name = self._symbol_name(new_el)
+
+        self._append_element(new_el)
+        self._refresh(new_el.id)
         logger.info(f"Duplicated element {element_id} -> {new_el['id']}")
         return new_el
 
     def save_project(self, file_path):
         """Saves current elements to a JSON file."""
         try:
-            # Prepare serializable list
-            serialized_elements = []
-            for el in self.elements:
-                el_copy = el.copy()
-                # Remove non-serializable image objects
-                if 'img_object' in el_copy:
-                    del el_copy['img_object']
-                serialized_elements.append(el_copy)
+            # Prepare serializable list (image objects are runtime-only)
+            serialized_elements = [el.to_dict() for el in self.elements]
             
             data = {
                 'width_mm': self.width_mm,
@@ -297,24 +951,31 @@ class LabelDesigner:
             
             # Clear current
             self.elements = []
+            self._index = {}
+            self.invalidate_raster()
             self.next_id = data.get('next_id', 1)
             
             # Reconstruct elements
             for el_data in data.get('elements', []):
+                try:
+                    el_data = element_from_dict(el_data)
+                except ValueError as e:
+                    logger.warning(f"Skipping element {el_data.get('id', '?')}: {e}")
+                    continue
+
                 # Reload images
-                if el_data['type'] == 'image':
+                if el_data.type == 'image':
                     try:
                         img_path = el_data.get('path')
                         if img_path and os.path.exists(img_path):
-                            img = Image.open(img_path).convert("RGBA")
-                            el_data['img_object'] = img # Cache it
+                            el_data['img_object'] = self._load_asset(img_path)
                         else:
                             logger.warning(f"Image not found at {img_path}, skipping image load for element {el_data['id']}")
                             # We keep the element data but it won't render the image
                     except Exception as e:
                         logger.error(f"Error reloading image for element {el_data['id']}: {e}")
 
-                self.elements.append(el_data)
+                self._append_element(el_data)
                 
             self.render()
             logger.info(f"Project loaded from {file_path}")
@@ -2,12 +2,13 @@ import customtkinter as ctk
 from tkinter import filedialog
 from PIL import Image, ImageTk, ImageFont, ImageDraw
 import os
-import win32print
-from .label_designer import LabelDesigner
+from .label_designer import LabelDesigner, MAX_SCALE
+from .render_worker import RenderWorker
+from .preview_surface import TkPreviewSurface, ZOOM_LEVELS
 import logging
 from . import printer_utils
-import threading
-from . import font_manager  # Import the new font manager
+from .print_queue import PrintQueue, DONE, FAILED, CANCELLED
+from . import font_manager
 from . import logging_config
 
 # Setup logging immediately
@@ -23,12 +24,17 @@ class LabelApp(ctk.CTk):
 
         # Initialize Designer
         self.designer = LabelDesigner()
+        # Edits only update the model; the preview is rendered from snapshots off the UI thread
+        self.designer.live_render = False
+        self.render_worker = RenderWorker()
+        self._render_poll_job = None
         self.selected_element_id = None
         
-        # Available Fonts from System
-        self.available_fonts = font_manager.get_system_fonts()
-        if not self.available_fonts:
-            self.available_fonts = ["arial.ttf"]
+        # Available Fonts from the cached font index; a background scan picks up changes
+        # A first run scans in the background rather than blocking the window
+        self.font_index = font_manager.get_index(scan=False)
+        self.available_fonts = self.font_index.names() or ["arial.ttf"]
+        self.font_scan = self.font_index.refresh()
         
         # Layout
         self.grid_columnconfigure(0, weight=1) # Controls
@@ -65,6 +71,13 @@ class LabelApp(ctk.CTk):
         self.btn_upload_image = ctk.CTkButton(self.left_frame, text="Add Image", command=self.upload_image)
         self.btn_upload_image.pack(pady=5, padx=10, fill="x")
 
+        # Barcodes encode the text entered above
+        self.btn_add_barcode = ctk.CTkButton(self.left_frame, text="Add Barcode", command=self.add_barcode_to_label)
+        self.btn_add_barcode.pack(pady=5, padx=10, fill="x")
+
+        self.btn_add_qr = ctk.CTkButton(self.left_frame, text="Add QR Code", command=self.add_qr_to_label)
+        self.btn_add_qr.pack(pady=5, padx=10, fill="x")
+
         ctk.CTkFrame(self.left_frame, height=2, fg_color="gray").pack(fill="x", pady=10)
 
         # -- Layer Controls --
@@ -98,7 +111,7 @@ class LabelApp(ctk.CTk):
         self.lbl_scale = ctk.CTkLabel(self.style_frame, text="Scale:")
         self.lbl_scale.grid(row=2, column=0, padx=5, pady=2, sticky="w")
         
-        self.slider_scale = ctk.CTkSlider(self.style_frame, from_=0.1, to=3.0, command=self.on_scale_change)
+        self.slider_scale = ctk.CTkSlider(self.style_frame, from_=0.1, to=MAX_SCALE, command=self.on_scale_change)
         self.slider_scale.grid(row=2, column=1, padx=5, pady=2, sticky="ew")
 
         # Rotation Control
@@ -121,6 +134,12 @@ class LabelApp(ctk.CTk):
         self.btn_update_text = ctk.CTkButton(self.style_frame, text="Update", width=60, command=self.on_text_content_change)
         self.btn_update_text.grid(row=4, column=2, padx=5, pady=2)
 
+        # Wrap text in the space right of/below its position and shrink it to fit
+        self.fit_var = ctk.BooleanVar(value=False)
+        self.chk_fit_text = ctk.CTkCheckBox(self.style_frame, text="Wrap & auto-fit", variable=self.fit_var,
+                                            command=self.on_fit_change)
+        self.chk_fit_text.grid(row=5, column=1, padx=5, pady=2, sticky="w")
+
         # -- Position Controls --
         self.pos_frame = ctk.CTkFrame(self.left_frame)
         self.pos_frame.pack(pady=5, padx=10, fill="x")
@@ -137,6 +156,14 @@ class LabelApp(ctk.CTk):
         self.label_val_y = ctk.CTkLabel(self.pos_frame, text="Y: 0")
         self.label_val_y.grid(row=2, column=1, padx=5)
         
+        # Slider drags: apply the latest value once per frame at draft quality, then
+        # render at full quality on release or after the slider goes idle
+        self._slider_updates = {}
+        self._slider_job = None
+        self._final_render_job = None
+        for slider in (self.slider_fontsize, self.slider_scale, self.slider_x, self.slider_y):
+            slider.bind("<ButtonRelease-1>", self.on_slider_release, add="+")
+
         self.btn_duplicate_el = ctk.CTkButton(self.pos_frame, text="Duplicate", fg_color="orange", command=self.duplicate_element_action)
         self.btn_duplicate_el.grid(row=3, column=0, pady=10, padx=5, sticky="ew")
 
@@ -147,11 +174,15 @@ class LabelApp(ctk.CTk):
         ctk.CTkFrame(self.left_frame, height=2, fg_color="gray").pack(fill="x", pady=10)
         ctk.CTkLabel(self.left_frame, text="Printing", font=("Arial", 14, "bold")).pack(pady=5)
 
+        # Printers are enumerated in the background; the spooler can take seconds to answer
         self.printer_var = ctk.StringVar(value="Select Printer")
-        self.printers = printer_utils.list_printers() if printer_utils.list_printers() else ["No Printers Found"]
+        self.printers = ["Searching for printers..."]
         self.printer_dropdown = ctk.CTkOptionMenu(self.left_frame, variable=self.printer_var, values=self.printers)
         self.printer_dropdown.set(self.printers[0])
         self.printer_dropdown.pack(pady=5, padx=10, fill="x")
+        self.printer_scan = printer_utils.refresh_printers()
+        self.after(100, self.poll_printer_scan)
+        self.after(200, self.poll_font_scan)
         
         # Copies Input
         self.copies_frame = ctk.CTkFrame(self.left_frame, fg_color="transparent")
@@ -164,6 +195,9 @@ class LabelApp(ctk.CTk):
 
         self.btn_print = ctk.CTkButton(self.left_frame, text="Print Label", command=self.print_label, fg_color="green")
         self.btn_print.pack(pady=5, padx=10, fill="x")
+
+        self.print_status_label = ctk.CTkLabel(self.left_frame, text="")
+        self.print_status_label.pack(pady=2, padx=10)
         
         self.btn_clear = ctk.CTkButton(self.left_frame, text="Clear All", fg_color="darkred", command=self.clear_label)
         self.btn_clear.pack(pady=5, padx=10, fill="x")
@@ -175,24 +209,97 @@ class LabelApp(ctk.CTk):
         
         ctk.CTkLabel(self.right_frame, text="Preview", font=("Arial", 16, "bold")).pack(pady=10)
         
-        self.preview_image_label = ctk.CTkLabel(self.right_frame, text="") 
-        self.preview_image_label.pack(pady=50, expand=True)
+        self.zoom_var = ctk.StringVar(value="200%")
+        self.zoom_dropdown = ctk.CTkOptionMenu(self.right_frame, variable=self.zoom_var,
+                                               values=[f"{int(z * 100)}%" for z in ZOOM_LEVELS],
+                                               command=self.on_zoom_change, width=90)
+        self.zoom_dropdown.pack(pady=(0, 5))
+
+        # One persistent photo image; frames only repaint the region that changed
+        self.preview = TkPreviewSurface(self.right_frame, zoom=2.0)
+        self.preview.label.pack(pady=50, expand=True)
 
         self.update_preview()
         self.update_layer_list()
         self.update_control_state()
 
+        # Print jobs run on the queue's workers; the UI only polls their status
+        self.print_queue = PrintQueue()
+        self.poll_print_queue()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        self.print_queue.shutdown(wait=False)
+        self.render_worker.stop()
+        self.destroy()
+
+    def poll_printer_scan(self):
+        if not self.printer_scan.done():
+            self.after(100, self.poll_printer_scan)
+            return
+        try:
+            printers = self.printer_scan.result()
+        except Exception:
+            printers = []
+        self.printers = printers or ["No Printers Found"]
+        self.printer_dropdown.configure(values=self.printers)
+        self.printer_dropdown.set(self.printers[0])
+        logger.info(f"UI: Found {len(printers)} printer(s)")
+
+    def poll_font_scan(self):
+        if not self.font_scan.done():
+            self.after(200, self.poll_font_scan)
+            return
+        if self.font_scan.exception() is None and self.font_scan.result():
+            self.available_fonts = self.font_index.names() or ["arial.ttf"]
+            self.font_dropdown.configure(values=self.available_fonts)
+            logger.info(f"UI: Font list updated ({len(self.available_fonts)} fonts)")
+            # Text may now have fallback glyphs it lacked
+            self.update_preview()
+
+    def poll_print_queue(self):
+        for job_id, status in self.print_queue.drain_events():
+            job = self.print_queue.get_job(job_id)
+            if job is None:
+                # Already pruned from the finished history
+                continue
+            if status == DONE:
+                print(f"Sent to printer: {job.printer} ({job.copies} copies)")
+                logger.info(f"UI: Print Success: {job.printer} ({job.copies} copies)")
+            elif status == FAILED:
+                print("Failed to print.")
+                logger.error(f"UI: Print Failed: {job.error}")
+            elif status == CANCELLED:
+                logger.info(f"UI: Print job {job_id} cancelled")
+        pending = self.print_queue.pending()
+        self.print_status_label.configure(text=f"{pending} job(s) in queue" if pending else "")
+        self.after(200, self.poll_print_queue)
+
     def update_preview(self):
-        pil_image = self.designer.image
-        
-        # Scale for display (e.g. 2x)
-        display_scale = 2
-        display_width = int(pil_image.width * display_scale)
-        display_height = int(pil_image.height * display_scale)
-        
-        ctk_img = ctk.CTkImage(light_image=pil_image, dark_image=pil_image, size=(display_width, display_height))
-        self.preview_image_label.configure(image=ctk_img)
-        self.preview_image_label.image = ctk_img 
+        """Queues a render of the current design; the frame is shown when the worker finishes."""
+        self.render_worker.submit(self.designer.snapshot())
+        if self._render_poll_job is None:
+            self._render_poll_job = self.after(10, self.poll_render_worker)
+
+    def poll_render_worker(self):
+        frame = self.render_worker.take_frame()
+        if frame is not None:
+            self.show_frame(frame[1])
+        if self.render_worker.busy():
+            self._render_poll_job = self.after(10, self.poll_render_worker)
+        else:
+            self._render_poll_job = None
+            # A frame may have landed between take_frame() and busy()
+            frame = self.render_worker.take_frame()
+            if frame is not None:
+                self.show_frame(frame[1])
+
+    def show_frame(self, pil_image):
+        self.preview.show(pil_image)
+
+    def on_zoom_change(self, value):
+        self.preview.set_zoom(int(value.rstrip("%")) / 100)
+        logger.info(f"UI: Preview zoom {value}")
 
     def update_layer_list(self):
         # Clear existing buttons
@@ -243,6 +350,10 @@ class LabelApp(ctk.CTk):
                 # Update edit text entry
                 self.entry_edit_text.delete(0, "end")
                 self.entry_edit_text.insert(0, el['content'])
+                self.fit_var.set(bool(el.get('box_width')))
+            elif el['type'] in ('barcode', 'qr'):
+                self.entry_edit_text.delete(0, "end")
+                self.entry_edit_text.insert(0, el['value'])
             
             # Update rotation
             current_rot = el.get('rotation', 0)
@@ -282,6 +393,7 @@ class LabelApp(ctk.CTk):
             self.lbl_edit_text.configure(state="normal")
             self.entry_edit_text.configure(state="normal")
             self.btn_update_text.configure(state="normal")
+            self.chk_fit_text.configure(state="normal")
         else:
             self.lbl_font.configure(state="disabled")
             self.font_dropdown.configure(state="disabled")
@@ -290,20 +402,63 @@ class LabelApp(ctk.CTk):
             self.lbl_edit_text.configure(state="disabled")
             self.entry_edit_text.configure(state="disabled")
             self.btn_update_text.configure(state="disabled")
+            self.chk_fit_text.configure(state="disabled")
+
+        # Barcode values are edited in the same entry as text
+        if el and el['type'] in ('barcode', 'qr'):
+            self.lbl_edit_text.configure(state="normal")
+            self.entry_edit_text.configure(state="normal")
+            self.btn_update_text.configure(state="normal")
+
+    def schedule_slider_update(self, name, apply):
+        """Coalesces slider events: only the latest value per slider is applied, once per frame."""
+        self._slider_updates[name] = apply
+        if self._slider_job is None:
+            self._slider_job = self.after(16, self.flush_slider_updates)
+
+    def flush_slider_updates(self):
+        self._slider_job = None
+        updates, self._slider_updates = self._slider_updates, {}
+        if not updates:
+            return
+        self.designer.set_draft(True)
+        for apply in updates.values():
+            apply()
+        self.update_preview()
+        # Final-quality render once the slider has been idle for a moment
+        if self._final_render_job is not None:
+            self.after_cancel(self._final_render_job)
+        self._final_render_job = self.after(300, self.finish_slider_updates)
+
+    def finish_slider_updates(self):
+        self._final_render_job = None
+        if self.designer.draft:
+            self.designer.set_draft(False)
+            self.update_preview()
+
+    def on_slider_release(self, event=None):
+        if self._slider_job is not None:
+            self.after_cancel(self._slider_job)
+            self.flush_slider_updates()
+        if self._final_render_job is not None:
+            self.after_cancel(self._final_render_job)
+        self.finish_slider_updates()
 
     def on_pos_change(self, value):
         if self.selected_element_id:
+            element_id = self.selected_element_id
             x = int(self.slider_x.get())
             y = int(self.slider_y.get())
-            self.designer.update_element_position(self.selected_element_id, x, y)
             self.label_val_x.configure(text=f"X: {x}")
             self.label_val_y.configure(text=f"Y: {y}")
-            self.update_preview()
+            self.schedule_slider_update(
+                "position", lambda: self.designer.update_element_position(element_id, x, y))
             
     def on_scale_change(self, value):
         if self.selected_element_id:
-            self.designer.update_element_scale(self.selected_element_id, value)
-            self.update_preview()
+            element_id = self.selected_element_id
+            self.schedule_slider_update(
+                "scale", lambda: self.designer.update_element_scale(element_id, value))
 
     def on_rotation_change(self, value):
         logger.info(f"UI: Rotation changed to {value}")
@@ -332,14 +487,32 @@ class LabelApp(ctk.CTk):
     def on_text_content_change(self, event=None):
         if self.selected_element_id:
             new_text = self.entry_edit_text.get()
-            self.designer.update_element_content(self.selected_element_id, new_text)
+            try:
+                self.designer.update_element_content(self.selected_element_id, new_text)
+            except ValueError as e:
+                logger.warning(f"UI: Cannot encode barcode value: {e}")
+                return
             self.update_preview()
             self.update_layer_list() # Name might change
 
+    def on_fit_change(self):
+        el = self.designer.get_element(self.selected_element_id) if self.selected_element_id else None
+        if el is None or el['type'] != 'text':
+            return
+        if self.fit_var.get():
+            width = max(self.designer.width_px - el['x'], 1)
+            height = max(self.designer.height_px - el['y'], 1)
+            self.designer.update_element_box(el['id'], width, height, align="center", fit=True)
+        else:
+            self.designer.update_element_box(el['id'], None)
+        logger.info(f"UI: Wrap & auto-fit {'on' if self.fit_var.get() else 'off'} for element {el['id']}")
+        self.update_preview()
+
     def on_fontsize_change(self, value):
         if self.selected_element_id:
-            self.designer.update_element_font_size(self.selected_element_id, value)
-            self.update_preview()
+            element_id = self.selected_element_id
+            self.schedule_slider_update(
+                "font_size", lambda: self.designer.update_element_font_size(element_id, value))
 
     def add_text_to_label(self):
         text = self.entry_text.get()
@@ -350,6 +523,26 @@ class LabelApp(ctk.CTk):
             self.update_layer_list()
             self.select_element(el['id'])
 
+    def add_barcode_to_label(self):
+        self._add_symbol(self.designer.add_barcode)
+
+    def add_qr_to_label(self):
+        self._add_symbol(self.designer.add_qr)
+
+    def _add_symbol(self, add):
+        value = self.entry_text.get()
+        if not value:
+            return
+        try:
+            el = add(value)
+        except ValueError as e:
+            logger.warning(f"UI: Cannot encode barcode value: {e}")
+            return
+        logger.info(f"UI: Added {el['type']}: {value}")
+        self.update_preview()
+        self.update_layer_list()
+        self.select_element(el['id'])
+
     def upload_image(self):
         file_path = ctk.filedialog.askopenfilename(filetypes=[("Image Files", "*.jpg;*.png;*.jpeg")])
         if file_path:
@@ -377,46 +570,21 @@ class LabelApp(ctk.CTk):
 
     def print_label(self):
         selected_printer = self.printer_var.get()
-        if selected_printer == "No Printers Found" or not selected_printer:
+        if selected_printer in ("No Printers Found", "Searching for printers...") or not selected_printer:
             print("No printer selected.")
             logger.warning("UI: Print Attempted (No printer selected)")
             return
 
-        # Disable button to prevent spamming
-        self.btn_print.configure(state="disabled", text="Printing...")
-        
         try:
             copies = int(self.entry_copies.get())
         except ValueError:
             copies = 1
-        
-        def run_print():
-            try:
-                # Use system temp directory to ensure we have write permissions
-                # and avoid CWD issues (some environments set CWD to restricted folders)
-                import tempfile
-                import os
-                temp_dir = tempfile.gettempdir()
-                temp_path = os.path.join(temp_dir, "temp_print_label.png")
-                
-                self.designer.image.save(temp_path)
-                
-                success = printer_utils.print_image(temp_path, selected_printer, copies=copies)
-                if success:
-                    print(f"Sent to printer: {selected_printer} ({copies} copies)")
-                    logger.info(f"UI: Print Success: {selected_printer} ({copies} copies)")
-                else:
-                    print("Failed to print.")
-                    logger.error("UI: Print Failed")
-            except Exception as e:
-                print(f"Print Error: {e}")
-                logger.error(f"UI: Print Error: {e}", exc_info=True)
-            finally:
-                # Re-enable button
-                self.after(0, lambda: self.btn_print.configure(state="normal", text="Print Label"))
-
-        # Run in threaded mode
-        threading.Thread(target=run_print, daemon=True).start()
+
+        # Snapshot the design on the UI thread; it is rendered on the print worker, so the
+        # job never sees a half-applied edit
+        snapshot = self.designer.snapshot()
+        job = self.print_queue.submit(snapshot, selected_printer, copies=copies)
+        logger.info(f"UI: Queued print job {job.id} for {selected_printer} ({copies} copies)")
 
     def duplicate_element_action(self):
         if self.selected_element_id:
@@ -0,0 +1,126 @@
+import io
+import os
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from . import batch
+from .label_designer import LabelDesigner
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ("png", "1bit")
+
+# Per-worker state, set up once by _init_worker
+_worker_designer = None
+
+
+def encode_label(image, output="png"):
+    """
+    Encodes a rendered label as PNG bytes or packed 1-bit rows (MSB first, 1 = white).
+    For "1bit", pass the 1-bit image of a designer in color mode "1" (as render_batch()
+    yields it) so the output uses its threshold and dithering.
+    """
+    if output == "png":
+        buf = io.BytesIO()
+        image.save(buf, "PNG")
+        return buf.getvalue()
+    elif output == "1bit":
+        if image.mode != "1":
+            raise ValueError(f"1bit output needs a mode \"1\" image, got {image.mode!r}")
+        return image.tobytes()
+    raise ValueError(f"Unknown output format: {output}")
+
+
+def _init_worker(project_path, dpi, color_mode, threshold, dither):
+    """Loads the project and its image assets once per worker process."""
+    global _worker_designer
+    designer = LabelDesigner(dpi=dpi, color_mode=color_mode)
+    designer.set_color_mode(color_mode, threshold=threshold, dither=dither)
+    if not designer.load_project(project_path):
+        raise RuntimeError(f"Worker could not load project {project_path}")
+    _worker_designer = designer
+
+
+def _render_chunk(start, records, output, out_dir, filename_pattern):
+    results = []
+    for offset, (record, image) in enumerate(_worker_designer.render_batch(records, start=start)):
+        if out_dir:
+            path = os.path.join(out_dir, batch.output_filename(filename_pattern, start + offset, record))
+            image.save(path)
+            results.append(path)
+        else:
+            results.append(encode_label(image, output))
+    return results
+
+
+def _chunks(records, chunk_size):
+    it = iter(records)
+    start = 0
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def render_parallel(project_path, records, workers=None, chunk_size=256, output="png",
+                    out_dir=None, filename_pattern="label_{index:06d}.png", dpi=203, stats=None,
+                    color_mode=None, threshold=None, dither=None):
+    """
+    Renders a data-merge job across a process pool.
+    records is a CSV/JSONL path or an iterable of dicts. Yields one result per record,
+    in input order: encoded bytes, or the written file path when out_dir is given.
+    Only a few chunks per worker are in flight, so the data source is streamed.
+    Workers render in color_mode (default: "1" for 1bit output, else "RGB"), with the
+    designer's threshold and image dithering in monochrome modes.
+    """
+    if output not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output}")
+    if color_mode is None:
+        color_mode = "1" if output == "1bit" else "RGB"
+    elif output == "1bit" and color_mode != "1":
+        raise ValueError("1bit output needs color_mode \"1\"")
+    if isinstance(records, str):
+        records = batch.read_records(records)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    if stats is None:
+        stats = batch.BatchStats()
+
+    stats.start()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(project_path, dpi, color_mode, threshold, dither)) as executor:
+            pending = deque()
+            for start, chunk in _chunks(records, chunk_size):
+                pending.append(executor.submit(_render_chunk, start, chunk, output, out_dir, filename_pattern))
+                # Keep memory bounded: wait for the oldest chunk once enough are queued
+                while len(pending) >= workers * 2:
+                    results = pending.popleft().result()
+                    stats.add(len(results))
+                    yield from results
+            while pending:
+                results = pending.popleft().result()
+                stats.add(len(results))
+                yield from results
+    finally:
+        stats.stop()
+        logger.info(f"Parallel render finished with {workers} workers: {stats}")
+
+
+def benchmark(project_path, records, worker_counts=(1, 2, 4), chunk_size=256, output="png", dpi=203):
+    """Renders the same job with each worker count and returns {workers: labels_per_second}."""
+    records = list(batch.read_records(records) if isinstance(records, str) else records)
+    results = {}
+    for workers in worker_counts:
+        stats = batch.BatchStats()
+        for _ in render_parallel(project_path, records, workers=workers, chunk_size=chunk_size,
+                                 output=output, dpi=dpi, stats=stats):
+            pass
+        results[workers] = stats.labels_per_second
+        logger.info(f"Benchmark: {workers} workers -> {stats}")
+    return results
@@ -0,0 +1,110 @@
+"""
+Zoomed preview kept in one Tk photo image and updated in place.
+
+Each new frame is compared with the previous one; only the changed rectangle is scaled
+and copied into the displayed photo, so a drag costs a small blit instead of a new
+full-size image. The photo is only reallocated when the zoom or label size changes.
+"""
+import math
+import tkinter
+import logging
+from PIL import Image, ImageChops
+
+logger = logging.getLogger(__name__)
+
+ZOOM_LEVELS = (1.0, 1.5, 2.0, 3.0, 4.0)
+
+
+class PreviewSurface:
+    """Tracks the displayed frame and works out the zoomed region to repaint for a new one."""
+
+    def __init__(self, zoom=2.0):
+        self.zoom = float(zoom)
+        self._frame = None
+        self.updates = 0
+        self.pixels_blitted = 0
+
+    def display_size(self, size):
+        return max(1, round(size[0] * self.zoom)), max(1, round(size[1] * self.zoom))
+
+    def set_zoom(self, zoom):
+        """Changes the zoom factor; the next update repaints everything."""
+        self.zoom = float(zoom)
+        frame, self._frame = self._frame, None
+        return frame
+
+    def _resample(self):
+        # Whole-number zoom keeps printer dots crisp; fractional zoom needs filtering
+        return Image.Resampling.NEAREST if self.zoom.is_integer() else Image.Resampling.BILINEAR
+
+    def changed_box(self, frame):
+        """Returns the source-pixel box that differs from the displayed frame, or None."""
+        previous = self._frame
+        if previous is None or previous.size != frame.size or previous.mode != frame.mode:
+            return (0, 0) + frame.size
+        if previous is frame:
+            return None
+        return ImageChops.difference(previous, frame).getbbox()
+
+    def region(self, frame, box):
+        """Returns ((x, y), image) for the zoomed version of the source box."""
+        width, height = self.display_size(frame.size)
+        # Per-axis scale of the rounded display size, as a full-frame resize would use
+        sx, sy = width / frame.width, height / frame.height
+        if not self.zoom.is_integer():
+            # Bilinear taps reach one source pixel past the change
+            box = (max(box[0] - 1, 0), max(box[1] - 1, 0),
+                   min(box[2] + 1, frame.width), min(box[3] + 1, frame.height))
+        x0, y0 = math.floor(box[0] * sx), math.floor(box[1] * sy)
+        x1, y1 = min(math.ceil(box[2] * sx), width), min(math.ceil(box[3] * sy), height)
+        # resize(box=...) maps the exact source area of these display pixels, so the
+        # region matches the same pixels of a full-frame resize
+        source_box = (x0 / sx, y0 / sy, x1 / sx, y1 / sy)
+        image = frame.resize((x1 - x0, y1 - y0), self._resample(), box=source_box)
+        return (x0, y0), image
+
+    def update(self, frame):
+        """Returns ((x, y), image) to paste into the displayed image, or None if nothing changed."""
+        box = self.changed_box(frame)
+        self._frame = frame
+        if box is None:
+            return None
+        position, image = self.region(frame, box)
+        self.updates += 1
+        self.pixels_blitted += image.width * image.height
+        return position, image
+
+
+def ppm_bytes(image):
+    """Encodes an image as binary PPM, which Tk photo images can put at an offset."""
+    image = image if image.mode == "RGB" else image.convert("RGB")
+    return b"P6 %d %d 255\n" % image.size + image.tobytes()
+
+
+class TkPreviewSurface(PreviewSurface):
+    """A PreviewSurface shown in a plain Tk label, backed by one persistent photo image."""
+
+    def __init__(self, master, zoom=2.0, **label_options):
+        super().__init__(zoom)
+        self.label = tkinter.Label(master, borderwidth=0, highlightthickness=0, **label_options)
+        self._photo = None
+
+    def _ensure_photo(self, size):
+        if self._photo is None or (self._photo.width(), self._photo.height()) != size:
+            self._photo = tkinter.PhotoImage(master=self.label, width=size[0], height=size[1])
+            self.label.configure(image=self._photo)
+            logger.debug(f"Allocated preview surface {size[0]}x{size[1]}")
+
+    def show(self, frame):
+        """Displays a frame, repainting only what changed since the last one."""
+        self._ensure_photo(self.display_size(frame.size))
+        change = self.update(frame)
+        if change is None:
+            return
+        (x, y), image = change
+        self.label.tk.call(str(self._photo), "put", ppm_bytes(image), "-format", "ppm", "-to", x, y)
+
+    def set_zoom(self, zoom):
+        frame = super().set_zoom(zoom)
+        if frame is not None:
+            self.show(frame)
@@ -0,0 +1,319 @@
+"""
+Background print queue with one persistent worker per printer.
+
+Jobs are submitted to a printer or to a printer group (several identical printers on a
+line); groups dispatch round-robin or to the least-loaded member. Failed jobs are
+retried after a delay (on a timer, so the failing printer's other jobs are not held
+up), queued jobs can be cancelled, and status changes are published as events that
+a Tk UI can drain from after() without touching widgets from worker threads.
+
+A job's images are released as soon as it reaches a final state, and only the most
+recent finished jobs are kept for status lookups.
+"""
+import collections
+import itertools
+import queue
+import threading
+import time
+import logging
+
+from . import printer_utils
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+PRINTING = "printing"
+RETRYING = "retrying"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINAL_STATES = (DONE, FAILED, CANCELLED)
+
+ROUND_ROBIN = "round_robin"
+LEAST_LOADED = "least_loaded"
+
+# Finished jobs kept for get_job()/jobs() after they completed
+DEFAULT_KEEP_FINISHED = 100
+
+
+class PrintJob:
+    """A submitted print job; images are snapshots taken at submit time."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, images, target, copies=1):
+        self.id = next(self._ids)
+        self.images = images
+        self.target = target
+        self.copies = copies
+        self.printer = None
+        self.status = QUEUED
+        self.attempts = 0
+        self.error = None
+        self.pages_done = 0
+        self.created = time.time()
+        self.finished = None
+        self._tried = set()
+        # Worker whose queue holds the job, until it is dequeued
+        self._queued_on = None
+
+    @property
+    def done(self):
+        return self.status in FINAL_STATES
+
+    def __repr__(self):
+        return f"<PrintJob {self.id} {self.status} printer={self.printer!r}>"
+
+
+class _PrinterWorker:
+    def __init__(self, printer, run_job):
+        self.printer = printer
+        self.queue = queue.Queue()
+        # Jobs queued or printing on this printer
+        self.load = 0
+        self.thread = threading.Thread(target=self._loop, args=(run_job,),
+                                       name=f"print-{printer}", daemon=True)
+        self.thread.start()
+
+    def _loop(self, run_job):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            run_job(self, job)
+
+
+class PrintQueue:
+    """Persistent multi-printer print queue."""
+
+    def __init__(self, max_retries=2, retry_delay=1.0, print_func=None, keep_finished=DEFAULT_KEEP_FINISHED):
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        # print_func(images, printer, copies=..., progress=...) -> bool
+        self.print_func = print_func or printer_utils.print_images
+        self.keep_finished = keep_finished
+        self._workers = {}
+        self._groups = {}
+        self._jobs = {}
+        # Ids of jobs not in a final state, and of finished jobs oldest first
+        self._active = set()
+        self._finished = collections.deque()
+        self._events = queue.Queue()
+        self._listeners = []
+        self._lock = threading.Lock()
+        # Notified whenever a job reaches a final state
+        self._job_finished = threading.Condition(self._lock)
+        self._closed = False
+
+    # -- configuration --
+
+    def add_group(self, name, printers, strategy=ROUND_ROBIN):
+        """Defines a printer group that jobs can target by name."""
+        if strategy not in (ROUND_ROBIN, LEAST_LOADED):
+            raise ValueError(f"Unknown dispatch strategy: {strategy}")
+        printers = list(printers)
+        if not printers:
+            raise ValueError("A printer group needs at least one printer")
+        with self._lock:
+            self._groups[name] = (printers, strategy, itertools.cycle(printers))
+
+    def add_listener(self, callback):
+        """callback(job) runs on the worker thread after every status change."""
+        self._listeners.append(callback)
+
+    # -- submitting and tracking --
+
+    def submit(self, images, target, copies=1):
+        """
+        Queues a job for a printer or printer group and returns it.
+        images is one image or a list of images; pass snapshots, not live canvases.
+        """
+        if self._closed:
+            raise RuntimeError("Print queue is shut down")
+        if not isinstance(images, (list, tuple)):
+            images = [images]
+        job = PrintJob(list(images), target, copies)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._active.add(job.id)
+        self._dispatch(job)
+        return job
+
+    def get_job(self, job_id):
+        """Returns a job, or None once it has been pruned from the finished history."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        """Cancels a job that has not started printing; returns True on success."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in (QUEUED, RETRYING):
+                return False
+            if job._queued_on is not None:
+                # Still in a worker queue: it no longer counts towards that printer's load
+                job._queued_on.load -= 1
+                job._queued_on = None
+            self._finish(job, CANCELLED)
+        self._publish(job)
+        return True
+
+    def drain_events(self):
+        """Returns the (job_id, status) changes since the last call; safe to call from after()."""
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def pending(self, printer=None):
+        """Number of jobs queued or printing (not cancelled), for one printer or overall."""
+        with self._lock:
+            if printer is not None:
+                worker = self._workers.get(printer)
+                return worker.load if worker else 0
+            return sum(w.load for w in self._workers.values())
+
+    def wait(self, timeout=None):
+        """Blocks until every submitted job reached a final state; returns False on timeout."""
+        with self._job_finished:
+            return self._job_finished.wait_for(lambda: not self._active, timeout)
+
+    def shutdown(self, wait=True):
+        """Stops the workers after the jobs already queued."""
+        self._closed = True
+        with self._lock:
+            workers = list(self._workers.values())
+        for worker in workers:
+            worker.queue.put(None)
+        if wait:
+            for worker in workers:
+                worker.thread.join()
+
+    # -- internals --
+
+    def _finish(self, job, status):
+        """Moves a job to a final state; call with the lock held."""
+        job.status = status
+        job.finished = time.time()
+        # The rendered pages are no longer needed once the job is over
+        job.images = []
+        self._finished.append(job.id)
+        while len(self._finished) > self.keep_finished:
+            self._jobs.pop(self._finished.popleft(), None)
+
+    def _worker(self, printer):
+        with self._lock:
+            worker = self._workers.get(printer)
+            if worker is None:
+                worker = self._workers[printer] = _PrinterWorker(printer, self._run_job)
+            return worker
+
+    def _choose_printer(self, job):
+        with self._lock:
+            group = self._groups.get(job.target)
+            if group is None:
+                return job.target
+            printers, strategy, cycle = group
+            # Prefer members this job has not failed on yet
+            candidates = [p for p in printers if p not in job._tried] or printers
+            if strategy == LEAST_LOADED:
+                def load(p):
+                    worker = self._workers.get(p)
+                    return worker.load if worker else 0
+                return min(candidates, key=load)
+            for _ in range(len(printers)):
+                printer = next(cycle)
+                if printer in candidates:
+                    return printer
+            return candidates[0]
+
+    def _dispatch(self, job):
+        printer = self._choose_printer(job)
+        worker = self._worker(printer)
+        with self._lock:
+            job.printer = printer
+            job._queued_on = worker
+            worker.load += 1
+        worker.queue.put(job)
+        self._publish(job)
+
+    def _publish(self, job):
+        self._events.put((job.id, job.status))
+        for callback in self._listeners:
+            try:
+                callback(job)
+            except Exception as e:
+                logger.error(f"Print queue listener failed: {e}", exc_info=True)
+        if job.done:
+            # Only now, so wait() returns with the final event already published
+            with self._job_finished:
+                self._active.discard(job.id)
+                self._job_finished.notify_all()
+
+    def _retry(self, job):
+        with self._lock:
+            if job.status != RETRYING:
+                # Cancelled while waiting
+                return
+            if self._closed:
+                self._finish(job, FAILED)
+        if job.status == FAILED:
+            logger.error(f"Print job {job.id} not retried: the print queue is shut down")
+            self._publish(job)
+            return
+        self._dispatch(job)
+
+    def _run_job(self, worker, job):
+        with self._lock:
+            job._queued_on = None
+            if job.status == CANCELLED:
+                # cancel() already took it off the printer's load
+                return
+            job.status = PRINTING
+            job.attempts += 1
+        self._publish(job)
+
+        def progress(done, total):
+            job.pages_done = done
+
+        try:
+            ok = self.print_func(job.images, worker.printer, copies=job.copies, progress=progress)
+            error = None if ok else "printer reported failure"
+        except Exception as e:
+            ok, error = False, str(e)
+
+        with self._lock:
+            worker.load -= 1
+            if ok:
+                self._finish(job, DONE)
+        if ok:
+            logger.info(f"Print job {job.id} done on '{worker.printer}'")
+            self._publish(job)
+            return
+
+        job.error = error
+        job._tried.add(worker.printer)
+        if job.attempts <= self.max_retries and not self._closed:
+            logger.warning(f"Print job {job.id} failed on '{worker.printer}' ({error}); retrying")
+            job.status = RETRYING
+            self._publish(job)
+            if self.retry_delay:
+                # Waiting here would also hold up every other job queued for this printer
+                timer = threading.Timer(self.retry_delay, self._retry, args=(job,))
+                timer.daemon = True
+                timer.start()
+            else:
+                self._retry(job)
+            return
+
+        with self._lock:
+            self._finish(job, FAILED)
+        logger.error(f"Print job {job.id} failed after {job.attempts} attempts: {error}")
+        self._publish(job)
@@ -0,0 +1,602 @@
+"""
+Printer backends.
+
+A printer name either belongs to the default backend (Windows GDI printers such as
+"Zebra ZD421"), carries a backend prefix ("socket://10.0.0.5:9100", "spool://line1"),
+or is mapped explicitly with assign_printer(). One process can drive a mixed fleet.
+"""
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import logging
+from concurrent.futures import Future
+from PIL import Image, ImageWin
+from . import printer_commands
+
+logger = logging.getLogger(__name__)
+
+# pywin32 is only available on Windows; keep this module importable elsewhere
+try:
+    import win32print
+    import win32ui
+    import win32con
+except ImportError:
+    win32print = win32ui = win32con = None
+
+
+class PrinterError(Exception):
+    """Raised by backends when a job cannot be delivered."""
+
+
+class Bitmap:
+    """
+    A raw bitmap buffer (e.g. packed 1-bit rows, MSB first) with its size and PIL mode.
+    Wrapped without copying when it has to be turned into an image.
+    """
+    __slots__ = ('data', 'size', 'mode')
+
+    def __init__(self, data, size, mode="1"):
+        self.data = data
+        self.size = tuple(size)
+        self.mode = mode
+
+    def to_image(self):
+        return Image.frombuffer(self.mode, self.size, self.data, "raw", self.mode, 0, 1)
+
+
+def as_image(source):
+    """
+    Returns a PIL image for an Image, a Bitmap, anything else with a to_image() method
+    (e.g. a DesignSnapshot, rendered here on the printing thread), or an image file path.
+    """
+    if isinstance(source, Image.Image):
+        return source
+    if hasattr(source, "to_image"):
+        return source.to_image()
+    if isinstance(source, (str, os.PathLike)):
+        img = Image.open(source)
+        img.load()
+        return img
+    raise TypeError(f"Cannot print object of type {type(source).__name__}")
+
+
+class PrinterCapabilities:
+    """What a printer reports about itself. Sizes and offsets are in device dots."""
+    __slots__ = ('dpi', 'printable_size', 'physical_size', 'offset', 'media')
+
+    def __init__(self, dpi, printable_size, physical_size=None, offset=(0, 0), media=()):
+        self.dpi = tuple(dpi)
+        self.printable_size = tuple(printable_size)
+        self.physical_size = tuple(physical_size or printable_size)
+        self.offset = tuple(offset)
+        self.media = tuple(media)
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __repr__(self):
+        return f"<PrinterCapabilities dpi={self.dpi} printable={self.printable_size}>"
+
+
+def _total_pages(images, copies):
+    try:
+        return len(images) * copies
+    except TypeError:
+        return None
+
+
+class PrinterBackend:
+    """Base class: a backend knows how to enumerate and deliver jobs to its printers."""
+    name = None
+    # Command language used when a printer has none configured (None = send images)
+    default_language = None
+
+    def is_available(self):
+        return True
+
+    def list_printers(self):
+        """Returns the printer names this backend can currently see."""
+        return []
+
+    def print_image(self, image, printer, copies=1):
+        """
+        Prints an in-memory image (PIL Image or Bitmap; see as_image) to printer,
+        the backend-local name with any prefix stripped.
+        """
+        raise NotImplementedError
+
+    def print_images(self, images, printer, copies=1, progress=None):
+        """
+        Prints several labels, each `copies` times, as a single job where the backend
+        supports it. progress(pages_done, total_pages) is called after every page;
+        total_pages is None when images is an iterator.
+        """
+        total = _total_pages(images, copies)
+        done = 0
+        for image in images:
+            self.print_image(image, printer, copies=copies)
+            done += copies
+            if progress:
+                progress(done, total)
+
+    def send_raw(self, printer, data):
+        """Delivers an already-encoded printer command job (ZPL, TSPL, EPL)."""
+        raise PrinterError(f"Backend '{self.name}' cannot send raw jobs")
+
+    def capabilities(self, printer):
+        """Returns the printer's PrinterCapabilities, or None if the backend cannot query them."""
+        return None
+
+    def release(self, printer=None):
+        """Drops any handles kept open for a printer (all printers if None)."""
+
+
+class _Stale(Exception):
+    """A cached printer context could not start a document."""
+
+
+class _GdiContext:
+    """A printer handle and device context kept open between jobs."""
+    __slots__ = ('handle', 'dc', 'caps', 'jobs', 'lock')
+
+    def __init__(self, handle, dc, caps):
+        self.handle = handle
+        self.dc = dc
+        self.caps = caps
+        self.jobs = 0
+        self.lock = threading.Lock()
+
+
+class GdiBackend(PrinterBackend):
+    """
+    Windows printers through the GDI device context.
+    A job is one spooler document: every label and copy is a page of it. With
+    device_copies, copies are requested from the driver (DEVMODE) instead of as pages.
+
+    The printer handle, device context and device caps are opened on first use and kept
+    per printer, so repeated jobs skip the setup. A job that fails on a cached context
+    drops it; if the cached handle had gone stale before anything was sent, the job is
+    retried once on a fresh one.
+    """
+    name = "gdi"
+
+    def __init__(self, device_copies=False):
+        self.device_copies = device_copies
+        self._contexts = {}
+        self._lock = threading.Lock()
+
+    def is_available(self):
+        return win32print is not None
+
+    def list_printers(self):
+        if win32print is None:
+            return []
+        printers = win32print.EnumPrinters(win32print.PRINTER_ENUM_LOCAL | win32print.PRINTER_ENUM_CONNECTIONS)
+        return [p[2] for p in printers]
+
+    def print_image(self, image, printer, copies=1):
+        self.print_images([image], printer, copies=copies)
+
+    def _create_dc(self, hPrinter, printer, copies):
+        if copies > 1:
+            import win32gui
+            devmode = win32print.GetPrinter(hPrinter, 2)["pDevMode"]
+            devmode.Copies = copies
+            devmode.Fields |= win32con.DM_COPIES
+            return win32ui.CreateDCFromHandle(win32gui.CreateDC("WINSPOOL", printer, devmode))
+        hDC = win32ui.CreateDC()
+        hDC.CreatePrinterDC(printer)
+        return hDC
+
+    def _media(self, hPrinter, printer):
+        try:
+            port = win32print.GetPrinter(hPrinter, 2)["pPortName"]
+            names = win32print.DeviceCapabilities(printer, port, win32con.DC_PAPERNAMES)
+            return [name.strip("\x00") for name in names]
+        except Exception as e:
+            logger.debug(f"Could not read media list for '{printer}': {e}")
+            return []
+
+    def _read_caps(self, hPrinter, hDC, printer):
+        caps = hDC.GetDeviceCaps
+        return PrinterCapabilities(
+            dpi=(caps(win32con.LOGPIXELSX), caps(win32con.LOGPIXELSY)),
+            printable_size=(caps(win32con.HORZRES), caps(win32con.VERTRES)),
+            physical_size=(caps(win32con.PHYSICALWIDTH), caps(win32con.PHYSICALHEIGHT)),
+            offset=(caps(win32con.PHYSICALOFFSETX), caps(win32con.PHYSICALOFFSETY)),
+            media=self._media(hPrinter, printer),
+        )
+
+    def _context(self, printer):
+        if win32print is None:
+            raise PrinterError("Printing to Windows printers requires pywin32")
+        with self._lock:
+            ctx = self._contexts.get(printer)
+            if ctx is None:
+                hPrinter = win32print.OpenPrinter(printer)
+                try:
+                    hDC = self._create_dc(hPrinter, printer, 1)
+                    ctx = _GdiContext(hPrinter, hDC, self._read_caps(hPrinter, hDC, printer))
+                except Exception:
+                    win32print.ClosePrinter(hPrinter)
+                    raise
+                self._contexts[printer] = ctx
+                logger.debug(f"Opened printer context for '{printer}': {ctx.caps}")
+            return ctx
+
+    def _close(self, ctx):
+        try:
+            ctx.dc.DeleteDC()
+        except Exception as e:
+            logger.debug(f"DeleteDC failed: {e}")
+        try:
+            win32print.ClosePrinter(ctx.handle)
+        except Exception as e:
+            logger.debug(f"ClosePrinter failed: {e}")
+
+    def release(self, printer=None):
+        with self._lock:
+            if printer is None:
+                contexts = list(self._contexts.values())
+                self._contexts.clear()
+            else:
+                ctx = self._contexts.pop(printer, None)
+                contexts = [ctx] if ctx else []
+        for ctx in contexts:
+            self._close(ctx)
+
+    def _discard(self, printer, ctx):
+        with self._lock:
+            if self._contexts.get(printer) is ctx:
+                del self._contexts[printer]
+        self._close(ctx)
+
+    def _with_context(self, printer, job):
+        """
+        Runs job(ctx) on the printer's cached context. job raises _Stale when the
+        document could not be started, which refreshes the context once.
+        """
+        for attempt in (1, 2):
+            ctx = self._context(printer)
+            with ctx.lock:
+                try:
+                    result = job(ctx)
+                    ctx.jobs += 1
+                    return result
+                except _Stale as e:
+                    self._discard(printer, ctx)
+                    if ctx.jobs == 0 or attempt == 2:
+                        raise e.__cause__
+                    logger.warning(f"Printer context for '{printer}' went stale ({e.__cause__}); reopening")
+                except Exception:
+                    self._discard(printer, ctx)
+                    raise
+
+    def capabilities(self, printer):
+        return self._context(printer).caps
+
+    def print_images(self, images, printer, copies=1, progress=None):
+        total = _total_pages(images, copies)
+        page_copies = 1 if self.device_copies else copies
+
+        def job(ctx):
+            device_copies = self.device_copies and copies > 1
+            # DEVMODE copies need their own DC; the plain one is reused across jobs
+            hDC = self._create_dc(ctx.handle, printer, copies) if device_copies else ctx.dc
+            try:
+                printer_size = ctx.caps.printable_size
+                try:
+                    hDC.StartDoc("Label Print Job")
+                except Exception as e:
+                    raise _Stale() from e
+                try:
+                    done = 0
+                    for image in images:
+                        # Draw image to the page; for label printers the page is the label.
+                        # The DIB is built once per label and reused for its copies.
+                        dib = ImageWin.Dib(as_image(image))
+                        for _ in range(page_copies):
+                            hDC.StartPage()
+                            dib.draw(hDC.GetHandleOutput(), (0, 0, printer_size[0], printer_size[1]))
+                            hDC.EndPage()
+                            done += 1
+                            if progress:
+                                progress(done, total)
+                except Exception:
+                    hDC.AbortDoc()
+                    raise
+                hDC.EndDoc()
+            finally:
+                if device_copies:
+                    hDC.DeleteDC()
+
+        self._with_context(printer, job)
+
+    def send_raw(self, printer, data):
+        def job(ctx):
+            # RAW bypasses the driver's rendering: the bytes go to the printer untouched
+            try:
+                win32print.StartDocPrinter(ctx.handle, 1, ("Label Print Job", None, "RAW"))
+            except Exception as e:
+                raise _Stale() from e
+            try:
+                win32print.StartPagePrinter(ctx.handle)
+                win32print.WritePrinter(ctx.handle, data)
+                win32print.EndPagePrinter(ctx.handle)
+            finally:
+                win32print.EndDocPrinter(ctx.handle)
+
+        self._with_context(printer, job)
+
+
+def encode_png(image):
+    buf = io.BytesIO()
+    image.save(buf, "PNG")
+    return buf.getvalue()
+
+
+class RawSocketBackend(PrinterBackend):
+    """
+    Network printers that accept raw jobs on a TCP port (JetDirect/port 9100 style).
+    Printer names are "host" or "host:port". Images are encoded in the printer's
+    command language (ZPL unless configured otherwise with set_printer_language).
+    """
+    name = "socket"
+    default_language = "zpl"
+    DEFAULT_PORT = 9100
+
+    def __init__(self, timeout=10.0):
+        self.timeout = timeout
+        self.printers = []
+
+    def list_printers(self):
+        return list(self.printers)
+
+    def _address(self, printer):
+        host, _, port = printer.rpartition(":")
+        if not host:
+            return printer, self.DEFAULT_PORT
+        return host, int(port)
+
+    def send_raw(self, printer, data):
+        """Sends raw bytes to the printer in one connection."""
+        try:
+            with socket.create_connection(self._address(printer), timeout=self.timeout) as conn:
+                conn.sendall(data)
+        except OSError as e:
+            raise PrinterError(f"Could not send job to {printer}: {e}") from e
+
+    def print_image(self, image, printer, copies=1):
+        self.send_raw(printer, printer_commands.encode(as_image(image), self.default_language, copies=copies))
+
+    def print_images(self, images, printer, copies=1, progress=None):
+        # All labels go out in one connection
+        jobs = [printer_commands.encode(as_image(image), self.default_language, copies=copies)
+                for image in images]
+        self.send_raw(printer, b"".join(jobs))
+        if progress:
+            progress(len(jobs) * copies, len(jobs) * copies)
+
+
+class SpoolDirectoryBackend(PrinterBackend):
+    """
+    Stand-in printer that writes each job to <root>/<printer>/ as an image plus a JSON ticket.
+    Lets the print pipeline run and be load-tested with no printer attached.
+    """
+    name = "spool"
+
+    def __init__(self, root=None):
+        self.root = root or os.environ.get("LABEL_SPOOL_DIR") or os.path.join(tempfile.gettempdir(), "label_spool")
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def list_printers(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def _next_job_name(self):
+        with self._lock:
+            self._seq += 1
+            return f"job_{time.time_ns()}_{os.getpid()}_{self._seq:06d}"
+
+    def _write_atomic(self, path, data):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def print_image(self, image, printer, copies=1):
+        return self.print_images([image], printer, copies=copies)
+
+    def print_images(self, images, printer, copies=1, progress=None):
+        """Writes one job: a PNG per label plus a single JSON ticket listing them."""
+        directory = os.path.join(self.root, printer)
+        os.makedirs(directory, exist_ok=True)
+        job = self._next_job_name()
+        total = _total_pages(images, copies)
+        pages = []
+        for page, image in enumerate(images, 1):
+            image = as_image(image)
+            image_name = f"{job}_p{page:04d}.png"
+            self._write_atomic(os.path.join(directory, image_name), encode_png(image))
+            pages.append({'image': image_name, 'size': list(image.size), 'mode': image.mode})
+            if progress:
+                progress(page * copies, total)
+        ticket = {'printer': printer, 'copies': copies, 'pages': pages,
+                  'image': pages[0]['image'] if pages else None}
+        self._write_atomic(os.path.join(directory, job + ".json"), json.dumps(ticket).encode("utf-8"))
+        logger.debug(f"Spooled {job} ({len(pages)} labels x {copies} copies) to {directory}")
+        return os.path.join(directory, job + ".json")
+
+    def send_raw(self, printer, data):
+        directory = os.path.join(self.root, printer)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self._next_job_name() + ".prn")
+        self._write_atomic(path, data)
+        logger.debug(f"Spooled raw job ({len(data)} bytes) to {path}")
+        return path
+
+
+# backend name -> backend instance
+_backends = {}
+# printer name -> (backend name, backend-local printer name)
+_assignments = {}
+# printer name -> (command language, encoder options)
+_languages = {}
+DEFAULT_BACKEND = GdiBackend.name
+
+
+def register_backend(backend):
+    """Registers (or replaces) a backend under its name."""
+    _backends[backend.name] = backend
+    return backend
+
+
+def get_backend(name):
+    try:
+        return _backends[name]
+    except KeyError:
+        raise PrinterError(f"Unknown printer backend: {name}") from None
+
+
+def backends():
+    return dict(_backends)
+
+
+def assign_printer(printer_name, backend_name, target=None):
+    """Routes a printer name to a backend; target is the backend-local name (defaults to printer_name)."""
+    get_backend(backend_name)
+    _assignments[printer_name] = (backend_name, target or printer_name)
+
+
+def unassign_printer(printer_name):
+    _assignments.pop(printer_name, None)
+
+
+def set_printer_language(printer_name, language, **options):
+    """
+    Sends jobs for a printer as raw commands (zpl, tspl, epl) instead of images.
+    options go to the encoder, e.g. compression="z64", threshold=100, dpi=300.
+    Pass language=None to go back to the backend default.
+    """
+    if language is None:
+        _languages.pop(printer_name, None)
+        return
+    if language not in printer_commands.LANGUAGES:
+        raise ValueError(f"Unknown printer language: {language}")
+    _languages[printer_name] = (language, options)
+
+
+def printer_language(printer_name, backend=None):
+    """Returns (language, options) for a printer; language is None for image jobs."""
+    if printer_name in _languages:
+        return _languages[printer_name]
+    return (backend.default_language if backend else None), {}
+
+
+def resolve(printer_name):
+    """Returns (backend, backend-local printer name) for a printer name."""
+    if printer_name in _assignments:
+        backend_name, target = _assignments[printer_name]
+        return get_backend(backend_name), target
+    scheme, sep, rest = printer_name.partition("://")
+    if sep and scheme in _backends:
+        return _backends[scheme], rest
+    return get_backend(DEFAULT_BACKEND), printer_name
+
+
+def list_printers():
+    """Returns every printer name visible through the registered backends (no caching)."""
+    names = []
+    for backend in _backends.values():
+        if not backend.is_available():
+            continue
+        try:
+            local_names = backend.list_printers()
+        except Exception as e:
+            logger.error(f"Failed to list printers for backend '{backend.name}': {e}", exc_info=True)
+            continue
+        prefix = "" if backend.name == DEFAULT_BACKEND else f"{backend.name}://"
+        names.extend(prefix + name for name in local_names)
+    names.extend(name for name in _assignments if name not in names)
+    return names
+
+
+class PrinterRegistry:
+    """
+    Enumerates printers once and caches each printer's capabilities.
+    refresh() re-enumerates on a background thread and returns a Future, so a UI can
+    fill its printer list without blocking on the spooler.
+    """
+
+    def __init__(self):
+        self._names = None
+        self._caps = {}
+        self._lock = threading.Lock()
+        self._pending = None
+
+    def printers(self, refresh=False):
+        """Returns the cached printer names, enumerating on first use or when refresh is set."""
+        with self._lock:
+            names = self._names
+        if names is None or refresh:
+            names = list_printers()
+            with self._lock:
+                self._names = names
+                self._caps.clear()
+        return list(names)
+
+    def refresh(self):
+        """Re-enumerates in the background; returns a Future with the printer names."""
+        with self._lock:
+            if self._pending is not None and not self._pending.done():
+                return self._pending
+            future = self._pending = Future()
+
+        def run():
+            try:
+                future.set_result(self.printers(refresh=True))
+            except Exception as e:
+                logger.error(f"Failed to enumerate printers: {e}", exc_info=True)
+                future.set_exception(e)
+
+        threading.Thread(target=run, name="printer-enum", daemon=True).start()
+        return future
+
+    def capabilities(self, printer_name, refresh=False):
+        """Returns (and caches) a printer's PrinterCapabilities, or None if unknown."""
+        with self._lock:
+            if not refresh and printer_name in self._caps:
+                return self._caps[printer_name]
+        backend, target = resolve(printer_name)
+        caps = backend.capabilities(target)
+        with self._lock:
+            self._caps[printer_name] = caps
+        return caps
+
+    def invalidate(self, printer_name=None):
+        """Forgets cached capabilities and closes kept-open handles (all printers if None)."""
+        with self._lock:
+            if printer_name is None:
+                self._caps.clear()
+                self._names = None
+            else:
+                self._caps.pop(printer_name, None)
+        if printer_name is None:
+            for backend in _backends.values():
+                backend.release()
+        else:
+            backend, target = resolve(printer_name)
+            backend.release(target)
+
+
+registry = PrinterRegistry()
+
+register_backend(GdiBackend())
+register_backend(RawSocketBackend())
+register_backend(SpoolDirectoryBackend())
@@ -0,0 +1,172 @@
+"""
+Printer-native raw command encoders for thermal label printers.
+
+Turns a rendered label into a single ZPL (^GF), TSPL (BITMAP) or EPL (GW) job that is
+submitted with the RAW datatype instead of a full-page GDI bitmap. Copies are requested
+in the command stream, so the job is sent once however many labels are printed.
+"""
+import base64
+import binascii
+import zlib
+import logging
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+LANGUAGES = ("zpl", "tspl", "epl")
+ZPL_COMPRESSIONS = ("acs", "z64", "hex")
+
+
+def _to_gray(image):
+    if image.mode in ("RGBA", "LA"):
+        # Composite on white so transparent areas do not print
+        background = Image.new("RGBA", image.size, "white")
+        image = Image.alpha_composite(background, image.convert("RGBA"))
+    return image.convert("L")
+
+
+def to_monochrome(image, threshold=128):
+    """Returns a mode "1" image; pixels darker than threshold become black dots."""
+    if image.mode == "1":
+        return image
+    return _to_gray(image).point(lambda v: 255 if v >= threshold else 0, "1")
+
+
+def packed_rows(image, threshold=128, black_is_one=True):
+    """
+    Returns (bytes_per_row, data) of the label as packed 1-bit rows, MSB first.
+    ZPL wants 1 = dot; TSPL and EPL want 0 = dot (PIL's own layout).
+    Rows are padded to whole bytes with blank dots.
+    """
+    gray = _to_gray(image)
+    bytes_per_row = (gray.width + 7) // 8
+    if gray.width % 8:
+        padded = Image.new("L", (bytes_per_row * 8, gray.height), 255)
+        padded.paste(gray, (0, 0))
+        gray = padded
+    if black_is_one:
+        mono = gray.point(lambda v: 0 if v >= threshold else 255, "1")
+    else:
+        mono = gray.point(lambda v: 255 if v >= threshold else 0, "1")
+    return bytes_per_row, mono.tobytes()
+
+
+def _acs_count(n):
+    """ZPL alternative compression scheme repeat count: G..Y = 1..19, g..z = 20..400."""
+    out = []
+    while n >= 400:
+        out.append("z")
+        n -= 400
+    if n >= 20:
+        out.append(chr(ord("g") + n // 20 - 1))
+        n %= 20
+    if n:
+        out.append(chr(ord("G") + n - 1))
+    return "".join(out)
+
+
+def _acs_row(row):
+    """Compresses one row of hex digits with ZPL run-length codes."""
+    # ',' fills the rest of the row with 0, '!' with 1
+    stripped = row.rstrip("0")
+    tail = ","
+    if len(stripped) == len(row):
+        stripped = row.rstrip("F")
+        tail = "!" if len(stripped) < len(row) else ""
+
+    out = []
+    i = 0
+    while i < len(stripped):
+        ch = stripped[i]
+        j = i
+        while j < len(stripped) and stripped[j] == ch:
+            j += 1
+        run = j - i
+        out.append((_acs_count(run) if run > 1 else "") + ch)
+        i = j
+    out.append(tail)
+    return "".join(out)
+
+
+def compress_acs(data, bytes_per_row):
+    """ZPL compressed ASCII hex; ':' repeats the previous row."""
+    hex_data = binascii.hexlify(data).decode("ascii").upper()
+    width = bytes_per_row * 2
+    out = []
+    previous = None
+    for start in range(0, len(hex_data), width):
+        row = hex_data[start:start + width]
+        out.append(":" if row == previous else _acs_row(row))
+        previous = row
+    return "".join(out)
+
+
+def compress_z64(data):
+    """ZPL Z64: base64 of zlib-deflated data followed by its CRC-16 (CCITT)."""
+    encoded = base64.b64encode(zlib.compress(data, 9)).decode("ascii")
+    crc = binascii.crc_hqx(encoded.encode("ascii"), 0)
+    return f":Z64:{encoded}:{crc:04X}"
+
+
+def zpl_graphic_field(image, compression="acs", threshold=128):
+    """Returns a ^GF command drawing the image at the current field origin."""
+    bytes_per_row, data = packed_rows(image, threshold)
+    if compression == "acs":
+        field = compress_acs(data, bytes_per_row)
+    elif compression == "z64":
+        field = compress_z64(data)
+    elif compression == "hex":
+        field = binascii.hexlify(data).decode("ascii").upper()
+    else:
+        raise ValueError(f"Unknown ZPL compression: {compression}")
+    return f"^GFA,{len(data)},{len(data)},{bytes_per_row},{field}"
+
+
+def encode_zpl(image, copies=1, compression="acs", threshold=128, **_):
+    return (
+        f"^XA^PW{image.width}^LL{image.height}"
+        f"^FO0,0{zpl_graphic_field(image, compression, threshold)}^FS"
+        f"^PQ{copies}^XZ\n"
+    ).encode("ascii")
+
+
+def encode_tspl(image, copies=1, threshold=128, dpi=203, gap_mm=2, **_):
+    # TSPL bitmaps use 0 = dot, which is PIL's native 1-bit layout
+    bytes_per_row, data = packed_rows(image, threshold, black_is_one=False)
+    width_mm = image.width * 25.4 / dpi
+    height_mm = image.height * 25.4 / dpi
+    header = (
+        f"SIZE {width_mm:.1f} mm,{height_mm:.1f} mm\r\n"
+        f"GAP {gap_mm} mm,0 mm\r\n"
+        f"CLS\r\n"
+        f"BITMAP 0,0,{bytes_per_row},{image.height},0,"
+    ).encode("ascii")
+    return header + data + f"\r\nPRINT 1,{copies}\r\n".encode("ascii")
+
+
+def encode_epl(image, copies=1, threshold=128, **_):
+    # EPL GW also uses 0 = dot
+    bytes_per_row, data = packed_rows(image, threshold, black_is_one=False)
+    header = (
+        f"\nN\nq{bytes_per_row * 8}\nQ{image.height},24\n"
+        f"GW0,0,{bytes_per_row},{image.height},"
+    ).encode("ascii")
+    return header + data + f"\nP{copies}\n".encode("ascii")
+
+
+_ENCODERS = {
+    "zpl": encode_zpl,
+    "tspl": encode_tspl,
+    "epl": encode_epl,
+}
+
+
+def encode(image, language, copies=1, **options):
+    """Encodes a rendered label as a raw printer job in the given command language."""
+    try:
+        encoder = _ENCODERS[language]
+    except KeyError:
+        raise ValueError(f"Unknown printer language: {language}") from None
+    data = encoder(image, copies=copies, **options)
+    logger.debug(f"Encoded {image.width}x{image.height} label as {language}: {len(data)} bytes")
+    return data
@@ -1,62 +1,86 @@
-import win32print
-import win32ui
-import win32con
-from PIL import Image, ImageWin
 import logging
+from . import printer_backends
+from . import printer_commands
+from .printer_backends import Bitmap
 
 logger = logging.getLogger(__name__)
 
 def list_printers():
     """Returns a list of available printers."""
     try:
-        printers = win32print.EnumPrinters(win32print.PRINTER_ENUM_LOCAL | win32print.PRINTER_ENUM_CONNECTIONS)
-        printer_names = [p[2] for p in printers]
+        printer_names = printer_backends.list_printers()
         logger.debug(f"Available printers: {printer_names}")
         return printer_names
     except Exception as e:
         logger.error(f"Failed to list printers: {e}", exc_info=True)
         return []
 
-def print_image(image_path, printer_name, copies=1):
-    """Prints the image to the specified printer."""
-    logger.info(f"Attempting to print '{image_path}' to '{printer_name}' with {copies} copies.")
+def refresh_printers():
+    """
+    Enumerates printers on a background thread and caches the result.
+    Returns a Future with the printer names; poll it instead of blocking the UI.
+    """
+    return printer_backends.registry.refresh()
+
+def get_capabilities(printer_name, refresh=False):
+    """Returns the cached PrinterCapabilities of a printer, or None if they cannot be queried."""
+    try:
+        return printer_backends.registry.capabilities(printer_name, refresh=refresh)
+    except Exception as e:
+        logger.error(f"Failed to query capabilities of '{printer_name}': {e}", exc_info=True)
+        return None
+
+def print_image(image, printer_name, copies=1, debug_path=None):
+    """
+    Prints the image to the specified printer.
+    image is a PIL Image, a Bitmap buffer, or an image file path. The image is sent as-is,
+    so callers printing from another thread should pass a snapshot (image.copy()).
+    debug_path optionally saves the exact image that was submitted.
+    """
+    logger.info(f"Attempting to print to '{printer_name}' with {copies} copies.")
+    try:
+        backend, target = printer_backends.resolve(printer_name)
+
+        img = printer_backends.as_image(image)
+        logger.debug(f"Image ready. Size: {img.size}, mode: {img.mode}")
+        if debug_path:
+            img.save(debug_path)
+            logger.debug(f"Saved print debug artifact to {debug_path}")
+
+        language, options = printer_backends.printer_language(printer_name, backend)
+        if language:
+            data = printer_commands.encode(img, language, copies=copies, **options)
+            backend.send_raw(target, data)
+        else:
+            backend.print_image(img, target, copies=copies)
+        logger.info(f"Print job sent successfully via '{backend.name}' backend.")
+        return True
+    except Exception as e:
+        logger.error(f"Error printing: {e}", exc_info=True)
+        return False
+
+def print_images(images, printer_name, copies=1, progress=None):
+    """
+    Prints several labels (e.g. a batch run), each `copies` times, as one spooler job.
+    progress(pages_done, total_pages) is called as pages are submitted.
+    """
+    logger.info(f"Attempting to print a multi-label job to '{printer_name}' with {copies} copies each.")
     try:
-        # Open Printer
-        hPrinter = win32print.OpenPrinter(printer_name)
-        try:
-            # Create Device Context
-            hDC = win32ui.CreateDC()
-            hDC.CreatePrinterDC(printer_name)
-
-            img = Image.open(image_path)
-            logger.debug(f"Image loaded. Size: {img.size}")
-            
-            # Loop for copies
-            for i in range(copies):
-                hDC.StartDoc(f"Label Print Job {i+1}")
-                hDC.StartPage()
-
-                # Get printable area
-                printable_area = hDC.GetDeviceCaps(win32con.HORZRES), hDC.GetDeviceCaps(win32con.VERTRES)
-                printer_size = printable_area
-                
-                # Draw image (scale to fit if necessary, or 1:1)
-                # For label printers, we usually want 1:1 mapping if DPI matches, 
-                # or scale to page if we treat the page as the label.
-                # Here we simply draw it to the DC. PIL ImageWin makes this easy.
-                
-                dib = ImageWin.Dib(img)
-                dib.draw(hDC.GetHandleOutput(), (0, 0, printer_size[0], printer_size[1]))
-
-                hDC.EndPage()
-                hDC.EndDoc()
-                
-            hDC.DeleteDC()
-            logger.info("Print job sent successfully.")
-            return True
-        finally:
-            win32print.ClosePrinter(hPrinter)
-            
+        backend, target = printer_backends.resolve(printer_name)
+        language, options = printer_backends.printer_language(printer_name, backend)
+        if language:
+            # One raw stream; each label block carries its own copy count
+            jobs = []
+            for image in images:
+                jobs.append(printer_commands.encode(printer_backends.as_image(image), language,
+                                                    copies=copies, **options))
+            backend.send_raw(target, b"".join(jobs))
+            if progress:
+                progress(len(jobs) * copies, len(jobs) * copies)
+        else:
+            backend.print_images(images, target, copies=copies, progress=progress)
+        logger.info(f"Multi-label job sent successfully via '{backend.name}' backend.")
+        return True
     except Exception as e:
         logger.error(f"Error printing: {e}", exc_info=True)
         return False
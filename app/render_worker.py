@@ -0,0 +1,92 @@
+"""
+Background rendering for the designer preview.
+
+The UI edits its LabelDesigner with live_render off and submits DesignSnapshots; a single
+worker thread renders them with its own designer (and raster cache). Only the newest
+pending snapshot is rendered, so a burst of edits costs one render, and the UI collects
+finished frames from after() with take_frame(). Consecutive snapshots are diffed by the
+worker's designer, so dragging one element repaints only its old and new rectangles.
+"""
+import threading
+import logging
+
+from .label_designer import LabelDesigner
+
+logger = logging.getLogger(__name__)
+
+
+class RenderWorker:
+    """Renders design snapshots off the UI thread; the latest submitted snapshot wins."""
+
+    def __init__(self):
+        self._designer = None
+        self._pending = None
+        self._rendering = False
+        # (snapshot version, image) not yet collected by take_frame()
+        self._frame = None
+        self._last_version = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self.rendered = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._loop, name="render-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, snapshot):
+        """Queues a snapshot for rendering, replacing any snapshot still waiting."""
+        with self._cond:
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = snapshot
+            self._cond.notify_all()
+
+    def take_frame(self):
+        """Returns (version, image) of the newest finished frame once, or None; call from the UI thread."""
+        with self._cond:
+            frame, self._frame = self._frame, None
+            return frame
+
+    def busy(self):
+        with self._cond:
+            return self._pending is not None or self._rendering
+
+    def wait(self, timeout=None):
+        """Blocks until every submitted snapshot is rendered; returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending is None and not self._rendering, timeout)
+
+    def stop(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _render(self, snapshot):
+        if self._designer is None or (self._designer.width_mm, self._designer.height_mm,
+                                      self._designer.dpi) != (snapshot.width_mm, snapshot.height_mm, snapshot.dpi):
+            self._designer = LabelDesigner.from_snapshot(snapshot)
+        else:
+            self._designer.load_snapshot(snapshot)
+        # Repaints happen on a copy of the canvas, so a frame is never modified after hand-off
+        return self._designer.image
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._closed)
+                if self._closed:
+                    return
+                snapshot, self._pending = self._pending, None
+                self._rendering = True
+            image = None
+            try:
+                image = self._render(snapshot)
+            except Exception as e:
+                logger.error(f"Render of snapshot {snapshot.version} failed: {e}", exc_info=True)
+            with self._cond:
+                self._rendering = False
+                if image is not None and snapshot.version > self._last_version:
+                    self._last_version = snapshot.version
+                    self._frame = (snapshot.version, image)
+                    self.rendered += 1
+                self._cond.notify_all()
@@ -0,0 +1,173 @@
+"""
+Multi-line text layout for text elements with a bounding box.
+
+Text is word-wrapped to the box width (explicit newlines are kept, words wider than the
+box are broken) and, with auto-fit, set at the largest size up to font_size that fits.
+Auto-fit binary-searches sizes using per-character advances measured once at a
+reference size and scaled, so sizing a new string costs dictionary lookups rather than
+a textbbox call per candidate size; the chosen size is then checked with the real fonts,
+measuring lines as fallback runs exactly as they are drawn.
+"""
+import threading
+import logging
+
+from . import font_cache
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_SIZE = 100
+MIN_FIT_SIZE = 6
+ALIGNMENTS = ("left", "center", "right")
+
+
+class GlyphMetrics:
+    """Memoized advances and line metrics at REFERENCE_SIZE, scaled to any size."""
+
+    def __init__(self, fallback=None):
+        self.fallback = fallback
+        # (font name, char) -> advance at REFERENCE_SIZE
+        self._advances = {}
+        # font name -> (ascent, descent) at REFERENCE_SIZE
+        self._lines = {}
+        self._lock = threading.Lock()
+        self._generation = None
+
+    def _sync(self):
+        # Advances were measured with the fallback fonts chosen by an older index
+        generation = self.fallback.generation if self.fallback is not None else None
+        if generation != self._generation:
+            with self._lock:
+                self._advances.clear()
+                self._generation = generation
+
+    def advance(self, font_name, ch):
+        key = (font_name, ch)
+        width = self._advances.get(key)
+        if width is None:
+            name = self.fallback.font_for(font_name, ord(ch)) if self.fallback is not None else font_name
+            width = font_cache.get_font(name, REFERENCE_SIZE).getlength(ch)
+            with self._lock:
+                self._advances[key] = width
+        return width
+
+    def text_width(self, font_name, text, size):
+        self._sync()
+        return sum(self.advance(font_name, ch) for ch in text) * size / REFERENCE_SIZE
+
+    def line_height(self, font_name, size):
+        metrics = self._lines.get(font_name)
+        if metrics is None:
+            metrics = font_cache.get_font(font_name, REFERENCE_SIZE).getmetrics()
+            with self._lock:
+                self._lines[font_name] = metrics
+        return sum(metrics) * size / REFERENCE_SIZE
+
+
+def wrap(text, width, measure):
+    """
+    Greedy word wrap. measure(text) returns a width; explicit newlines are kept and words
+    wider than the line are broken between characters.
+    """
+    lines = []
+    for paragraph in text.split("\n"):
+        line = ""
+        for word in paragraph.split(" "):
+            candidate = f"{line} {word}" if line else word
+            if measure(candidate) <= width:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+            line = ""
+            # Break an over-long word
+            for ch in word:
+                if line and measure(line + ch) > width:
+                    lines.append(line)
+                    line = ""
+                line += ch
+        lines.append(line)
+    return lines
+
+
+class TextBlock:
+    """A laid-out text: the size used, its lines and the line pitch in pixels."""
+    __slots__ = ('size', 'lines', 'line_height')
+
+    def __init__(self, size, lines, line_height):
+        self.size = size
+        self.lines = lines
+        self.line_height = line_height
+
+    @property
+    def height(self):
+        return self.line_height * len(self.lines)
+
+    def __repr__(self):
+        return f"<TextBlock size={self.size} lines={len(self.lines)}>"
+
+
+class TextLayout:
+    """Lays out boxed text, sharing memoized glyph metrics between calls."""
+
+    def __init__(self, fallback=None):
+        self.metrics = GlyphMetrics(fallback)
+
+    @property
+    def fallback(self):
+        return self.metrics.fallback
+
+    @fallback.setter
+    def fallback(self, fallback):
+        self.metrics = GlyphMetrics(fallback)
+
+    def line_width(self, text, font_name, size):
+        """Advance width of one line as LabelDesigner.layout_text() places its fallback runs."""
+        runs = self.fallback.split_runs(text, font_name) if self.fallback is not None else None
+        if not runs:
+            return font_cache.get_font(font_name, size).getlength(text)
+        if len(runs) == 1:
+            return font_cache.get_font(runs[0][0], size).getlength(text)
+        return sum(int(round(font_cache.get_font(name, size).getlength(run))) for name, run in runs)
+
+    def _estimate(self, text, font_name, size, width):
+        lines = wrap(text, width, lambda s: self.metrics.text_width(font_name, s, size))
+        return lines, self.metrics.line_height(font_name, size)
+
+    def _fits(self, lines, line_height, width, height, measure):
+        if height is not None and line_height * len(lines) > height:
+            return False
+        return all(measure(line) <= width for line in lines)
+
+    def _exact(self, text, font_name, size, width):
+        measure = lambda s: self.line_width(s, font_name, size)
+        lines = wrap(text, width, measure)
+        ascent, descent = font_cache.get_font(font_name, size).getmetrics()
+        return lines, ascent + descent, measure
+
+    def layout(self, text, font_name, font_size, width, height=None, fit=False):
+        """
+        Returns a TextBlock for text wrapped to width. With fit, the size is the largest
+        up to font_size whose wrapped lines fit width x height.
+        """
+        size = int(font_size)
+        if fit:
+            low, high = MIN_FIT_SIZE, max(size, MIN_FIT_SIZE)
+            # Largest size whose estimate fits; the estimate ignores kerning and hinting
+            while low < high:
+                mid = (low + high + 1) // 2
+                lines, line_height = self._estimate(text, font_name, mid, width)
+                estimate = lambda s, mid=mid: self.metrics.text_width(font_name, s, mid)
+                if self._fits(lines, line_height, width, height, estimate):
+                    low = mid
+                else:
+                    high = mid - 1
+            size = low
+            # Confirm with the real font, stepping down if the estimate was optimistic
+            while True:
+                lines, line_height, measure = self._exact(text, font_name, size, width)
+                if size <= MIN_FIT_SIZE or self._fits(lines, line_height, width, height, measure):
+                    break
+                size -= 1
+        else:
+            lines, line_height, _ = self._exact(text, font_name, size, width)
+        return TextBlock(size, lines, line_height)
@@ -0,0 +1,159 @@
+"""
+ZPL export using printer-resident fonts and stored graphics.
+
+Text elements whose font has a printer-resident equivalent become ^A/^FD fields (a few
+dozen bytes instead of a bitmap). Images, barcodes and static text that has to stay
+rasterized are downloaded once as stored graphics (~DG) and recalled per label with ^XG,
+so a variable-data run is one small header plus a short command block per label.
+
+Barcodes are sent as the designer's dot-snapped bitmaps rather than ^BC/^BQ fields, so
+the printed symbol is exactly the one in the preview. All bitmaps come from the designer's
+monochrome pipeline (images dithered per element), so they match PNG and GDI output. Resident fonts have their own
+metrics, so text positions match the preview to within a few dots rather than exactly.
+"""
+import logging
+import os
+
+from . import batch
+from . import font_cache
+from . import printer_commands
+
+logger = logging.getLogger(__name__)
+
+# TTF file name (lower case) -> resident ZPL font; font 0 is the scalable sans font
+RESIDENT_FONTS = {
+    'arial.ttf': '0',
+    'arialbd.ttf': '0',
+    'calibri.ttf': '0',
+    'calibrib.ttf': '0',
+    'tahoma.ttf': '0',
+    'verdana.ttf': '0',
+    'segoeui.ttf': '0',
+    'dejavusans.ttf': '0',
+    'dejavusans-bold.ttf': '0',
+    'liberationsans-regular.ttf': '0',
+}
+
+# Designer rotation (degrees counter-clockwise) -> ZPL field orientation
+ORIENTATIONS = {0: 'N', 90: 'B', 180: 'I', 270: 'R'}
+
+# Resident fonts cover Latin-1 plus Latin Extended-A/B with ^CI28 (UTF-8)
+_MAX_RESIDENT_CODEPOINT = 0x024F
+
+
+def escape_field_data(text):
+    """Escapes ZPL control characters for a ^FH-enabled ^FD field."""
+    return text.replace('_', '_5F').replace('^', '_5E').replace('~', '_7E')
+
+
+class ZplExporter:
+    """Exports a LabelDesigner design as a ZPL command stream."""
+
+    def __init__(self, designer, resident_fonts=None, graphic_prefix="LBL"):
+        self.designer = designer
+        self.resident_fonts = RESIDENT_FONTS if resident_fonts is None else resident_fonts
+        self.graphic_prefix = graphic_prefix
+        # element id -> template, for text and barcode values with {{field}} placeholders
+        self.templates = designer.batch_templates()
+
+    def _graphic_name(self, el):
+        # ZPL object names are at most 8 characters: keep the prefix to 3
+        return f"R:{self.graphic_prefix}{el.id:05d}.GRF"
+
+    def resident_font(self, el, content=None):
+        """Returns the resident font id for a text element, or None if it must be rasterized."""
+        if el.type != 'text' or el.get('rotation', 0) not in ORIENTATIONS:
+            return None
+        if el.get('box_width'):
+            # Wrapped and auto-fitted text is laid out by the designer
+            return None
+        # Fonts picked from the font index are stored as full paths
+        font = self.resident_fonts.get(os.path.basename(el.get('font', 'arial.ttf')).lower())
+        if font is None:
+            return None
+        text = el.content if content is None else content
+        if any(ord(ch) > _MAX_RESIDENT_CODEPOINT for ch in text):
+            return None
+        return font
+
+    def _is_stored(self, el):
+        """Static elements that need a bitmap are downloaded once as stored graphics."""
+        return el.id not in self.templates and (el.type != 'text' or self.resident_font(el) is None)
+
+    def header(self):
+        """Returns the ~DG downloads for every stored graphic; send once per job."""
+        parts = []
+        for el in self.designer.elements:
+            if not self._is_stored(el):
+                continue
+            raster = self.designer.get_monochrome_raster(el)
+            if raster is None:
+                continue
+            bytes_per_row, data = printer_commands.packed_rows(raster)
+            parts.append(f"~DG{self._graphic_name(el)},{len(data)},{bytes_per_row},"
+                         f"{printer_commands.compress_acs(data, bytes_per_row)}\n")
+        return "".join(parts).encode("ascii")
+
+    def _text_field(self, el, content, font):
+        size = el.font_size
+        x, y = el.x, el.y
+        if el.get('rotation', 0) == 0:
+            # Designer positions are the top-left of the ink; ZPL's are the text origin cell
+            bbox = self.designer.measure_text(content, font_cache.get_font(el.get('font', 'arial.ttf'), size))
+            x, y = x - bbox[0], y - bbox[1]
+        orientation = ORIENTATIONS[el.get('rotation', 0)]
+        return (f"^FO{max(x, 0)},{max(y, 0)}^A{font}{orientation},{size},{size}"
+                f"^FH^FD{escape_field_data(content)}^FS")
+
+    def _inline_graphic(self, el, content):
+        # Variable text in a non-resident font, or a variable barcode: rasterize this label's value
+        field = el.TEMPLATE_FIELD
+        original = getattr(el, field)
+        setattr(el, field, content)
+        try:
+            raster = self.designer.get_monochrome_raster(el)
+        finally:
+            setattr(el, field, original)
+        if raster is None:
+            return ""
+        return f"^FO{el.x},{el.y}{printer_commands.zpl_graphic_field(raster)}^FS"
+
+    def label(self, record=None, copies=1):
+        """Returns the ^XA..^XZ block for one label, filling placeholders from record."""
+        d = self.designer
+        parts = [f"^XA^CI28^PW{d.width_px}^LL{d.height_px}"]
+        for el in d.elements:
+            if self._is_stored(el):
+                parts.append(f"^FO{el.x},{el.y}^XG{self._graphic_name(el)},1,1^FS")
+                continue
+            content = getattr(el, el.TEMPLATE_FIELD)
+            if el.id in self.templates:
+                content = batch.fill_placeholders(self.templates[el.id], record or {})
+            font = self.resident_font(el, content)
+            if font is not None:
+                parts.append(self._text_field(el, content, font))
+            else:
+                parts.append(self._inline_graphic(el, content))
+        parts.append(f"^PQ{copies}^XZ\n")
+        return "".join(parts).encode("utf-8")
+
+    def stream(self, records=None, copies=1):
+        """Yields the header, then one label block per record (or a single label)."""
+        yield self.header()
+        if records is None:
+            yield self.label(copies=copies)
+            return
+        if isinstance(records, str):
+            records = batch.read_records(records)
+        for record in records:
+            yield self.label(record, copies=copies)
+
+    def export(self, path, records=None, copies=1):
+        """Writes the command stream to a file and returns its size in bytes."""
+        size = 0
+        with open(path, "wb") as f:
+            for chunk in self.stream(records, copies):
+                f.write(chunk)
+                size += len(chunk)
+        logger.info(f"Exported ZPL to {path} ({size} bytes)")
+        return size
@@ -0,0 +1,122 @@
+import os
+import shutil
+
+import pytest
+from PIL import Image, ImageFont
+
+from app import font_manager
+from app.font_fallback import FontFallback
+from app.font_manager import FontIndex
+from app.label_designer import LabelDesigner
+
+# Test font used by most tests, resolved by Pillow like any font name
+FONT = "DejaVuSans.ttf"
+
+
+def _font_path(name):
+    """Full path of an installed font, or None when it is not installed."""
+    try:
+        path = ImageFont.truetype(name, 10).path
+    except OSError:
+        return None
+    return path if isinstance(path, str) else None
+
+
+@pytest.fixture(scope="session", autouse=True)
+def font_index(tmp_path_factory):
+    """
+    A font index over the installed DejaVu fonts only, so tests never read or write the
+    user's index cache and results do not depend on what else is installed.
+    """
+    fonts = tmp_path_factory.mktemp("fonts")
+    dejavu = _font_path(FONT)
+    if dejavu is not None:
+        for name in os.listdir(os.path.dirname(dejavu)):
+            if name.startswith("DejaVu") and name.endswith(".ttf"):
+                shutil.copy(os.path.join(os.path.dirname(dejavu), name), fonts / name)
+    index = FontIndex(str(tmp_path_factory.mktemp("cache") / "index.json"), dirs=[str(fonts)])
+    index.scan()
+
+    saved_index, saved_env = font_manager._index, os.environ.get("LABEL_FONT_CACHE")
+    font_manager._index = index
+    os.environ["LABEL_FONT_CACHE"] = index.cache_path
+    yield index
+    font_manager._index = saved_index
+    if saved_env is None:
+        os.environ.pop("LABEL_FONT_CACHE", None)
+    else:
+        os.environ["LABEL_FONT_CACHE"] = saved_env
+
+
+@pytest.fixture
+def font_file():
+    """Returns the full path of an installed font; skips the test if it is missing."""
+    def find(name):
+        path = _font_path(name)
+        if path is None:
+            pytest.skip(f"font {name} is not installed")
+        return path
+    return find
+
+
+@pytest.fixture
+def font(font_file):
+    """The name of the test font (FONT); skips the test if it is not installed."""
+    font_file(FONT)
+    return FONT
+
+
+@pytest.fixture
+def font_dir(tmp_path, font_file):
+    """Copies installed fonts into a fresh directory (optionally a subdirectory of it)."""
+    def make(*names, subdir=""):
+        fonts = tmp_path / "fonts"
+        target = fonts / subdir
+        target.mkdir(parents=True, exist_ok=True)
+        for name in names:
+            shutil.copy(font_file(name), target / name)
+        return fonts
+    return make
+
+
+@pytest.fixture
+def fallback_fonts(tmp_path, font_dir):
+    """
+    A FontFallback over DejaVu Sans and Serif only. Serif lacks symbols such as the
+    snowman, which then come from Sans. Returns (fallback, serif path, sans path).
+    """
+    fonts = font_dir("DejaVuSans.ttf", "DejaVuSerif.ttf")
+    index = FontIndex(str(tmp_path / "index.json"), dirs=[str(fonts)])
+    index.scan()
+    return FontFallback(index, preferred=["DejaVuSans.ttf"]), str(fonts / "DejaVuSerif.ttf"), str(fonts / "DejaVuSans.ttf")
+
+
+@pytest.fixture
+def image_file(tmp_path):
+    """Saves a solid-color image and returns its path."""
+    def make(name="image.png", color="black", size=(64, 32), mode="RGBA"):
+        path = tmp_path / name
+        Image.new(mode, size, color).save(path)
+        return str(path)
+    return make
+
+
+@pytest.fixture
+def photo_file(tmp_path):
+    """Path of a 120x80 gray gradient, for dithering tests."""
+    path = tmp_path / "photo.png"
+    Image.linear_gradient("L").resize((120, 80)).convert("RGBA").save(path)
+    return str(path)
+
+
+@pytest.fixture
+def make_project(tmp_path):
+    """Saves a project with one text element per argument; returns (path, designer)."""
+    def make(*texts):
+        designer = LabelDesigner()
+        for text in texts:
+            designer.add_text(text, font_name=FONT)
+        path = tmp_path / "job.json"
+        designer.save_project(str(path))
+        return str(path), designer
+    return make
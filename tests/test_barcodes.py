@@ -0,0 +1,137 @@
+import pytest
+
+from app import barcodes
+from app.elements import element_from_dict
+from app.label_designer import LabelDesigner
+from app.zpl_export import ZplExporter
+
+
+def test_code128_patterns_are_eleven_modules():
+    patterns = barcodes._CODE128_PATTERNS
+    assert len(set(patterns)) == 107
+    assert all(sum(map(int, p)) == 11 for p in patterns[:-1])
+    assert sum(map(int, patterns[-1])) == 13
+
+
+def test_code128_values_switch_to_code_c_for_digits():
+    # START B, A B C -, CODE C, 12 34 56, CODE B, 7, check, STOP
+    assert barcodes.code128_values("ABC-1234567") == [104, 33, 34, 35, 13, 99, 12, 34, 56, 100, 23, 67, 106]
+    assert barcodes.code128_values("1234") == [105, 12, 34, 82, 106]
+    modules = barcodes.code128_modules("1234")
+    # START C + 2 symbols + check + STOP, ending in the two-module termination bar
+    assert len(modules) == 4 * 11 + 13
+    assert modules[:2] == b"\x01\x01" and modules[-2:] == b"\x01\x01"
+
+
+def test_code128_rejects_unencodable_values():
+    with pytest.raises(ValueError):
+        barcodes.code128_values("")
+    with pytest.raises(ValueError):
+        barcodes.code128_values("café")
+
+
+def test_reed_solomon_matches_reference():
+    # "HELLO WORLD" at 1-M, from the QR specification examples
+    data = [32, 91, 11, 120, 209, 114, 220, 77, 67, 64, 236, 17, 236, 17, 236, 17]
+    assert barcodes.rs_remainder(data, 10) == [196, 35, 39, 119, 235, 215, 231, 226, 93, 23]
+    assert barcodes.format_bits("M", 0) == 0b101010000010010
+
+
+# "hello label" at level Q (byte mode, mask 7), as produced by independent encoders
+HELLO_LABEL_Q = [
+    "#######.##.#..#######",
+    "#.....#..#..#.#.....#",
+    "#.###.#.##..#.#.###.#",
+    "#.###.#.#..#..#.###.#",
+    "#.###.#...###.#.###.#",
+    "#.....#.#.#.#.#.....#",
+    "#######.#.#.#.#######",
+    "........###..........",
+    ".#.#.####.#.####.##.#",
+    ".#..#.....#.##.##..##",
+    "...####....#..##.##.#",
+    ".#####.#..###.##.#.##",
+    "##.##.#.#..##..#.....",
+    "........#.##...#..#.#",
+    "#######.##.##.######.",
+    "#.....#.###....#....#",
+    "#.###.#..#.#.#.....#.",
+    "#.###.#.###...#######",
+    "#.###.#..##.###.#.#.#",
+    "#.....#.#..#.#.......",
+    "#######...#...##.#.#.",
+]
+
+
+def test_qr_matches_reference_symbol():
+    grid = barcodes.qr_modules("hello label", "Q")
+    assert ["".join("#" if m else "." for m in row) for row in grid] == HELLO_LABEL_Q
+
+
+def test_qr_version_grows_with_data():
+    assert len(barcodes.qr_modules("x" * 100, "M")) == 4 * barcodes.qr_version(100, "M") + 17
+    with pytest.raises(ValueError):
+        barcodes.qr_version(3000, "H")
+
+
+def test_modules_snap_to_whole_dots():
+    designer = LabelDesigner(dpi=300)
+    qr = designer.add_qr("https://example.com", module_mm=0.3)
+    # 0.3 mm at 300 dpi is 3.54 dots: every module prints as 4
+    assert designer.module_dots(qr) == 4
+    modules = barcodes.module_image(barcodes.QR, "https://example.com").width
+    assert designer.get_raster(qr).size == (modules * 4, modules * 4)
+
+    bar = designer.add_barcode("A1", module_mm=0.25, height_mm=5, show_text=False)
+    raster = designer.get_raster(bar)
+    assert raster.size == (barcodes.module_image(barcodes.CODE128, "A1").width * 3, 59)
+    assert {value for _, value in raster.convert("L").getcolors()} == {0, 255}
+
+
+def test_batch_reuses_encoded_values():
+    barcodes.clear_cache()
+    designer = LabelDesigner()
+    bar = designer.add_barcode("LOT {{lot}}")
+    qr = designer.add_qr("{{lot}}")
+    records = [{'lot': str(n % 4)} for n in range(20)]
+    images = [image.copy() for _, image in designer.render_batch(records)]
+
+    info = designer.barcode_cache_info()
+    # Two templates plus four distinct values per symbol
+    assert info['misses'] == 2 + 8
+    assert images[0].tobytes() == images[4].tobytes()
+    assert images[0].tobytes() != images[1].tobytes()
+    assert (bar.value, qr.value) == ("LOT {{lot}}", "{{lot}}")
+
+
+def test_batch_raises_on_unencodable_values():
+    designer = LabelDesigner()
+    bar = designer.add_barcode("{{lot}}")
+    labels = designer.render_batch([{'lot': "A1"}, {'lot': "café"}])
+    assert next(labels)[0] == {'lot': "A1"}
+    with pytest.raises(ValueError, match="café"):
+        next(labels)
+    # An empty field is not a valid Code 128 value either
+    with pytest.raises(ValueError):
+        list(designer.render_batch([{'lot': ""}]))
+    assert bar.value == "{{lot}}"
+
+
+def test_barcode_elements_round_trip():
+    designer = LabelDesigner()
+    bar = designer.add_barcode("12345678", height_mm=8)
+    restored = element_from_dict(bar.to_dict())
+    assert restored.type == 'barcode' and restored.value == "12345678" and restored.height_mm == 8
+    with pytest.raises(ValueError):
+        designer.update_element_content(bar.id, "éé")
+    assert bar.value == "12345678"
+
+
+def test_zpl_export_rasterizes_variable_barcodes():
+    designer = LabelDesigner()
+    designer.add_barcode("STATIC")
+    designer.add_qr("{{url}}")
+    exporter = ZplExporter(designer)
+    assert exporter.header().decode("ascii").count("~DG") == 1
+    label = exporter.label({'url': "https://example.com/1"}).decode("utf-8")
+    assert "^XG" in label and "^GFA," in label
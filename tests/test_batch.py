@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from app.batch import BatchStats, fill_placeholders, output_filename, read_records
+from app.label_designer import LabelDesigner
+
+
+def test_fill_placeholders():
+    assert fill_placeholders("SKU {{ sku }} / {{lot}}", {'sku': 'A1', 'lot': 7}) == "SKU A1 / 7"
+    with pytest.raises(KeyError):
+        fill_placeholders("{{missing}}", {})
+
+
+def test_output_filename_index_wins_over_record_field():
+    assert output_filename("{index:03d}_{sku}.png", 7, {'sku': 'A1', 'index': 'x'}) == "007_A1.png"
+    with pytest.raises(KeyError, match="lot"):
+        output_filename("{lot}.png", 0, {})
+
+
+def test_read_csv_and_jsonl(tmp_path):
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_text("sku,lot\nA1,1\nB2,2\n")
+    jsonl_path = tmp_path / "rows.jsonl"
+    jsonl_path.write_text('{"sku": "A1", "lot": 1}\n\n{"sku": "B2", "lot": 2}\n')
+
+    assert [r['sku'] for r in read_records(str(csv_path))] == ["A1", "B2"]
+    assert [r['lot'] for r in read_records(str(jsonl_path))] == [1, 2]
+
+
+def test_render_batch_matches_single_renders(font):
+    designer = LabelDesigner()
+    template = designer.add_text("LOT {{lot}}", font_name=font)
+    records = [{'lot': 'A'}, {'lot': 'B'}]
+    stats = BatchStats()
+    for record, image in designer.render_batch(records, stats=stats):
+        reference = LabelDesigner()
+        ref = reference.add_text(f"LOT {record['lot']}", font_name=font)
+        reference.update_element_position(ref.id, template.x, template.y)
+        assert image.tobytes() == reference.image.tobytes()
+
+    assert stats.count == 2
+    assert stats.labels_per_second > 0
+    assert template.content == "LOT {{lot}}"
+
+
+def test_render_batch_from_saved_project(tmp_path, font):
+    designer = LabelDesigner()
+    designer.add_text("SKU {{sku}}", font_name=font)
+    project = tmp_path / "job.json"
+    designer.save_project(str(project))
+    data = tmp_path / "rows.jsonl"
+    data.write_text("\n".join(json.dumps({'sku': n}) for n in range(5)))
+
+    loaded = LabelDesigner()
+    loaded.load_project(str(project))
+    assert sum(1 for _ in loaded.render_batch(str(data))) == 5
+
+
+def test_static_layer_render_matches_full_render(tmp_path, font):
+    from PIL import Image
+    logo = tmp_path / "logo.png"
+    Image.new("RGBA", (40, 40), (0, 128, 0, 200)).save(logo)
+
+    designer = LabelDesigner()
+    designer.add_image(str(logo))
+    designer.add_text("STATIC CAPTION", font_name=font)
+    variable = designer.add_text("SERIAL 0001", font_name=font)
+    designer.add_text("ON TOP", font_name=font)
+
+    layer = designer.prepare_static_layer([variable.id])
+    assert layer.count == 2
+
+    designer.render()
+    full = designer.image.tobytes()
+    designer.render(layer)
+    assert designer.image.tobytes() == full
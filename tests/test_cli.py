@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.cli import main
+from app.label_designer import LabelDesigner
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_render_and_batch(tmp_path, capsys, make_project):
+    project, _ = make_project("SKU {{sku}}")
+    out = tmp_path / "label.png"
+    assert main(["render", project, "-o", str(out)]) == 0
+    assert out.exists()
+
+    data = tmp_path / "rows.csv"
+    data.write_text("sku\nA\nB\nC\n")
+    assert main(["batch", project, str(data), "-o", str(tmp_path / "out"), "--pattern", "{sku}.png"]) == 0
+    assert sorted(os.listdir(tmp_path / "out")) == ["A.png", "B.png", "C.png"]
+    assert "3 labels" in capsys.readouterr().out
+
+
+def test_batch_fails_on_unencodable_record(tmp_path):
+    designer = LabelDesigner()
+    designer.add_barcode("{{sku}}")
+    project = tmp_path / "job.json"
+    designer.save_project(str(project))
+    data = tmp_path / "rows.csv"
+    data.write_text("sku\nA\ncafé\nC\n", encoding="utf-8")
+    with pytest.raises(SystemExit) as exc:
+        main(["batch", str(project), str(data), "-o", str(tmp_path / "out")])
+    assert "after 1 labels" in str(exc.value.code) and "café" in str(exc.value.code)
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_batch_reports_missing_fields(tmp_path, make_project, workers):
+    project, _ = make_project("SKU {{sku}}")
+    data = tmp_path / "rows.jsonl"
+    data.write_text('{"sku": "A"}\n{"sku": "B"}\n{"lot": "C"}\n')
+    with pytest.raises(SystemExit) as exc:
+        main(["batch", project, str(data), "-o", str(tmp_path / "out"), "-j", workers, "--chunk-size", "1"])
+    assert "record 3: no field 'sku'" in str(exc.value.code)
+
+
+def test_cli_does_not_import_gui_or_pywin32(tmp_path, make_project):
+    project, _ = make_project("SKU {{sku}}")
+    code = (
+        "import sys\n"
+        "from app.cli import main\n"
+        f"main(['render', {project!r}, '-o', {str(tmp_path / 'x.png')!r}])\n"
+        "loaded = [m for m in ('tkinter', 'customtkinter', 'win32print', 'win32ui') if m in sys.modules]\n"
+        "assert not loaded, loaded\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=REPO_ROOT)
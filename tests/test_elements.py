@@ -0,0 +1,70 @@
+import json
+
+import pytest
+from PIL import Image
+
+from app.elements import TextElement, ImageElement, element_from_dict
+from app.label_designer import LabelDesigner
+
+
+def test_elements_use_slots():
+    el = TextElement(id=1, content="A")
+    assert not hasattr(el, '__dict__')
+    with pytest.raises(AttributeError):
+        el.unknown_attribute = 1
+
+
+def test_dict_style_access():
+    el = ImageElement(id=3, path="logo.png", x=4, y=5)
+    assert el['type'] == 'image'
+    assert el['x'] == 4
+    assert el.get('scale', 2.0) == 1.0
+    assert 'img_object' not in el
+    assert 'base_width' not in el
+    el['base_width'] = 10
+    assert el.base_width == 10
+
+
+def test_round_trip_preserves_unknown_keys(font):
+    data = {'id': 7, 'type': 'text', 'content': 'Hi', 'x': 1, 'y': 2,
+            'font_size': 12, 'font': font, 'rotation': 90, 'name': 'Text 7', 'color': 'red'}
+    assert element_from_dict(data).to_dict() == data
+
+
+def test_unknown_type_is_rejected():
+    with pytest.raises(ValueError):
+        element_from_dict({'id': 1, 'type': 'hologram'})
+
+
+def test_index_and_z_order(font):
+    designer = LabelDesigner()
+    a = designer.add_text("A", font_name=font)
+    b = designer.add_text("B", font_name=font)
+    c = designer.add_text("C", font_name=font)
+    assert designer.get_element(b.id) is b
+
+    designer.move_element(c.id, 0)
+    assert [el.id for el in designer.elements] == [c.id, a.id, b.id]
+    assert designer.z_index(b.id) == 2
+
+    designer.remove_element(a.id)
+    assert designer.get_element(a.id) is None
+    assert [el.id for el in designer.elements] == [c.id, b.id]
+
+
+def test_save_load_round_trip(tmp_path, font):
+    img_path = tmp_path / "logo.png"
+    Image.new("RGBA", (20, 10), "blue").save(img_path)
+    designer = LabelDesigner()
+    designer.add_text("SAVE ME", font_name=font)
+    designer.add_image(str(img_path))
+    project = tmp_path / "project.json"
+    assert designer.save_project(str(project))
+    saved = json.loads(project.read_text())
+    assert all('img_object' not in el for el in saved['elements'])
+
+    loaded = LabelDesigner()
+    assert loaded.load_project(str(project))
+    assert [el.to_dict() for el in loaded.elements] == saved['elements']
+    assert loaded.get_element(2).img_object is not None
+    assert loaded.image.tobytes() == designer.image.tobytes()
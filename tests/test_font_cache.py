@@ -0,0 +1,40 @@
+from app.font_cache import FontCache
+from app.label_designer import LabelDesigner
+from app import font_cache
+
+
+def test_cache_hits_after_first_load(font):
+    cache = FontCache(maxsize=4)
+    a = cache.get(font, 20)
+    b = cache.get(font, 20)
+    assert a is b
+    info = cache.info()
+    assert info['hits'] == 1
+    assert info['misses'] == 1
+
+
+def test_cache_is_bounded_lru(font):
+    cache = FontCache(maxsize=2)
+    cache.get(font, 10)
+    cache.get(font, 11)
+    cache.get(font, 10)  # refresh 10
+    cache.get(font, 12)  # evicts 11
+    assert cache.info()['size'] == 2
+    cache.get(font, 10)
+    assert cache.info()['hits'] == 2
+
+
+def test_missing_font_falls_back_to_default():
+    cache = FontCache()
+    assert cache.get("does-not-exist.ttf", 30) is not None
+
+
+def test_render_reuses_fonts(font):
+    font_cache.clear_cache()
+    designer = LabelDesigner()
+    el = designer.add_text("HELLO", font_name=font)
+    for i in range(5):
+        designer.update_element_content(el['id'], f"HELLO {i}")
+    info = designer.font_cache_info()
+    assert info['misses'] == 1
+    assert info['hits'] >= 5
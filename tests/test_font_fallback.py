@@ -0,0 +1,76 @@
+import threading
+
+from app import font_cache
+from app import font_manager
+from app.label_designer import LabelDesigner
+
+
+def test_text_is_split_into_runs_by_coverage(fallback_fonts):
+    fallback, serif, sans = fallback_fonts
+    # DejaVu Serif has no snowman or emoji; the variation selector stays with its base
+    runs = fallback.split_runs("Ab ☃️\U0001F600c", serif)
+    assert runs == [(serif, "Ab "), (sans, "☃️\U0001F600"), (serif, "c")]
+    assert fallback.split_runs("plain", serif) == [(serif, "plain")]
+
+
+def test_fallback_glyphs_are_measured_and_drawn(fallback_fonts):
+    fallback, serif, _ = fallback_fonts
+    text = "A☃☃☃B"
+
+    plain = LabelDesigner()
+    plain.font_fallback = None
+    without = plain.add_text(text, font_name=serif)
+
+    designer = LabelDesigner()
+    designer.font_fallback = fallback
+    el = designer.add_text(text, font_name=serif)
+    bbox, runs = designer.layout_text(text, serif, 30)
+    assert len(runs) == 3
+    # add_text centers using the fallback-aware measurement
+    assert el['x'] == (designer.width_px - (bbox[2] - bbox[0])) // 2
+
+    raster = designer.get_raster(el)
+    assert raster.size == (bbox[2] - bbox[0], bbox[3] - bbox[1])
+    assert raster.tobytes() != plain.get_raster(without).tobytes()
+    # Ink fills the measured box (textbbox may round out by a pixel)
+    ink = raster.getchannel("A").getbbox()
+    assert ink[:2] == (0, 0)
+    assert raster.width - ink[2] <= 1 and raster.height - ink[3] <= 1
+
+
+def test_fallback_leaves_font_cache_stats_alone(fallback_fonts):
+    fallback, _, sans = fallback_fonts
+    before = font_cache.cache_info()
+    # Resolved by name through the index, not by loading the font
+    assert fallback.split_runs("a☃", "DejaVuSerif.ttf")[1] == (sans, "☃")
+    assert font_cache.cache_info() == before
+
+
+def test_index_is_scanned_when_nothing_is_cached(tmp_path, font_dir, monkeypatch):
+    fonts = font_dir("DejaVuSans.ttf")
+    monkeypatch.setenv("LABEL_FONT_CACHE", str(tmp_path / "missing" / "index.json"))
+    monkeypatch.setattr(font_manager, "font_dirs", lambda: [str(fonts)])
+    monkeypatch.setattr(font_manager, "_index", None)
+    assert font_manager.get_system_fonts() == ["DejaVuSans.ttf"]
+
+    monkeypatch.setattr(font_manager, "_index", None)
+    monkeypatch.setenv("LABEL_FONT_CACHE", str(tmp_path / "other.json"))
+    assert font_manager.get_index(scan=False).records() == []
+
+
+def test_index_change_during_lookup_does_not_deadlock(fallback_fonts):
+    fallback, serif, sans = fallback_fonts
+    index = fallback.index
+    records = index.records
+
+    def changing_records():
+        # A background refresh landing between the sync and the fallback search
+        index.generation += 1
+        return records()
+    index.records = changing_records
+
+    result = []
+    thread = threading.Thread(target=lambda: result.append(fallback.font_for(serif, ord("☃"))), daemon=True)
+    thread.start()
+    thread.join(5)
+    assert result == [sans]
@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+import threading
+
+from app import font_manager
+from app.font_cache import FontCache
+from app.font_manager import FontIndex
+
+
+def test_scan_records_names_and_coverage(tmp_path, font_dir):
+    index = FontIndex(str(tmp_path / "index.json"), dirs=[str(font_dir("DejaVuSans.ttf", subdir="sub"))])
+    assert index.scan()
+    record = index.find("DejaVuSans.ttf")
+    assert (record.family, record.style) == ("DejaVu Sans", "Book")
+    assert record.covers(ord("A")) and record.covers(0x416)
+    assert not record.covers(0x4E00)
+    assert index.names() == ["DejaVuSans.ttf"]
+
+
+def test_index_is_cached_and_refreshed_incrementally(tmp_path, monkeypatch, font_dir, font_file):
+    fonts = font_dir("DejaVuSans.ttf", subdir="sub")
+    cache = str(tmp_path / "index.json")
+    FontIndex(cache, dirs=[str(fonts)]).scan()
+
+    parsed = []
+    real_scan_file = font_manager.scan_file
+    monkeypatch.setattr(font_manager, "scan_file", lambda path: parsed.append(path) or real_scan_file(path))
+
+    index = FontIndex(cache, dirs=[str(fonts)])
+    assert index.load() == 1
+    assert index.find("DejaVuSans.ttf").covers(ord("A"))
+    # Nothing changed on disk: nothing is re-parsed
+    assert index.refresh().result(timeout=10) is False
+    assert parsed == []
+
+    added = fonts / "Copy.ttf"
+    shutil.copy(font_file("DejaVuSans.ttf"), added)
+    assert index.scan()
+    assert parsed == [str(added)]
+
+    os.remove(added)
+    assert index.scan()
+    assert FontIndex(cache).load() == 1
+
+
+def test_same_file_name_in_two_directories_is_listed_by_path(tmp_path, font_dir, font_file):
+    fonts = font_dir("DejaVuSans.ttf", subdir="a")
+    (fonts / "b").mkdir()
+    shutil.copy(font_file("DejaVuSans.ttf"), fonts / "b" / "DejaVuSans.ttf")
+    index = FontIndex(str(tmp_path / "index.json"), dirs=[str(fonts)])
+    index.scan()
+    assert sorted(index.names()) == [str(fonts / "a" / "DejaVuSans.ttf"), str(fonts / "b" / "DejaVuSans.ttf")]
+
+
+def test_font_cache_resolves_names_through_the_index(tmp_path, monkeypatch, font_dir, font_file):
+    # A font only the index knows about, as in a per-user font folder Pillow does not search
+    fonts = font_dir()
+    shutil.copy(font_file("DejaVuSans.ttf"), fonts / "IndexOnly.ttf")
+    index = FontIndex(str(tmp_path / "index.json"), dirs=[str(fonts)])
+    index.scan()
+    monkeypatch.setattr(font_manager, "_index", index)
+
+    font = FontCache().get("IndexOnly.ttf", 20)
+    assert font.path == str(fonts / "IndexOnly.ttf")
+
+
+def test_font_cache_miss_does_not_scan(tmp_path, monkeypatch):
+    monkeypatch.setenv("LABEL_FONT_CACHE", str(tmp_path / "missing.json"))
+    monkeypatch.setattr(font_manager, "_index", None)
+    scans = []
+    monkeypatch.setattr(FontIndex, "scan", lambda self: scans.append(self))
+    assert FontCache().get("NotInstalled.ttf", 20) is not None
+    # The miss falls back to the default font; the background refresh builds the index
+    assert scans == []
+
+
+def test_concurrent_saves_leave_a_complete_index(tmp_path, font_dir):
+    fonts = font_dir("DejaVuSans.ttf", "DejaVuSerif.ttf")
+    path = str(tmp_path / "index.json")
+    index = FontIndex(path, dirs=[str(fonts)])
+    index.scan()
+    threads = [threading.Thread(target=index.save) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with open(path, encoding="utf-8") as f:
+        assert len(json.load(f)['fonts']) == 2
+    # No temporary files left behind
+    assert sorted(os.listdir(tmp_path)) == ["fonts", "index.json"]
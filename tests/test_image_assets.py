@@ -0,0 +1,110 @@
+import json
+import threading
+
+from PIL import Image
+
+from app import image_assets
+from app.image_assets import AssetStore
+from app.label_designer import LabelDesigner
+
+
+def test_identical_content_is_decoded_once(image_file):
+    store = AssetStore()
+    a = store.load(image_file("a.png", "red"))
+    # Same bytes under another name share the decoded image
+    b = store.load(image_file("b.png", "red"))
+    c = store.load(image_file("c.png", "blue"))
+    assert a is b
+    assert a is not c
+    info = store.info()
+    assert (info['hits'], info['misses'], info['size']) == (1, 2, 2)
+
+
+def test_store_evicts_to_memory_budget(image_file):
+    store = AssetStore(max_bytes=64 * 32 * 4 * 2)
+    for i, color in enumerate(["red", "green", "blue"]):
+        store.load(image_file(f"{i}.png", color))
+    info = store.info()
+    assert info['size'] == 2
+    assert info['evictions'] == 1
+    assert info['bytes'] <= info['max_bytes']
+
+
+def test_duplicate_and_project_load_share_pixels(tmp_path, image_file):
+    image_assets.clear_store()
+    path = image_file("logo.png", "red")
+    designer = LabelDesigner()
+    el = designer.add_image(path)
+    dup = designer.duplicate_element(el['id'])
+    assert dup['img_object'] is el['img_object']
+
+    project = tmp_path / "project.json"
+    designer.save_project(str(project))
+    assert len(json.loads(project.read_text())['elements']) == 2
+
+    loaded = LabelDesigner()
+    loaded.load_project(str(project))
+    first, second = loaded.elements
+    assert first['img_object'] is second['img_object'] is el['img_object']
+    assert image_assets.store_info()['misses'] == 1
+
+
+def test_large_jpeg_is_decoded_at_label_resolution(tmp_path):
+    path = tmp_path / "photo.jpg"
+    Image.linear_gradient("L").resize((4000, 3000)).convert("RGB").save(path, quality=90)
+    store = AssetStore()
+    image = store.load(str(path), max_size=(1218, 744))
+    assert image.width <= 1218 and image.height <= 744
+    assert image.height == 744 or image.width == 1218
+    # A different bound is a different decoded asset
+    assert store.load(str(path)).size == (4000, 3000)
+
+    designer = LabelDesigner()
+    el = designer.add_image(str(path))
+    assert el['img_object'].width <= designer.width_px * 3
+    assert el['img_object'].height <= designer.height_px * 3
+
+
+def test_resize_uses_nearest_pyramid_level():
+    source = Image.linear_gradient("L").resize((1024, 1024)).convert("RGBA")
+    small = image_assets.resize(source, (100, 100))
+    levels = image_assets.pyramid(source).levels
+    assert [level.size for level in levels] == [(512, 512), (256, 256), (128, 128)]
+
+    direct = source.resize((100, 100), Image.Resampling.LANCZOS)
+    diff = max(abs(a - b) for a, b in zip(small.tobytes(), direct.tobytes()))
+    assert diff <= 2
+
+    # Scaling back up reuses the existing levels
+    image_assets.resize(source, (300, 300))
+    assert len(image_assets.pyramid(source).levels) == 3
+
+
+def test_path_stats_are_bounded(image_file):
+    store = AssetStore(max_paths=2)
+    paths = [image_file(f"{i}.png", "red") for i in range(4)]
+    for path in paths:
+        store.load(path)
+    assert list(store._paths) == paths[2:]
+    # Identical content: still one decoded image
+    assert store.info()['size'] == 1
+
+
+def test_collected_image_is_forgotten_without_the_lock():
+    source = Image.new("RGBA", (64, 64))
+    other = Image.new("RGBA", (8, 8))
+    image_assets.resize(source, (16, 16))
+    key = id(source)
+    dropped = threading.Event()
+
+    def drop():
+        nonlocal source
+        # GC can run the weakref callback on a thread that holds the lock
+        with image_assets._pyramids_lock:
+            source = None
+        dropped.set()
+    threading.Thread(target=drop, daemon=True).start()
+    assert dropped.wait(5)
+
+    image_assets.pyramid(other)
+    assert key not in image_assets._pyramids
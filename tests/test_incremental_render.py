@@ -0,0 +1,48 @@
+import random
+
+from PIL import Image
+
+from app.label_designer import LabelDesigner
+
+
+def _full_render(designer):
+    designer.render()
+    return designer.image.tobytes()
+
+
+def test_incremental_matches_full_render(tmp_path, font):
+    path = tmp_path / "logo.png"
+    gradient = Image.linear_gradient("L").resize((60, 40)).convert("RGBA")
+    gradient.putalpha(180)
+    gradient.save(path)
+
+    designer = LabelDesigner()
+    ids = [designer.add_text(f"Layer {i}", font_name=font)['id'] for i in range(4)]
+    ids.append(designer.add_image(str(path))['id'])
+    designer.update_element_scale(ids[-1], 0.4)
+
+    rng = random.Random(7)
+    for _ in range(30):
+        element_id = rng.choice(ids)
+        action = rng.randrange(3)
+        if action == 0:
+            designer.update_element_position(element_id, rng.randint(-40, 420), rng.randint(-40, 260))
+        elif action == 1:
+            designer.update_element_rotation(element_id, rng.choice([0, 90, 180, 270]))
+        elif designer.get_element(element_id)['type'] == 'text':
+            designer.update_element_font_size(element_id, rng.randint(10, 60))
+
+        incremental = designer.image.tobytes()
+        assert incremental == _full_render(designer)
+
+
+def test_remove_and_duplicate_repaint_damaged_area(font):
+    designer = LabelDesigner()
+    el = designer.add_text("REMOVE ME", font_name=font)
+    dup = designer.duplicate_element(el['id'])
+    designer.remove_element(el['id'])
+    incremental = designer.image.tobytes()
+    assert incremental == _full_render(designer)
+
+    designer.remove_element(dup['id'])
+    assert designer.image.tobytes() == Image.new("RGB", designer.image.size, "white").tobytes()
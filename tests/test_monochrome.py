@@ -0,0 +1,72 @@
+from PIL import Image
+
+from app.label_designer import LabelDesigner, dither
+
+
+def test_monochrome_canvas_is_grayscale_and_bitmap_is_binary(photo_file, font):
+    designer = LabelDesigner(color_mode="1")
+    designer.add_image(photo_file)
+    designer.add_text("LOT 42", font_name=font)
+
+    assert designer.image.mode == "L"
+    bitmap = designer.get_image()
+    assert bitmap.mode == "1"
+    assert {v for _, v in bitmap.convert("L").getcolors()} <= {0, 255}
+    assert len(bitmap.tobytes()) * 8 < designer.image.width * designer.image.height * 3 // 2
+
+
+def test_batch_yields_the_same_bitmap_as_the_preview(photo_file, font):
+    designer = LabelDesigner(color_mode="1")
+    designer.add_image(photo_file)
+    designer.add_text("LOT {{lot}}", font_name=font)
+    (record, bitmap), = list(designer.render_batch([{'lot': 42}]))
+
+    designer.elements[-1].content = "LOT 42"
+    designer.render()
+    assert bitmap.mode == "1"
+    assert bitmap.tobytes() == designer.get_image().tobytes()
+
+
+def test_dithered_image_raster_is_cached(photo_file, font):
+    designer = LabelDesigner(color_mode="L")
+    img = designer.add_image(photo_file)
+    txt = designer.add_text("MOVE", font_name=font)
+    misses = designer.raster_cache_info()['misses']
+    designer.update_element_position(txt.id, 3, 3)
+    assert designer.raster_cache_info()['misses'] == misses
+
+    designer.update_element_dither(img.id, "ordered")
+    assert designer.raster_cache_info()['misses'] == misses + 1
+    colors = {v for _, v in designer.get_raster(img).getchannel("L").getcolors()}
+    assert colors <= {0, 255}
+
+
+def test_incremental_render_matches_full_render_in_monochrome(photo_file, font):
+    designer = LabelDesigner(color_mode="1")
+    designer.add_image(photo_file)
+    txt = designer.add_text("OVERLAP", font_name=font)
+    for x in (0, 40, 80):
+        designer.update_element_position(txt.id, x, 30)
+    incremental = designer.image.tobytes()
+    designer.render()
+    assert designer.image.tobytes() == incremental
+
+
+def test_dither_methods():
+    gray = Image.new("L", (16, 16), 128)
+    for method in ("threshold", "ordered", "floyd-steinberg"):
+        out = dither(gray, method)
+        assert out.mode == "L"
+        assert {v for _, v in out.getcolors()} <= {0, 255}
+    # A flat mid-gray should come out roughly half black with ordered dithering
+    black = dict((v, c) for c, v in dither(gray, "ordered").getcolors()).get(0, 0)
+    assert 96 <= black <= 160
+
+
+def test_switching_color_mode_rerenders(tmp_path, font):
+    designer = LabelDesigner()
+    designer.add_text("RGB", font_name=font)
+    assert designer.image.mode == "RGB"
+    designer.set_color_mode("1", threshold=100, dither="ordered")
+    assert designer.image.mode == "L"
+    assert designer.get_image().mode == "1"
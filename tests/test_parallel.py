@@ -0,0 +1,28 @@
+from app.parallel import encode_label, render_parallel
+
+
+def test_parallel_output_is_in_input_order(tmp_path, make_project):
+    project, designer = make_project("STATIC", "SN {{sn}}")
+    records = [{'sn': n} for n in range(23)]
+
+    # Workers use the designer's monochrome conversion, threshold included
+    designer.set_color_mode("1", threshold=90)
+    expected = [encode_label(image, "1bit") for _, image in designer.render_batch(records)]
+    results = list(render_parallel(project, records, workers=2, chunk_size=5, output="1bit", threshold=90))
+    assert results == expected
+
+
+def test_parallel_writes_files(tmp_path, make_project):
+    project, _ = make_project("STATIC", "SN {{sn}}")
+    out_dir = tmp_path / "out"
+    paths = list(render_parallel(project, [{'sn': 1}, {'sn': 2}], workers=1,
+                                 out_dir=str(out_dir), filename_pattern="sn_{sn}.png"))
+    assert [p.rsplit("/", 1)[-1] for p in paths] == ["sn_1.png", "sn_2.png"]
+    assert all((out_dir / name).exists() for name in ("sn_1.png", "sn_2.png"))
+
+
+def test_index_column_does_not_clash_with_label_index(tmp_path, make_project):
+    project, _ = make_project("STATIC", "SN {{sn}}")
+    paths = list(render_parallel(project, [{'sn': 1, 'index': 'x'}], workers=1,
+                                 out_dir=str(tmp_path / "out"), filename_pattern="{index}_{sn}.png"))
+    assert paths[0].rsplit("/", 1)[-1] == "0_1.png"
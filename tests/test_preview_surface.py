@@ -0,0 +1,52 @@
+import pytest
+from PIL import Image, ImageDraw
+
+from app.label_designer import LabelDesigner
+from app.preview_surface import PreviewSurface, ppm_bytes
+
+
+def _apply(canvas, change):
+    (x, y), region = change
+    canvas.paste(region, (x, y))
+
+
+@pytest.mark.parametrize("zoom", [1.0, 2.0, 1.5, 3.0])
+def test_partial_updates_match_full_resize(zoom, font):
+    designer = LabelDesigner()
+    txt = designer.add_text("ZOOM", font_name=font)
+    surface = PreviewSurface(zoom)
+
+    first = designer.image.copy()
+    change = surface.update(first)
+    assert change[0] == (0, 0)
+    canvas = change[1]
+    assert canvas.size == surface.display_size(first.size)
+
+    designer.update_element_position(txt['id'], 40, 30)
+    second = designer.image.copy()
+    change = surface.update(second)
+    # Only the area around the moved text is repainted
+    assert change[1].width * change[1].height < canvas.width * canvas.height
+    _apply(canvas, change)
+
+    resample = Image.Resampling.NEAREST if zoom.is_integer() else Image.Resampling.BILINEAR
+    expected = second.resize(canvas.size, resample)
+    assert canvas.tobytes() == expected.tobytes()
+
+
+def test_unchanged_frame_is_skipped_and_zoom_repaints():
+    frame = Image.new("RGB", (100, 50), "white")
+    ImageDraw.Draw(frame).rectangle((10, 10, 20, 20), fill="black")
+    surface = PreviewSurface(2)
+    surface.update(frame)
+    assert surface.update(frame.copy()) is None
+
+    surface.set_zoom(3)
+    (x, y), image = surface.update(frame)
+    assert (x, y) == (0, 0) and image.size == (300, 150)
+
+
+def test_ppm_bytes():
+    data = ppm_bytes(Image.new("L", (3, 2), 0))
+    assert data.startswith(b"P6 3 2 255\n")
+    assert len(data) == len(b"P6 3 2 255\n") + 3 * 2 * 3
@@ -0,0 +1,176 @@
+import threading
+
+from PIL import Image
+
+from app import printer_backends
+from app.print_queue import CANCELLED, DONE, FAILED, LEAST_LOADED, RETRYING, PrintQueue
+from app.printer_backends import PrinterBackend
+
+
+class FakePrinter:
+    """Records jobs per printer; optionally fails or blocks."""
+
+    def __init__(self, fail_on=(), fail_times=0):
+        self.jobs = []
+        self.fail_on = set(fail_on)
+        self.fail_times = fail_times
+        self.gate = threading.Event()
+        self.gate.set()
+        self.lock = threading.Lock()
+
+    def __call__(self, images, printer, copies=1, progress=None):
+        self.gate.wait(5)
+        with self.lock:
+            if printer in self.fail_on or self.fail_times > 0:
+                self.fail_times -= 1
+                return False
+            self.jobs.append((printer, len(images), copies))
+        if progress:
+            progress(len(images) * copies, len(images) * copies)
+        return True
+
+
+def _label():
+    return Image.new("RGB", (10, 10), "white")
+
+
+def test_round_robin_across_group():
+    fake = FakePrinter()
+    pq = PrintQueue(print_func=fake)
+    pq.add_group("line", ["p1", "p2", "p3"])
+    for _ in range(6):
+        pq.submit(_label(), "line")
+    assert pq.wait(5)
+    pq.shutdown()
+    assert sorted(p for p, _, _ in fake.jobs) == ["p1", "p1", "p2", "p2", "p3", "p3"]
+
+
+def test_least_loaded_avoids_busy_printer():
+    fake = FakePrinter()
+    fake.gate.clear()
+    pq = PrintQueue(print_func=fake)
+    pq.add_group("line", ["p1", "p2"], strategy=LEAST_LOADED)
+    first = pq.submit(_label(), "line")
+    second = pq.submit(_label(), "line")
+    assert {first.printer, second.printer} == {"p1", "p2"}
+    fake.gate.set()
+    assert pq.wait(5)
+    pq.shutdown()
+
+
+def test_retry_moves_to_another_group_member():
+    fake = FakePrinter(fail_on={"p1"})
+    pq = PrintQueue(print_func=fake, retry_delay=0)
+    pq.add_group("line", ["p1", "p2"])
+    job = pq.submit(_label(), "line")
+    assert pq.wait(5)
+    pq.shutdown()
+    assert job.status == DONE
+    assert job.attempts == 2
+    assert fake.jobs == [("p2", 1, 1)]
+
+
+def test_job_fails_after_retries():
+    fake = FakePrinter(fail_times=10)
+    pq = PrintQueue(print_func=fake, max_retries=1, retry_delay=0)
+    job = pq.submit(_label(), "p1")
+    assert pq.wait(5)
+    pq.shutdown()
+    assert job.status == FAILED
+    assert job.attempts == 2
+
+
+def test_cancel_queued_job_and_poll_events():
+    fake = FakePrinter()
+    fake.gate.clear()
+    pq = PrintQueue(print_func=fake)
+    running = pq.submit(_label(), "p1")
+    queued = pq.submit(_label(), "p1", copies=5)
+    assert pq.cancel(queued.id)
+    fake.gate.set()
+    assert pq.wait(5)
+    pq.shutdown()
+
+    assert running.status == DONE
+    assert queued.status == CANCELLED
+    assert fake.jobs == [("p1", 1, 1)]
+    events = pq.drain_events()
+    assert (queued.id, CANCELLED) in events
+    assert (running.id, DONE) in events
+    assert pq.drain_events() == []
+
+
+def test_queue_with_fake_backend(monkeypatch):
+    class FakeBackend(PrinterBackend):
+        name = "fakeq"
+
+        def __init__(self):
+            self.pages = 0
+
+        def print_image(self, image, printer, copies=1):
+            self.pages += copies
+
+    backend = FakeBackend()
+    monkeypatch.setattr(printer_backends, "_backends", dict(printer_backends._backends))
+    printer_backends.register_backend(backend)
+
+    pq = PrintQueue()
+    job = pq.submit([_label(), _label()], "fakeq://a", copies=3)
+    assert pq.wait(5)
+    pq.shutdown()
+    assert job.status == DONE
+    assert job.pages_done == 6
+    assert backend.pages == 6
+
+
+def test_finished_jobs_release_images_and_are_pruned():
+    fake = FakePrinter()
+    pq = PrintQueue(print_func=fake, keep_finished=3)
+    jobs = [pq.submit(_label(), "p1") for _ in range(5)]
+    assert pq.wait(5)
+    pq.shutdown()
+    assert all(job.status == DONE and job.images == [] for job in jobs)
+    assert [job.id for job in pq.jobs()] == [job.id for job in jobs[2:]]
+    assert pq.get_job(jobs[0].id) is None
+
+
+def test_wait_times_out_while_a_job_is_printing():
+    fake = FakePrinter()
+    fake.gate.clear()
+    pq = PrintQueue(print_func=fake)
+    pq.submit(_label(), "p1")
+    assert not pq.wait(0.05)
+    fake.gate.set()
+    assert pq.wait(5)
+    pq.shutdown()
+
+
+def test_retry_delay_does_not_hold_up_the_printer():
+    fake = FakePrinter(fail_times=1)
+    pq = PrintQueue(print_func=fake, retry_delay=1.0)
+    second_done = threading.Event()
+    # Only the second job prints at the first attempt
+    pq.add_listener(lambda job: job.status == DONE and job.attempts == 1 and second_done.set())
+    first = pq.submit(_label(), "p1")
+    second = pq.submit(_label(), "p1")
+    # The second job prints while the first one waits out its retry delay
+    assert second_done.wait(0.5)
+    assert first.status == RETRYING
+    assert pq.wait(5)
+    pq.shutdown()
+    assert first.status == DONE and first.attempts == 2
+
+
+def test_pending_skips_cancelled_jobs():
+    fake = FakePrinter()
+    fake.gate.clear()
+    pq = PrintQueue(print_func=fake)
+    pq.submit(_label(), "p1")
+    queued = pq.submit(_label(), "p1")
+    assert pq.pending("p1") == 2
+    assert pq.cancel(queued.id)
+    assert pq.pending("p1") == 1 and pq.pending() == 1
+    fake.gate.set()
+    assert pq.wait(5)
+    pq.shutdown()
+    assert pq.pending() == 0
@@ -0,0 +1,253 @@
+import json
+import socket
+import threading
+
+from PIL import Image
+
+from app import printer_backends, printer_utils
+from app.printer_backends import Bitmap, PrinterBackend, RawSocketBackend, SpoolDirectoryBackend
+
+
+def test_spool_backend_writes_job_and_ticket(tmp_path, monkeypatch, image_file):
+    monkeypatch.setitem(printer_backends._backends, "spool", SpoolDirectoryBackend(str(tmp_path / "spool")))
+
+    label = image_file("label.png", "white", (40, 20), mode="RGB")
+    assert printer_utils.print_image(label, "spool://line1", copies=3)
+
+    job_dir = tmp_path / "spool" / "line1"
+    tickets = [json.loads(p.read_text()) for p in job_dir.glob("*.json")]
+    assert len(tickets) == 1
+    assert tickets[0]['copies'] == 3
+    assert (job_dir / tickets[0]['image']).exists()
+    assert "spool://line1" in printer_utils.list_printers()
+
+
+def test_raw_socket_backend_sends_bytes(tmp_path):
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    received = []
+
+    def accept():
+        conn, _ = server.accept()
+        with conn:
+            chunks = []
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                chunks.append(data)
+            received.append(b"".join(chunks))
+
+    thread = threading.Thread(target=accept)
+    thread.start()
+    backend = RawSocketBackend()
+    backend.print_image(Image.new("RGB", (8, 8)), f"127.0.0.1:{server.getsockname()[1]}", copies=2)
+    thread.join(timeout=5)
+    server.close()
+    assert len(received) == 1
+    assert received[0].startswith(b"^XA")
+    assert b"^PQ2^XZ" in received[0]
+
+
+def test_per_printer_assignment_routes_to_backend(image_file, monkeypatch):
+    class FakeBackend(PrinterBackend):
+        name = "fake"
+
+        def __init__(self):
+            self.jobs = []
+
+        def print_image(self, image, printer, copies=1):
+            self.jobs.append((printer, image.size, copies))
+
+    fake = FakeBackend()
+    monkeypatch.setattr(printer_backends, "_backends", dict(printer_backends._backends))
+    monkeypatch.setattr(printer_backends, "_assignments", {})
+    printer_backends.register_backend(fake)
+    printer_backends.assign_printer("Packing Line 2", "fake", target="zebra-2")
+
+    label = image_file("label.png", "white", (40, 20), mode="RGB")
+    assert printer_utils.print_image(label, "Packing Line 2", copies=4)
+    assert fake.jobs == [("zebra-2", (40, 20), 4)]
+    assert printer_backends.resolve("socket://10.0.0.5:9100")[1] == "10.0.0.5:9100"
+
+
+def test_print_in_memory_image_and_bitmap(tmp_path, monkeypatch):
+    spool = SpoolDirectoryBackend(str(tmp_path / "spool"))
+    monkeypatch.setitem(printer_backends._backends, "spool", spool)
+
+    image = Image.new("RGB", (16, 2), "white")
+    debug = tmp_path / "submitted.png"
+    assert printer_utils.print_image(image, "spool://mem", debug_path=str(debug))
+    assert debug.exists()
+
+    # 16x2 packed 1-bit rows: first row black, second white
+    bitmap = Bitmap(b"\x00\x00\xff\xff", (16, 2))
+    assert printer_utils.print_image(bitmap, "spool://mem")
+    spooled = sorted((tmp_path / "spool" / "mem").glob("*.png"))
+    with Image.open(spooled[-1]) as img:
+        assert img.mode == "1"
+        assert img.getpixel((0, 0)) == 0
+        assert img.getpixel((0, 1)) == 255
+
+
+def test_printer_language_sends_raw_job(tmp_path, monkeypatch):
+    monkeypatch.setitem(printer_backends._backends, "spool", SpoolDirectoryBackend(str(tmp_path / "spool")))
+    monkeypatch.setattr(printer_backends, "_languages", {})
+    printer_backends.set_printer_language("spool://zebra", "zpl", compression="z64")
+
+    assert printer_utils.print_image(Image.new("RGB", (16, 4), "white"), "spool://zebra", copies=5)
+    jobs = list((tmp_path / "spool" / "zebra").glob("*.prn"))
+    assert len(jobs) == 1
+    data = jobs[0].read_bytes()
+    assert b":Z64:" in data and b"^PQ5" in data
+
+
+def test_multi_label_job_is_one_spool_job(tmp_path, monkeypatch):
+    monkeypatch.setitem(printer_backends._backends, "spool", SpoolDirectoryBackend(str(tmp_path / "spool")))
+    labels = (Image.new("RGB", (10, 10), shade) for shade in ("white", "gray", "black"))
+    seen = []
+
+    assert printer_utils.print_images(labels, "spool://batch", copies=2,
+                                      progress=lambda done, total: seen.append(done))
+
+    tickets = list((tmp_path / "spool" / "batch").glob("*.json"))
+    assert len(tickets) == 1
+    ticket = json.loads(tickets[0].read_text())
+    assert ticket['copies'] == 2
+    assert len(ticket['pages']) == 3
+    assert seen == [2, 4, 6]
+
+
+def _fake_win32(monkeypatch, calls, fail_start_doc=None):
+    class FakeDC:
+        def CreatePrinterDC(self, name):
+            calls.append("CreatePrinterDC")
+
+        def GetDeviceCaps(self, index):
+            calls.append("GetDeviceCaps")
+            return 400
+
+        def StartDoc(self, name):
+            calls.append("StartDoc")
+            if fail_start_doc:
+                fail_start_doc.pop()
+                raise OSError("handle is invalid")
+
+        def __getattr__(self, name):
+            return lambda *args: calls.append(name)
+
+    class FakeDib:
+        def __init__(self, image):
+            calls.append("Dib")
+
+        def draw(self, handle, box):
+            calls.append("draw")
+
+    class FakeWin32Print:
+        @staticmethod
+        def OpenPrinter(name):
+            calls.append("OpenPrinter")
+            return name
+
+        @staticmethod
+        def ClosePrinter(handle):
+            calls.append("ClosePrinter")
+
+        @staticmethod
+        def GetPrinter(handle, level):
+            return {"pPortName": "USB001"}
+
+        @staticmethod
+        def DeviceCapabilities(printer, port, index):
+            return ["2.00x1.25in\x00\x00", "4x6"]
+
+    class FakeWin32UI:
+        @staticmethod
+        def CreateDC():
+            return FakeDC()
+
+    class FakeWin32Con:
+        HORZRES, VERTRES, LOGPIXELSX, LOGPIXELSY = 8, 10, 88, 90
+        PHYSICALWIDTH, PHYSICALHEIGHT, PHYSICALOFFSETX, PHYSICALOFFSETY = 110, 111, 112, 113
+        DC_PAPERNAMES = 16
+
+    monkeypatch.setattr(printer_backends, "win32print", FakeWin32Print)
+    monkeypatch.setattr(printer_backends, "win32ui", FakeWin32UI)
+    monkeypatch.setattr(printer_backends, "win32con", FakeWin32Con)
+    monkeypatch.setattr(printer_backends.ImageWin, "Dib", FakeDib)
+
+
+def test_gdi_backend_sends_one_document(monkeypatch):
+    calls = []
+    _fake_win32(monkeypatch, calls)
+
+    labels = [Image.new("RGB", (10, 10)), Image.new("RGB", (10, 10))]
+    backend = printer_backends.GdiBackend()
+    backend.print_images(labels, "Zebra", copies=3)
+
+    assert calls.count("StartDoc") == 1
+    assert calls.count("EndDoc") == 1
+    assert calls.count("StartPage") == 6
+    assert calls.count("Dib") == 2
+
+    caps = backend.capabilities("Zebra")
+    assert caps.dpi == (400, 400)
+    assert caps.media == ("2.00x1.25in", "4x6")
+
+    # The second job reuses the open printer handle, DC and device caps
+    setup = calls.count("OpenPrinter"), calls.count("CreatePrinterDC"), calls.count("GetDeviceCaps")
+    backend.print_image(labels[0], "Zebra")
+    assert (calls.count("OpenPrinter"), calls.count("CreatePrinterDC"), calls.count("GetDeviceCaps")) == setup
+    assert calls.count("StartDoc") == 2
+
+
+def test_gdi_backend_reopens_stale_context(monkeypatch):
+    calls = []
+    fail_start_doc = []
+    _fake_win32(monkeypatch, calls, fail_start_doc)
+    backend = printer_backends.GdiBackend()
+    backend.print_image(Image.new("RGB", (10, 10)), "Zebra")
+
+    # The cached handle goes stale (printer power-cycled): the job reopens and succeeds
+    fail_start_doc.append(True)
+    backend.print_image(Image.new("RGB", (10, 10)), "Zebra")
+    assert calls.count("OpenPrinter") == 2
+    assert calls.count("ClosePrinter") == 1
+    assert calls.count("EndDoc") == 2
+
+    backend.release()
+    assert calls.count("ClosePrinter") == 2
+
+
+def test_registry_caches_printers_and_capabilities(monkeypatch):
+    class FakeBackend(PrinterBackend):
+        name = "fake"
+
+        def __init__(self):
+            self.enumerations = 0
+            self.queries = 0
+
+        def list_printers(self):
+            self.enumerations += 1
+            return ["a", "b"]
+
+        def capabilities(self, printer):
+            self.queries += 1
+            return printer_backends.PrinterCapabilities((203, 203), (406, 248))
+
+    fake = FakeBackend()
+    monkeypatch.setattr(printer_backends, "_backends", {})
+    printer_backends.register_backend(fake)
+    registry = printer_backends.PrinterRegistry()
+
+    assert registry.refresh().result(timeout=5) == ["fake://a", "fake://b"]
+    assert registry.printers() == ["fake://a", "fake://b"]
+    assert fake.enumerations == 1
+
+    assert registry.capabilities("fake://a").printable_size == (406, 248)
+    registry.capabilities("fake://a")
+    assert fake.queries == 1
+    registry.invalidate("fake://a")
+    registry.capabilities("fake://a")
+    assert fake.queries == 2
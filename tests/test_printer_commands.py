@@ -0,0 +1,86 @@
+import base64
+import binascii
+import re
+import zlib
+
+from PIL import Image, ImageDraw
+
+from app.printer_commands import compress_acs, encode, packed_rows
+
+
+def _decode_acs(field, bytes_per_row):
+    """Reference decoder for ZPL compressed hex."""
+    width = bytes_per_row * 2
+    rows = []
+    row = ""
+    count = 0
+    for ch in field:
+        if "G" <= ch <= "Y":
+            count += ord(ch) - ord("G") + 1
+        elif "g" <= ch <= "z":
+            count += (ord(ch) - ord("g") + 1) * 20
+        elif ch == ",":
+            rows.append(row.ljust(width, "0"))
+            row = ""
+        elif ch == "!":
+            rows.append(row.ljust(width, "F"))
+            row = ""
+        elif ch == ":":
+            rows.append(rows[-1])
+        else:
+            row += ch * (count or 1)
+            count = 0
+            if len(row) == width:
+                rows.append(row)
+                row = ""
+    return binascii.unhexlify("".join(rows))
+
+
+def _label():
+    image = Image.new("RGB", (203, 120), "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((10, 10, 60, 40), fill="black")
+    draw.line((0, 119, 202, 119), fill="black")
+    draw.text((70, 50), "LOT 4711", fill="black")
+    return image
+
+
+def test_packed_rows_polarity_and_padding():
+    image = Image.new("L", (10, 1), 255)
+    image.putpixel((0, 0), 0)
+    assert packed_rows(image) == (2, b"\x80\x00")
+    assert packed_rows(image, black_is_one=False) == (2, b"\x7f\xff")
+
+
+def test_acs_round_trip():
+    bytes_per_row, data = packed_rows(_label())
+    assert _decode_acs(compress_acs(data, bytes_per_row), bytes_per_row) == data
+
+
+def test_zpl_z64_round_trip():
+    bytes_per_row, data = packed_rows(_label())
+    job = encode(_label(), "zpl", compression="z64").decode("ascii")
+    match = re.search(r"\^GFA,(\d+),\d+,(\d+),:Z64:([^:]+):([0-9A-F]{4})", job)
+    assert int(match.group(1)) == len(data)
+    assert int(match.group(2)) == bytes_per_row
+    assert zlib.decompress(base64.b64decode(match.group(3))) == data
+    assert int(match.group(4), 16) == binascii.crc_hqx(match.group(3).encode("ascii"), 0)
+
+
+def test_compressed_zpl_is_much_smaller_than_a_dib():
+    image = _label()
+    dib_size = image.width * image.height * 3
+    assert len(encode(image, "zpl")) * 10 < dib_size
+
+
+def test_tspl_and_epl_jobs():
+    image = _label()
+    bytes_per_row, data = packed_rows(image, black_is_one=False)
+    tspl = encode(image, "tspl", copies=3)
+    assert tspl.startswith(b"SIZE 25.4 mm,15.0 mm\r\n")
+    assert f"BITMAP 0,0,{bytes_per_row},{image.height},0,".encode() + data in tspl
+    assert tspl.endswith(b"PRINT 1,3\r\n")
+
+    epl = encode(image, "epl", copies=2)
+    assert f"GW0,0,{bytes_per_row},{image.height},".encode() + data in epl
+    assert epl.endswith(b"\nP2\n")
@@ -0,0 +1,62 @@
+from PIL import Image
+
+from app.label_designer import LabelDesigner
+
+
+def test_position_change_reuses_rasters(image_file, font):
+    designer = LabelDesigner()
+    txt = designer.add_text("CACHED", font_name=font)
+    designer.add_image(image_file(color="red", size=(80, 40)))
+    misses = designer.raster_cache_info()['misses']
+
+    designer.update_element_position(txt['id'], 5, 7)
+    designer.update_element_position(txt['id'], 9, 11)
+
+    assert designer.raster_cache_info()['misses'] == misses
+
+
+def test_visual_change_invalidates_only_that_element(image_file, font):
+    designer = LabelDesigner()
+    txt = designer.add_text("CACHED", font_name=font)
+    img = designer.add_image(image_file(color="red", size=(80, 40)))
+    misses = designer.raster_cache_info()['misses']
+
+    designer.update_element_scale(img['id'], 0.5)
+    assert designer.raster_cache_info()['misses'] == misses + 1
+
+    designer.update_element_content(txt['id'], "CHANGED")
+    assert designer.raster_cache_info()['misses'] == misses + 2
+
+
+def test_cached_render_matches_fresh_render(image_file, font):
+    designer = LabelDesigner()
+    txt = designer.add_text("SAME", font_name=font)
+    designer.add_image(image_file(color="red", size=(80, 40)))
+    designer.update_element_rotation(txt['id'], 90)
+    designer.update_element_position(txt['id'], 30, 20)
+    cached = designer.image.copy()
+
+    designer.invalidate_raster()
+    designer.render()
+    assert cached.tobytes() == designer.image.tobytes()
+
+
+def test_draft_mode_is_replaced_by_final_quality(tmp_path, font):
+    designer = LabelDesigner()
+    designer.add_text("DRAFT", font_name=font)
+    path = tmp_path / "gradient.png"
+    Image.linear_gradient("L").convert("RGBA").save(path)
+    img = designer.add_image(str(path))
+
+    designer.set_draft(True)
+    for scale in (0.5, 0.6, 0.7):
+        designer.update_element_scale(img['id'], scale)
+    misses = designer.raster_cache_info()['misses']
+
+    # Leaving draft mode re-renders only the image, at LANCZOS quality
+    designer.set_draft(False)
+    assert designer.raster_cache_info()['misses'] == misses + 1
+    final = designer.image.copy()
+    designer.invalidate_raster()
+    designer.render()
+    assert final.tobytes() == designer.image.tobytes()
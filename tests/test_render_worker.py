@@ -0,0 +1,78 @@
+import pytest
+from PIL import Image
+
+from app import printer_backends
+from app.label_designer import LabelDesigner
+from app.render_worker import RenderWorker
+
+
+def test_snapshot_is_isolated_from_later_edits(font):
+    designer = LabelDesigner()
+    txt = designer.add_text("BEFORE", font_name=font)
+    snapshot = designer.snapshot()
+    expected = designer.image.copy()
+
+    designer.update_element_content(txt['id'], "AFTER")
+    designer.update_element_position(txt['id'], 0, 0)
+
+    assert snapshot.elements[0]['content'] == "BEFORE"
+    assert snapshot.to_image().tobytes() == expected.tobytes()
+    with pytest.raises(AttributeError):
+        snapshot.dpi = 300
+
+
+def test_worker_renders_latest_snapshot(font):
+    designer = LabelDesigner()
+    designer.live_render = False
+    txt = designer.add_text("0", font_name=font)
+    worker = RenderWorker()
+    try:
+        for i in range(30):
+            designer.update_element_position(txt['id'], i, i)
+            worker.submit(designer.snapshot())
+        assert worker.wait(5)
+        version, frame = worker.take_frame()
+        assert worker.take_frame() is None
+    finally:
+        worker.stop()
+
+    assert version == 30
+    assert worker.rendered + worker.dropped == 30
+    designer.render()
+    assert frame.tobytes() == designer.image.tobytes()
+
+
+def test_snapshot_load_repaints_only_changed_elements(tmp_path, font):
+    designer = LabelDesigner()
+    designer.live_render = False
+    logo = tmp_path / "logo.png"
+    Image.new("RGBA", (40, 40), "black").save(logo)
+    designer.add_image(str(logo))
+    txt = designer.add_text("DRAG", font_name=font)
+    worker_designer = LabelDesigner.from_snapshot(designer.snapshot())
+    first = worker_designer.image
+    first_bytes = first.tobytes()
+
+    renders = []
+    worker_designer.render = lambda *args: renders.append(args)
+    designer.update_element_position(txt['id'], 5, 7)
+    worker_designer.load_snapshot(designer.snapshot())
+
+    assert renders == []
+    assert first.tobytes() == first_bytes
+    designer.render()
+    assert worker_designer.image.tobytes() == designer.image.tobytes()
+
+    # A z-order change falls back to a full render
+    designer.move_element(txt['id'], 0)
+    worker_designer.load_snapshot(designer.snapshot())
+    assert len(renders) == 1
+
+
+def test_snapshot_can_be_printed(font):
+    designer = LabelDesigner()
+    designer.add_text("PRINT", font_name=font)
+
+    image = printer_backends.as_image(designer.snapshot())
+    assert isinstance(image, Image.Image)
+    assert image.tobytes() == designer.image.tobytes()
@@ -0,0 +1,96 @@
+from app import font_cache
+from app.label_designer import LabelDesigner
+from app.text_layout import TextLayout, wrap
+
+
+def test_wrap_keeps_words_and_breaks_long_ones():
+    measure = len
+    assert wrap("aa bb cc", 5, measure) == ["aa bb", "cc"]
+    assert wrap("one\ntwo", 10, measure) == ["one", "two"]
+    assert wrap("abcdefgh", 3, measure) == ["abc", "def", "gh"]
+
+
+def test_fit_finds_largest_size_that_fits(font):
+    layout = TextLayout()
+    block = layout.layout("Variable data label text", font, 100, 200, 60, fit=True)
+    loaded = font_cache.get_font(font, block.size)
+    assert block.height <= 60
+    assert all(loaded.getlength(line) <= 200 for line in block.lines)
+
+    # One size up no longer fits
+    bigger = layout.layout("Variable data label text", font, block.size + 1, 200)
+    assert bigger.height > 60 or any(font_cache.get_font(font, block.size + 1).getlength(line) > 200
+                                     for line in bigger.lines)
+
+    # A short string gets the cap, not more
+    assert layout.layout("Hi", font, 40, 200, 60, fit=True).size == 40
+
+
+def test_fit_reuses_memoized_glyph_advances(font):
+    layout = TextLayout()
+    layout.layout("ORDER 1234", font, 80, 150, 40, fit=True)
+    measured = len(layout.metrics._advances)
+    layout.layout("ORDER 4321", font, 80, 150, 40, fit=True)
+    layout.layout("DERO 2", font, 80, 150, 40, fit=True)
+    assert len(layout.metrics._advances) == measured
+
+
+def test_boxed_text_element_renders_wrapped_and_aligned(font):
+    designer = LabelDesigner()
+    el = designer.add_text("A fairly long product name that wraps", font_name=font)
+    designer.update_element_box(el['id'], 200, 100, align="center", fit=True)
+    raster = designer.get_raster(el)
+    assert raster.size == (200, 100)
+    assert len(designer.layout_text_box(el).lines) > 1
+
+    ink = raster.getchannel("A").getbbox()
+    # Centered: roughly equal margins
+    assert abs(ink[0] - (200 - ink[2])) <= 4
+
+    data = el.to_dict()
+    assert (data['box_width'], data['align'], data['fit']) == (200, 'center', True)
+
+    designer.update_element_box(el['id'], None)
+    assert 'box_width' not in el.to_dict()
+
+
+def test_batch_fits_each_record(font):
+    designer = LabelDesigner()
+    el = designer.add_text("{{name}}", font_name=font, font_size=60)
+    designer.update_element_box(el['id'], 300, 60, fit=True)
+    sizes = []
+    for record, _ in designer.render_batch([{'name': "Short"}, {'name': "A much much longer name here"}]):
+        sizes.append(designer.layout_text_box(el).size)
+    assert sizes[0] > sizes[1]
+
+
+def test_wrap_and_fit_measure_fallback_glyphs(fallback_fonts):
+    fallback, serif, _ = fallback_fonts
+    designer = LabelDesigner()
+    designer.font_fallback = fallback
+    # DejaVu Serif has no snowman: every glyph here is drawn with DejaVu Sans
+    el = designer.add_text("☃☃☃ ☃☃☃ ☃☃☃ ☃☃☃", font_name=serif, font_size=40)
+
+    designer.update_element_box(el['id'], 120, None)
+    block = designer.layout_text_box(el)
+    assert len(block.lines) > 1
+    for line in block.lines:
+        assert designer.layout_text(line, serif, block.size)[0][2] <= 120
+
+    designer.update_element_box(el['id'], 120, 60, fit=True)
+    block = designer.layout_text_box(el)
+    assert block.height <= 60
+    for line in block.lines:
+        assert designer.layout_text(line, serif, block.size)[0][2] <= 120
+    ink = designer.get_raster(el).getchannel("A").getbbox()
+    assert ink[2] <= 120 and ink[3] <= 60
+
+
+def test_glyph_advances_follow_fallback_changes(fallback_fonts):
+    fallback, serif, _ = fallback_fonts
+    layout = TextLayout(fallback)
+    layout.metrics.text_width(serif, "☃", 40)
+    assert layout.metrics._advances
+    fallback.index.generation += 1
+    layout.metrics.text_width(serif, "a", 40)
+    assert list(layout.metrics._advances) == [(serif, "a")]
@@ -0,0 +1,71 @@
+
+from app import printer_commands
+from app.label_designer import LabelDesigner
+from app.zpl_export import ZplExporter, escape_field_data
+
+
+def _design(image_file, font):
+    designer = LabelDesigner()
+    designer.add_image(image_file("logo.png", "black", (40, 40)))
+    designer.add_text("BEST BEFORE", font_name=font)
+    sku = designer.add_text("SKU {{sku}}", font_name=font)
+    designer.update_element_rotation(sku.id, 90)
+    designer.add_text("static in unknown font", font_name="fancy-script.ttf")
+    return designer
+
+
+def test_static_graphics_are_downloaded_once(image_file, font):
+    exporter = ZplExporter(_design(image_file, font))
+    header = exporter.header().decode("ascii")
+    # Logo and the non-resident static text
+    assert header.count("~DGR:LBL") == 2
+
+    label = exporter.label({'sku': 'A-1'}).decode("utf-8")
+    assert label.count("^XGR:LBL") == 2
+    assert "^GF" not in label
+    assert "^FDBEST BEFORE^FS" in label
+    assert "^A0B," in label and "^FDSKU A-1^FS" in label
+
+
+def test_stream_is_small_per_label(image_file, font):
+    exporter = ZplExporter(_design(image_file, font))
+    chunks = list(exporter.stream([{'sku': n} for n in range(100)]))
+    assert len(chunks) == 101
+    assert max(len(c) for c in chunks[1:]) < 300
+
+
+def test_images_are_dithered_like_the_preview(image_file):
+    designer = LabelDesigner()
+    # Mid-gray: a plain threshold at 128 would print it solid black
+    el = designer.add_image(image_file("gray.png", (100, 100, 100, 255), (40, 40)))
+    designer.update_element_dither(el.id, "ordered")
+
+    mono = designer.get_monochrome_raster(el)
+    assert {value for _, value in mono.getcolors()} == {0, 255}
+    bytes_per_row, data = printer_commands.packed_rows(mono)
+    assert printer_commands.compress_acs(data, bytes_per_row) in ZplExporter(designer).header().decode("ascii")
+
+    # The same dots as the 1-bit label the designer prints
+    designer.set_color_mode("1")
+    box = (el.x, el.y, el.x + mono.width, el.y + mono.height)
+    assert designer.get_monochrome_raster(el).tobytes() == designer.get_image().crop(box).tobytes()
+    assert mono.tobytes() == designer.get_image().crop(box).tobytes()
+
+
+def test_non_resident_text_is_rasterized_inline(font):
+    designer = LabelDesigner()
+    designer.add_text("Chicken {{name}}", font_name=font)
+    label = ZplExporter(designer).label({'name': "\U0001F414"}).decode("utf-8")
+    assert "^GFA," in label
+    assert designer.elements[0].content == "Chicken {{name}}"
+
+
+def test_resident_font_matches_full_font_path(font, font_file):
+    designer = LabelDesigner()
+    el = designer.add_text("LOT 7", font_name=font)
+    el.font = font_file(font)
+    assert ZplExporter(designer).resident_font(el) == '0'
+
+
+def test_escape_field_data():
+    assert escape_field_data("a^b~c_d") == "a_5Eb_7Ec_5Fd"